@@ -0,0 +1,211 @@
+from typing import Dict, List, Union
+from concurrent.futures import Executor
+from multiprocessing import shared_memory
+import numpy as np
+import pandas as pd
+
+
+# Aggregates that can be computed per partition and merged afterwards
+DECOMPOSABLE_AGGS = {"sum", "count", "mean", "min", "max", "var", "std"}
+
+# Partial columns kept for every aggregated column
+PARTIAL_STATS = ["count", "sum", "min", "max", "m2"]
+
+AggSpec = Union[str, List[str], Dict[str, Union[str, List[str]]]]
+
+
+def normalize_agg(df: pd.DataFrame, group_by: Union[str, List[str]], agg_func: AggSpec) -> Dict[str, List[str]]:
+    """Expand an agg_func spec into {column: [funcs]} over numeric columns"""
+    keys = [group_by] if isinstance(group_by, str) else list(group_by)
+
+    if isinstance(agg_func, dict):
+        spec = {col: [f] if isinstance(f, str) else list(f) for col, f in agg_func.items()}
+    else:
+        funcs = [agg_func] if isinstance(agg_func, str) else list(agg_func)
+        spec = {
+            col: funcs
+            for col in df.columns
+            if col not in keys and pd.api.types.is_numeric_dtype(df[col])
+        }
+
+    unsupported = {f for funcs in spec.values() for f in funcs} - DECOMPOSABLE_AGGS
+    if unsupported:
+        raise ValueError(
+            f"Aggregates {sorted(unsupported)} cannot be merged across partitions; "
+            f"supported: {sorted(DECOMPOSABLE_AGGS)}"
+        )
+    return spec
+
+
+def partial_aggregate(df: pd.DataFrame, group_by: Union[str, List[str]], spec: Dict[str, List[str]]) -> pd.DataFrame:
+    """Aggregate one partition into mergeable (count, sum, min, max, m2) columns"""
+    cols = list(spec)
+    partial = df.groupby(group_by)[cols].agg(["count", "sum", "min", "max", "var"])
+
+    for col in cols:
+        count = partial[(col, "count")]
+        partial[(col, "m2")] = (partial[(col, "var")] * (count - 1)).fillna(0.0)
+
+    return partial[[(col, stat) for col in cols for stat in PARTIAL_STATS]]
+
+
+def merge_partials(partials: List[pd.DataFrame]) -> pd.DataFrame:
+    """Merge partial aggregates of several partitions into one partial"""
+    if len(partials) == 1:
+        return partials[0]
+
+    parts = pd.concat(partials)
+    levels = list(range(parts.index.nlevels))
+    cols = list(dict.fromkeys(col for col, _ in parts.columns))
+
+    def by_group(stat: pd.Series):
+        return stat.groupby(level=levels)
+
+    merged = {}
+    for col in cols:
+        count = parts[(col, "count")]
+        total = by_group(count).transform("sum")
+        with np.errstate(invalid="ignore", divide="ignore"):
+            part_mean = parts[(col, "sum")] / count
+            group_mean = by_group(parts[(col, "sum")]).transform("sum") / total
+        # Chan et al. parallel variance: M2 = sum(M2_i) + sum(n_i * (mean_i - mean)^2)
+        deviation = (count * (part_mean - group_mean) ** 2).fillna(0.0)
+
+        merged[(col, "count")] = by_group(count).sum()
+        merged[(col, "sum")] = by_group(parts[(col, "sum")]).sum()
+        merged[(col, "min")] = by_group(parts[(col, "min")]).min()
+        merged[(col, "max")] = by_group(parts[(col, "max")]).max()
+        merged[(col, "m2")] = by_group(parts[(col, "m2")] + deviation).sum()
+
+    return pd.DataFrame(merged)
+
+
+def finalize_aggregate(partial: pd.DataFrame, spec: Dict[str, List[str]], agg_func: AggSpec) -> pd.DataFrame:
+    """Turn a merged partial into the frame ``groupby().agg(agg_func)`` returns"""
+    result = {}
+    for col, funcs in spec.items():
+        count = partial[(col, "count")]
+        for func in funcs:
+            if func == "count":
+                value = count
+            elif func == "sum":
+                value = partial[(col, "sum")]
+            elif func == "mean":
+                value = partial[(col, "sum")] / count.where(count > 0)
+            elif func in ("min", "max"):
+                value = partial[(col, func)]
+            else:
+                var = partial[(col, "m2")] / (count - 1).where(count > 1)
+                value = np.sqrt(var) if func == "std" else var
+            result[(col, func)] = value
+
+    frame = pd.DataFrame(result, index=partial.index)
+    flat = isinstance(agg_func, str) or (
+        isinstance(agg_func, dict) and all(isinstance(f, str) for f in agg_func.values())
+    )
+    if flat:
+        frame.columns = [col for col, _ in frame.columns]
+    return frame
+
+
+def parallel_aggregate(
+    df: pd.DataFrame,
+    group_by: Union[str, List[str]],
+    agg_func: AggSpec,
+    pool: Executor,
+    partitions: int,
+) -> pd.DataFrame:
+    """``df.groupby(group_by).agg(agg_func)`` computed on a process pool.
+
+    Group keys are factorized to integer codes once, and the codes and value
+    columns are copied into a single shared memory block. Each worker
+    aggregates a row range of that block into mergeable partials, so the
+    frame is never pickled. Integer columns without missing values stay
+    int64 through the partials and the merge, so their sums, minima and
+    maxima are exact; other values are aggregated as float64.
+    """
+    spec = normalize_agg(df, group_by, agg_func)
+    keys = [group_by] if isinstance(group_by, str) else list(group_by)
+    columns = list(spec)
+    rows = len(df)
+
+    if len(keys) == 1:
+        codes, uniques = pd.factorize(df[keys[0]], sort=True)
+        uniques = pd.Index(uniques, name=keys[0])
+    else:
+        codes, uniques = pd.factorize(pd.MultiIndex.from_frame(df[keys]), sort=True)
+        uniques = pd.MultiIndex.from_tuples(uniques, names=keys)
+        # Match groupby's dropna: rows with any missing key belong to no group
+        codes[df[keys].isna().any(axis=1).to_numpy()] = -1
+
+    dtypes = [_block_dtype(df[col]) for col in columns]
+    # One 8-byte row per array: the group codes, then each value column
+    shm = shared_memory.SharedMemory(create=True, size=max(1, rows * (len(columns) + 1) * 8))
+    try:
+        _block_row(shm, rows, 0, "int64")[:] = codes
+        for i, (col, dtype) in enumerate(zip(columns, dtypes)):
+            if dtype == "int64":
+                _block_row(shm, rows, i + 1, dtype)[:] = df[col].to_numpy(dtype=np.int64)
+            else:
+                _block_row(shm, rows, i + 1, dtype)[:] = df[col].to_numpy(dtype=np.float64, na_value=np.nan)
+
+        bounds = np.linspace(0, rows, max(1, partitions) + 1, dtype=np.int64)
+        futures = [
+            pool.submit(_aggregate_partition, shm.name, rows, columns, dtypes, int(start), int(stop))
+            for start, stop in zip(bounds[:-1], bounds[1:])
+            if stop > start
+        ]
+        partials = [future.result() for future in futures]
+    finally:
+        shm.close()
+        shm.unlink()
+
+    if not partials:
+        return df.groupby(group_by).agg(agg_func)
+
+    merged = merge_partials(partials)
+    merged.index = uniques.take(merged.index.to_numpy(dtype=np.int64))
+    result = finalize_aggregate(merged, spec, agg_func)
+    return _restore_integer_dtypes(result, df, spec, agg_func)
+
+
+def _block_dtype(series: pd.Series) -> str:
+    """int64 for integer columns that fit it exactly, float64 otherwise"""
+    dtype = series.dtype
+    if isinstance(dtype, np.dtype) and dtype.kind in "iu" and not (dtype.kind == "u" and dtype.itemsize == 8):
+        return "int64"
+    return "float64"
+
+
+def _block_row(shm: shared_memory.SharedMemory, rows: int, index: int, dtype: str) -> np.ndarray:
+    return np.ndarray((rows,), dtype=dtype, buffer=shm.buf, offset=index * rows * 8)
+
+
+def _aggregate_partition(
+    shm_name: str, rows: int, columns: List[str], dtypes: List[str], start: int, stop: int
+) -> pd.DataFrame:
+    """Worker: aggregate rows [start, stop) of a shared memory block"""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        codes = np.array(_block_row(shm, rows, 0, "int64")[start:stop])
+        values = [np.array(_block_row(shm, rows, i + 1, dtype)[start:stop]) for i, dtype in enumerate(dtypes)]
+    finally:
+        shm.close()
+
+    valid = codes >= 0  # factorize marks missing group keys with -1
+    frame = pd.DataFrame({col: column[valid] for col, column in zip(columns, values)})
+    frame["__group__"] = codes[valid]
+    return partial_aggregate(frame, "__group__", {col: [] for col in columns})
+
+
+def _restore_integer_dtypes(result: pd.DataFrame, df: pd.DataFrame, spec: Dict[str, List[str]],
+                            agg_func: AggSpec) -> pd.DataFrame:
+    """Cast count, and sum/min/max of integer columns, back to integers"""
+    flat = not isinstance(result.columns, pd.MultiIndex)
+    for col, funcs in spec.items():
+        for func in funcs:
+            label = col if flat else (col, func)
+            integer_source = pd.api.types.is_integer_dtype(df[col]) and func in ("sum", "min", "max")
+            if (func == "count" or integer_source) and not result[label].isna().any():
+                result[label] = result[label].astype(np.int64)
+    return result
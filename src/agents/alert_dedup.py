@@ -0,0 +1,177 @@
+from typing import Any, Dict, Hashable, List, Optional
+import itertools
+import time
+
+
+class TimingWheel:
+    """Hashed timing wheel: schedule and expire keys in O(1) amortized time.
+
+    Deadlines are bucketed into ``slots`` slots of ``resolution`` seconds.
+    Keys whose deadline moved later are not moved when it changes; when
+    their old slot comes up they are re-filed into the new one, so pushing
+    a deadline back costs nothing.
+    """
+
+    def __init__(self, resolution: float = 1.0, slots: int = 512):
+        self.resolution = resolution
+        self._slots: List[set] = [set() for _ in range(slots)]
+        self._deadlines: Dict[Hashable, float] = {}
+        self._tick: Optional[int] = None
+
+    def _slot(self, deadline: float) -> set:
+        return self._slots[int(deadline // self.resolution) % len(self._slots)]
+
+    def schedule(self, key: Hashable, deadline: float) -> None:
+        previous = self._deadlines.get(key)
+        self._deadlines[key] = deadline
+        if previous is None or deadline < previous:
+            self._slot(deadline).add(key)
+
+    def cancel(self, key: Hashable) -> None:
+        self._deadlines.pop(key, None)
+
+    def advance(self, now: float) -> List[Hashable]:
+        """Remove and return the keys whose deadline is at or before ``now``"""
+        tick = int(now // self.resolution)
+        if self._tick is None:
+            self._tick = tick
+        if tick < self._tick:
+            return []
+        expired = []
+        # Visit each slot at most once, however far time jumped
+        for current in range(max(self._tick, tick - len(self._slots) + 1), tick + 1):
+            slot = self._slots[current % len(self._slots)]
+            for key in list(slot):
+                slot.discard(key)
+                deadline = self._deadlines.get(key)
+                if deadline is None:
+                    continue
+                if deadline <= now:
+                    del self._deadlines[key]
+                    expired.append(key)
+                else:
+                    self._slot(deadline).add(key)
+        self._tick = tick
+        return expired
+
+    def __len__(self) -> int:
+        return len(self._deadlines)
+
+
+class AlertDeduplicator:
+    """Collapse repeated detections of the same (zone, threat_type) into incidents.
+
+    The first actionable detection of a key opens an incident and is
+    notified. Further detections are suppressed while the incident is
+    active. An incident stays active until it has been quiet for
+    ``debounce`` seconds and its last notification is ``cooldown`` seconds
+    old. Within an incident, a confidence at least ``escalation_step`` above
+    the last notified one is escalated, and an incident still firing after
+    ``cooldown`` seconds gets a repeat notification. Emergency calls are
+    made at most once per incident.
+    """
+
+    def __init__(
+        self,
+        debounce: float = 30.0,
+        cooldown: float = 300.0,
+        escalation_step: float = 0.1,
+        resolution: float = 1.0,
+        slots: int = 512,
+    ):
+        self.debounce = debounce
+        self.cooldown = cooldown
+        self.escalation_step = escalation_step
+        self.incidents: Dict[Hashable, Dict[str, Any]] = {}
+        self._wheel = TimingWheel(resolution, slots)
+        self._ids = itertools.count(1)
+        self._now = float("-inf")
+        self.stats = {"events": 0, "notified": 0, "suppressed": 0, "escalated": 0, "repeated": 0, "expired": 0}
+
+    def _expiry(self, incident: Dict[str, Any]) -> float:
+        return max(incident["last_seen"] + self.debounce, incident["notified_at"] + self.cooldown)
+
+    def observe(
+        self, zone: str, threat_type: str, confidence: float, now: float, received: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """Record an actionable detection and decide whether it should be notified.
+
+        ``now`` is the detection's event time. It is clamped to ``received``
+        (the wall clock by default), so a skewed, future-dated timestamp
+        cannot push the windows ahead and silence the alerts that follow.
+        """
+        now = min(now, time.time() if received is None else received)
+        # Out-of-order timestamps are treated as arriving now
+        now = max(now, self._now)
+        self._now = now
+        for key in self._wheel.advance(now):
+            self.incidents.pop(key, None)
+            self.stats["expired"] += 1
+
+        self.stats["events"] += 1
+        key = (zone, threat_type)
+        incident = self.incidents.get(key)
+        if incident is None:
+            incident = {
+                "incident_id": f"incident_{next(self._ids)}",
+                "zone": zone,
+                "threat_type": threat_type,
+                "opened_at": now,
+                "last_seen": now,
+                "notified_at": now,
+                "notified_confidence": confidence,
+                "max_confidence": confidence,
+                "events": 1,
+                "suppressed": 0,
+                "emergency_called": False,
+            }
+            self.incidents[key] = incident
+            reason = "new"
+        else:
+            incident["last_seen"] = now
+            incident["events"] += 1
+            incident["max_confidence"] = max(incident["max_confidence"], confidence)
+            if confidence >= incident["notified_confidence"] + self.escalation_step:
+                reason = "escalated"
+            elif now - incident["notified_at"] >= self.cooldown:
+                reason = "repeated"
+            else:
+                reason = "suppressed"
+
+        suppressed = incident["suppressed"]
+        if reason == "suppressed":
+            incident["suppressed"] += 1
+            self.stats["suppressed"] += 1
+        else:
+            incident["notified_at"] = now
+            incident["notified_confidence"] = confidence
+            incident["suppressed"] = 0
+            self.stats["notified"] += 1
+            if reason != "new":
+                self.stats[reason] += 1
+        self._wheel.schedule(key, self._expiry(incident))
+
+        return {
+            "notify": reason != "suppressed",
+            "reason": reason,
+            "incident_id": incident["incident_id"],
+            "suppressed_since_last": suppressed,
+        }
+
+    def claim_emergency_call(self, zone: str, threat_type: str) -> bool:
+        """True the first time an incident asks to call emergency services"""
+        incident = self.incidents.get((zone, threat_type))
+        if incident is None or incident["emergency_called"]:
+            return False
+        incident["emergency_called"] = True
+        return True
+
+    def summary(self) -> Dict[str, Any]:
+        events = self.stats["events"]
+        return {
+            **self.stats,
+            "active_incidents": len(self.incidents),
+            "reduction": round(1 - self.stats["notified"] / events, 4) if events else 0.0,
+            "debounce": self.debounce,
+            "cooldown": self.cooldown,
+        }
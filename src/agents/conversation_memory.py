@@ -0,0 +1,143 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from collections import OrderedDict
+import re
+import threading
+import time
+from .llm_cache import estimate_tokens
+
+Turn = Tuple[str, str]
+Summarizer = Callable[[str, List[Turn], int], str]
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+
+
+def _first_sentence(text: str, max_words: int = 30) -> str:
+    sentence = _SENTENCE_END.split(" ".join(text.split()), maxsplit=1)[0]
+    words = sentence.split(" ")
+    return " ".join(words[:max_words]) + (" ..." if len(words) > max_words else "")
+
+
+def extractive_summary(summary: str, turns: List[Turn], budget: int) -> str:
+    """Fold turns into a rolling summary of one line per exchange, oldest lines dropped first"""
+    lines = [line for line in summary.splitlines() if line]
+    lines += [f"User: {_first_sentence(user)} / Assistant: {_first_sentence(reply)}" for user, reply in turns]
+    while len(lines) > 1 and estimate_tokens("\n".join(lines)) > budget:
+        lines.pop(0)
+    return "\n".join(lines)
+
+
+class ConversationSession:
+    """One conversation: recent exchanges kept verbatim plus a summary of older ones"""
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.turns: List[Turn] = []
+        self.turn_tokens: List[int] = []
+        self.summary = ""
+        self.exchanges = 0
+        self.last_used = time.time()
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "conversation_id": self.session_id,
+            "exchanges": self.exchanges,
+            "summary": self.summary,
+            "recent_turns": [{"user": user, "assistant": reply} for user, reply in self.turns],
+            "context_tokens": sum(self.turn_tokens) + estimate_tokens(self.summary),
+        }
+
+
+class ConversationMemory:
+    """Multi-turn sessions with a token-budgeted context window.
+
+    ``build_context`` returns the messages for the next call: as many of the
+    most recent exchanges as fit in ``context_tokens`` alongside the new
+    prompt, with older exchanges folded into a rolling summary of at most
+    ``summary_tokens``. Least recently used sessions beyond ``max_sessions``
+    and sessions idle longer than ``session_ttl`` seconds are evicted.
+    """
+
+    def __init__(
+        self,
+        context_tokens: int = 2000,
+        summary_tokens: int = 400,
+        max_sessions: int = 1000,
+        session_ttl: Optional[float] = 3600,
+        summarizer: Optional[Summarizer] = None,
+    ):
+        self.context_tokens = context_tokens
+        self.summary_tokens = summary_tokens
+        self.max_sessions = max_sessions
+        self.session_ttl = session_ttl
+        self.summarizer = summarizer or extractive_summary
+        self._sessions: "OrderedDict[str, ConversationSession]" = OrderedDict()
+        self._lock = threading.RLock()
+        self.evictions = 0
+
+    def get(self, session_id: str, create: bool = True) -> Optional[ConversationSession]:
+        with self._lock:
+            self._evict_idle()
+            session = self._sessions.get(session_id)
+            if session is None and create:
+                session = self._sessions[session_id] = ConversationSession(session_id)
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+                    self.evictions += 1
+            if session is not None:
+                self._sessions.move_to_end(session_id)
+                session.last_used = time.time()
+            return session
+
+    def _evict_idle(self) -> None:
+        if self.session_ttl is None:
+            return
+        cutoff = time.time() - self.session_ttl
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if session.last_used >= cutoff:
+                break
+            del self._sessions[session_id]
+            self.evictions += 1
+
+    def build_context(self, session_id: str, prompt: str) -> Dict[str, Any]:
+        """The system summary and message list to send for ``prompt``, within the token budget"""
+        with self._lock:
+            session = self.get(session_id)
+            available = self.context_tokens - estimate_tokens(prompt)
+            if sum(session.turn_tokens) + estimate_tokens(session.summary) > available:
+                # Reserve the full summary budget, then fold the oldest exchanges into it
+                folded = []
+                while session.turns and sum(session.turn_tokens) > available - self.summary_tokens:
+                    folded.append(session.turns.pop(0))
+                    session.turn_tokens.pop(0)
+                session.summary = self.summarizer(session.summary, folded, self.summary_tokens)
+
+            messages = []
+            for user, reply in session.turns:
+                messages.append({"role": "user", "content": user})
+                messages.append({"role": "assistant", "content": reply})
+            messages.append({"role": "user", "content": prompt})
+            system = f"Summary of the earlier conversation:\n{session.summary}" if session.summary else None
+            return {"system": system, "messages": messages}
+
+    def record(self, session_id: str, prompt: str, response: str) -> None:
+        """Append a completed exchange to a session"""
+        with self._lock:
+            session = self.get(session_id)
+            session.turns.append((prompt, response))
+            session.turn_tokens.append(estimate_tokens(prompt) + estimate_tokens(response))
+            session.exchanges += 1
+
+    def end(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "sessions": len(self._sessions),
+            "evictions": self.evictions,
+            "context_tokens": self.context_tokens,
+        }
@@ -1,22 +1,74 @@
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional
 import logging
 from .base_agent import BaseAgent
+from .cache import LRUCache
+from .aggregation import finalize_aggregate, merge_partials, normalize_agg, parallel_aggregate, partial_aggregate
+from .dataset_io import detect_format, read_dataset, write_dataset
+from .dataset_registry import DatasetRegistry
+from .dtype_optimizer import optimization_report, optimize_dtypes
+from .indexes import build_index, indexed_positions, query_mask
+from .query_plan import QueryPlan
+from .result_handles import ResultHandle
+from .sketches import DatasetSketch
+from .sql_query import query_frame, referenced_tables, run_query, run_query_ipc
+from .streaming import CSVStream
+from .time_series import TIME_SERIES_TASKS, TimeSeriesView, time_indexed, view_params
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 import numpy as np
-from io import StringIO
+import copy
+import itertools
+import json
+import os
+import sys
 
 logger = logging.getLogger(__name__)
 
+# Task names that optimize dtypes; matched exactly so "load optimized.csv" still loads
+OPTIMIZE_TASKS = {"optimize", "optimize dtypes", "optimize data", "optimize memory"}
+# Task names that save a dataset; matched exactly so "load export_2024.csv" still loads
+SAVE_TASKS = {"save", "save data", "save dataset", "export", "export data", "export dataset"}
+# Task names that run a SQL query; matched exactly so "load mysql_dump.csv" still loads
+SQL_TASKS = {"sql", "sql query", "run sql", "query sql"}
+# Task names that build indexes; matched exactly so "filter using index on id" still filters
+INDEX_TASKS = {"index", "build index", "build indexes", "create index", "create indexes"}
+# Versions remembered per dataset for incremental time-series updates
+LINEAGE_LIMIT = 64
+
 
 class DataAnalysisAgent(BaseAgent):
     """Agent for data analysis tasks"""
 
-    def __init__(self):
+    def __init__(
+        self,
+        cache_entries: int = 256,
+        cache_bytes: Optional[int] = 256 * 1024 * 1024,
+        aggregate_workers: Optional[int] = None,
+        memory_budget: Optional[int] = None,
+        spill_dir: Optional[str] = None,
+        max_inline_rows: int = 10000,
+        max_result_handles: int = 64,
+    ):
         super().__init__(
             name="DataAnalysisAgent",
             description="Analyzes and processes data with pandas",
         )
-        self.dataframes = {}
+        self.dataframes = DatasetRegistry(memory_budget, spill_dir, on_spill=self._drop_cached_frames)
+        self.streams = {}
+        self.plans = {}
+        self.versions = {}
+        self.indexes = {}
+        self.sketches = {}
+        self.append_lineage = {}
+        self.filter_sources = {}
+        self.time_series_views = LRUCache(cache_entries)
+        self._version_counter = itertools.count(1)
+        self.result_cache = LRUCache(cache_entries, cache_bytes, sizeof=_estimate_size)
+        self.aggregate_workers = aggregate_workers or os.cpu_count() or 1
+        self._aggregate_pool = None
+        self.max_inline_rows = max_inline_rows
+        self.results = LRUCache(max_result_handles)
+        self._handle_counter = itertools.count(1)
         self.analysis_history = []
 
     def execute(self, task: str, **kwargs) -> Dict[str, Any]:
@@ -42,14 +94,38 @@ class DataAnalysisAgent(BaseAgent):
         """Process the analysis based on task type"""
         task_lower = task.lower()
 
-        if "load" in task_lower or "read" in task_lower:
+        if task_lower.strip() in OPTIMIZE_TASKS:
+            return self._optimize_data(**kwargs)
+        elif task_lower.strip() in INDEX_TASKS:
+            return self._build_indexes(**kwargs)
+        elif task_lower.strip() in SQL_TASKS:
+            return self._sql_query(**kwargs)
+        elif task_lower.strip() in TIME_SERIES_TASKS:
+            return self._time_series(TIME_SERIES_TASKS[task_lower.strip()], **kwargs)
+        elif task_lower.strip() in SAVE_TASKS:
+            return self._save_data(**kwargs)
+        elif "load" in task_lower or "read" in task_lower:
             return self._load_data(**kwargs)
+        elif "approx" in task_lower:
+            return self._approximate_statistics(**kwargs)
+        elif "append" in task_lower:
+            return self._append_data(**kwargs)
         elif "statistics" in task_lower or "describe" in task_lower:
             return self._get_statistics(**kwargs)
         elif "filter" in task_lower:
             return self._filter_data(**kwargs)
         elif "aggregate" in task_lower or "group" in task_lower:
             return self._aggregate_data(**kwargs)
+        elif "select" in task_lower:
+            return self._select_data(**kwargs)
+        elif "sort" in task_lower:
+            return self._sort_data(**kwargs)
+        elif "collect" in task_lower:
+            return self._collect_plan(**kwargs)
+        elif "explain" in task_lower:
+            return self._explain_plan(**kwargs)
+        elif "fetch" in task_lower or "page" in task_lower:
+            return self._fetch_result(**kwargs)
         else:
             return {"message": "Analysis task processed", "details": task}
 
@@ -58,7 +134,22 @@ class DataAnalysisAgent(BaseAgent):
         source = kwargs.get("source")
         data_name = kwargs.get("name", "default")
 
-        if "csv" in str(source).lower():
+        if kwargs.get("stream") or kwargs.get("chunksize"):
+            return self._load_stream(source, data_name, kwargs.get("chunksize"), kwargs.get("read_options", {}))
+
+        file_format = kwargs.get("format") or detect_format(source)
+
+        if file_format:
+            df = read_dataset(
+                source,
+                file_format,
+                columns=kwargs.get("columns"),
+                filters=kwargs.get("filters"),
+                memory_map=kwargs.get("memory_map", True),
+            )
+        elif isinstance(source, pd.DataFrame):
+            df = source.copy()
+        elif "csv" in str(source).lower():
             df = pd.read_csv(source)
         elif "json" in str(source).lower():
             df = pd.read_json(source)
@@ -67,48 +158,405 @@ class DataAnalysisAgent(BaseAgent):
         else:
             raise ValueError("Unsupported data source")
 
-        self.dataframes[data_name] = df
+        report = {}
+        if kwargs.get("optimize"):
+            optimized = optimize_dtypes(
+                df, kwargs.get("category_threshold", 0.5), downcast_integers=kwargs.get("downcast_integers", False)
+            )
+            report = optimization_report(df, optimized)
+            df = optimized
+
+        self._store_dataframe(data_name, df)
 
         return {
             "name": data_name,
             "shape": df.shape,
             "columns": list(df.columns),
             "dtypes": df.dtypes.to_dict(),
+            **report,
+        }
+
+    def _optimize_data(self, **kwargs) -> Dict[str, Any]:
+        """Shrink the dtypes of a stored dataframe in place"""
+        data_name = kwargs.get("name", "default")
+
+        if data_name not in self.dataframes:
+            raise ValueError(f"Dataset '{data_name}' not found")
+
+        df = self.dataframes[data_name]
+        optimized = optimize_dtypes(
+            df, kwargs.get("category_threshold", 0.5), downcast_integers=kwargs.get("downcast_integers", False)
+        )
+        self._store_dataframe(data_name, optimized)
+
+        return {"name": data_name, **optimization_report(df, optimized)}
+
+    def _load_stream(self, source: Any, data_name: str, chunksize: Optional[int],
+                     read_options: Dict[str, Any]) -> Dict[str, Any]:
+        """Register a CSV file that is read in chunks instead of materialized"""
+        if not isinstance(source, str) or "csv" not in source.lower():
+            raise ValueError("Streaming load requires a CSV file path")
+
+        stream = CSVStream(
+            source,
+            chunksize=chunksize or 100000,
+            **read_options,
+        ).scan()
+        self._store_stream(data_name, stream)
+
+        return {
+            "name": data_name,
+            "shape": stream.shape,
+            "columns": stream.columns,
+            "dtypes": stream.dtypes,
+            "streamed": True,
+            "chunksize": stream.chunksize,
+        }
+
+    def _save_data(self, **kwargs) -> Dict[str, Any]:
+        """Save a stored dataframe as Parquet, Feather/Arrow IPC or .npy"""
+        data_name = kwargs.get("name", "default")
+        path = kwargs.get("path")
+
+        if not path:
+            raise ValueError("A destination path is required to save data")
+        if data_name not in self.dataframes:
+            raise ValueError(f"Dataset '{data_name}' not found")
+
+        # Only pass compression when given, so an explicit None turns it off
+        options = {"compression": kwargs["compression"]} if "compression" in kwargs else {}
+        file_format = write_dataset(self.dataframes[data_name], path, kwargs.get("format"), **options)
+
+        return {
+            "name": data_name,
+            "path": path,
+            "format": file_format,
+            "bytes": os.path.getsize(path),
         }
 
     def _get_statistics(self, **kwargs) -> Dict[str, Any]:
         """Get statistical summary of data"""
         data_name = kwargs.get("name", "default")
 
+        if data_name in self.streams:
+            stream = self.streams[data_name]
+            return {
+                "shape": stream.shape,
+                "columns": stream.columns,
+                "statistics": stream.stats.describe(),
+                "missing_values": dict(stream.stats.nulls),
+                "approximate_quantiles": True,
+            }
+
+        if data_name not in self.dataframes:
+            raise ValueError(f"Dataset '{data_name}' not found")
+
+        def compute():
+            df = self.dataframes[data_name]
+            desc = df.describe()
+
+            return {
+                "shape": df.shape,
+                "columns": list(df.columns),
+                "statistics": desc.to_dict(),
+                "missing_values": df.isnull().sum().to_dict(),
+            }
+
+        result = self._memoized("statistics", data_name, {}, compute, kwargs.get("cache", True))
+        if not kwargs.get("as_handle"):
+            return result
+
+        # One row per column, for frames too wide to return inline
+        table = pd.DataFrame(result["statistics"]).T
+        table["missing"] = pd.Series(result["missing_values"])
+        table.index.name = "column"
+        return {"shape": result["shape"], **self._create_handle(table).describe()}
+
+    def _approximate_statistics(self, **kwargs) -> Dict[str, Any]:
+        """Approximate distinct counts, quantiles and top-k values from sketches.
+
+        Sketches are built in one chunked pass and kept per dataset, so later
+        calls and appended rows do not rescan the data.
+        """
+        data_name = kwargs.get("name", "default")
+        sketch = self._get_sketch(data_name, kwargs)
+        return {
+            "name": data_name,
+            **sketch.summary(kwargs.get("quantiles", (0.25, 0.5, 0.75)), kwargs.get("top_k")),
+        }
+
+    def _get_sketch(self, data_name: str, kwargs: Dict[str, Any]) -> DatasetSketch:
+        """Get the stored sketch of a dataset, building it if missing, stale or differently configured"""
+        config = {
+            key: kwargs[key] for key in ("error", "compression", "epsilon", "delta", "top_k") if key in kwargs
+        }
+        entry = self.sketches.get(data_name)
+        if entry and entry["version"] == self.versions.get(data_name):
+            sketch = entry["sketch"]
+            if all(sketch.config[key] == value for key, value in config.items()):
+                return sketch
+
+        sketch = DatasetSketch(**config)
+        if data_name in self.streams:
+            for chunk in self.streams[data_name].chunks():
+                sketch.update(chunk)
+        elif data_name in self.dataframes:
+            df = self.dataframes[data_name]
+            chunksize = kwargs.get("chunksize", 100000)
+            for start in range(0, len(df), chunksize):
+                sketch.update(df.iloc[start: start + chunksize])
+        else:
+            raise ValueError(f"Dataset '{data_name}' not found")
+
+        self.sketches[data_name] = {"version": self.versions.get(data_name), "sketch": sketch}
+        return sketch
+
+    def _append_data(self, **kwargs) -> Dict[str, Any]:
+        """Append rows to a stored dataframe, updating its sketches and time-series views incrementally"""
+        data_name = kwargs.get("name", "default")
+        rows = kwargs.get("data")
+
+        if data_name in self.streams:
+            raise ValueError(f"Cannot append to streamed dataset '{data_name}'")
         if data_name not in self.dataframes:
             raise ValueError(f"Dataset '{data_name}' not found")
+        if rows is None:
+            raise ValueError("Rows to append are required")
 
+        new_rows = rows if isinstance(rows, pd.DataFrame) else pd.DataFrame(rows)
         df = self.dataframes[data_name]
-        desc = df.describe()
+        keyed = not isinstance(df.index, pd.RangeIndex)
+        if keyed and df.index.name in new_rows.columns:
+            index = new_rows[df.index.name]
+            if isinstance(df.index, pd.DatetimeIndex):
+                index = pd.to_datetime(index)
+            new_rows = new_rows.drop(columns=df.index.name).set_index(pd.Index(index, name=df.index.name))
+        entry = self.sketches.get(data_name)
+        fresh = entry is not None and entry["version"] == self.versions.get(data_name)
+        lineage = self.append_lineage.get(data_name, set())
+
+        self._store_dataframe(data_name, pd.concat([df, new_rows], ignore_index=not keyed))
+        # Results computed on any earlier version are a prefix of this one; views
+        # older than the last LINEAGE_LIMIT appends are simply recomputed in full
+        lineage = self.append_lineage[data_name] | lineage
+        self.append_lineage[data_name] = set(sorted(lineage)[-LINEAGE_LIMIT:])
+        if fresh:
+            # Sketches are mergeable, so only the new rows need to be scanned
+            entry["sketch"].update(new_rows)
+            entry["version"] = self.versions[data_name]
 
         return {
-            "shape": df.shape,
-            "columns": list(df.columns),
-            "statistics": desc.to_dict(),
-            "missing_values": df.isnull().sum().to_dict(),
+            "name": data_name,
+            "appended_rows": len(new_rows),
+            "shape": self.dataframes[data_name].shape,
+            "sketch_updated": fresh,
         }
 
+    def _sql_query(self, **kwargs) -> Dict[str, Any]:
+        """Run a SQL SELECT (joins, group-by, window functions) across stored datasets"""
+        query = kwargs.get("query")
+        if not query:
+            raise ValueError("A SQL query is required")
+
+        names = referenced_tables(query, list(self.dataframes) + list(self.streams))
+        versions = {name: self.versions.get(name) for name in sorted(names)}
+
+        def compute():
+            tables = {name: self._sql_source(name) for name in names}
+            return query_frame(query, tables, kwargs.get("batch_rows", 65536))
+
+        frame = self._memoized("sql", None, {"query": query, "versions": versions}, compute, kwargs.get("cache", True))
+        return {"tables": sorted(names), "rows": len(frame), **self._format_frame(frame, "data", kwargs)}
+
+    def stream_sql(self, query: str, batch_rows: int = 65536, format: str = "batches") -> Iterator[Any]:
+        """Run a SQL SELECT without materializing its result.
+
+        Returns an iterator of Arrow record batches, or with
+        ``format="arrow"`` of Arrow IPC stream chunks. Streamed results are
+        not cached. The query is validated and started before this returns.
+        """
+        if not query:
+            raise ValueError("A SQL query is required")
+        if format not in ("batches", "arrow"):
+            raise ValueError(f"Unknown format: {format}")
+
+        names = referenced_tables(query, list(self.dataframes) + list(self.streams))
+        tables = {name: self._sql_source(name) for name in names}
+        if format == "arrow":
+            return run_query_ipc(query, tables, batch_rows)
+        return run_query(query, tables, batch_rows)
+
+    def _sql_source(self, name: str) -> Any:
+        """A scannable source for a dataset, read from disk when it is spilled or streamed"""
+        import pyarrow.dataset as ds
+
+        if name in self.streams:
+            stream = self.streams[name]
+            if not stream.read_kwargs:
+                return ds.dataset(stream.source, format="csv")
+            # pandas read options have no Arrow equivalent, so scan through them
+            import pyarrow as pa
+
+            batches = (pa.RecordBatch.from_pandas(chunk, preserve_index=False) for chunk in stream.chunks())
+            first = next(batches)
+            return pa.RecordBatchReader.from_batches(first.schema, itertools.chain([first], batches))
+
+        path = self.dataframes.spill_path(name)
+        if not self.dataframes.is_resident(name) and path and path.endswith(".feather"):
+            return ds.dataset(path, format="feather")
+        return self.dataframes[name]
+
+    def _time_series(self, op: str, **kwargs) -> Dict[str, Any]:
+        """Resample, rolling/expanding windows, time-bucketed groupby or as-of join.
+
+        Views are kept per dataset and parameters; after an ``append`` only
+        the part of the result the new rows affect is recomputed.
+        """
+        data_name = kwargs.get("name", "default")
+        if data_name not in self.dataframes:
+            raise ValueError(f"Dataset '{data_name}' not found")
+
+        params = view_params(op, kwargs)
+        right = None
+        if op == "asof":
+            if params["right"] not in self.dataframes:
+                raise ValueError(f"Dataset '{params['right']}' not found")
+            params["right_version"] = self.versions.get(params["right"])
+            right, _ = time_indexed(self.dataframes[params["right"]], kwargs.get("right_time_column"))
+
+        time_column = kwargs.get("time_column")
+        key = (op, data_name, time_column, json.dumps(params, sort_keys=True, default=str))
+        version = self.versions.get(data_name)
+        view = self.time_series_views.get(key)
+
+        if view is not None and view.version == version:
+            frame, mode = view.result, "cached"
+        else:
+            frame, mode = None, "incremental"
+            if view is not None and view.version in self.append_lineage.get(data_name, ()):
+                # Only the appended rows are time-indexed; the view keeps the sorted tail it needs
+                new, _ = time_indexed(self.dataframes[data_name].iloc[view.rows:], time_column)
+                frame = view.update(new)
+            if frame is None:
+                df, _ = time_indexed(self.dataframes[data_name], time_column)
+                view = TimeSeriesView(op, params, right)
+                frame, mode = view.compute(df), "full"
+            view.version = version
+            self.time_series_views.put(key, view)
+
+        output = kwargs.get("output")
+        if output:
+            self._store_dataframe(output, frame)
+        return {"name": data_name, "operation": op, "mode": mode, **self._format_frame(frame, "data", kwargs)}
+
     def _filter_data(self, **kwargs) -> Dict[str, Any]:
         """Filter data based on conditions"""
         data_name = kwargs.get("name", "default")
         condition = kwargs.get("condition")
 
+        if data_name in self.plans or kwargs.get("lazy"):
+            return self._plan_step(data_name, kwargs).filter(condition).describe()
+
+        if data_name in self.streams:
+            return self._filter_stream(data_name, condition, kwargs.get("output"))
+
+        if data_name not in self.dataframes:
+            raise ValueError(f"Dataset '{data_name}' not found")
+
+        df = self.dataframes[data_name]
+        used_indexes = []
+
+        def compute():
+            indexes = self.indexes.get(data_name, {})
+            if indexes:
+                positions, used = indexed_positions(df, condition, indexes)
+                if positions is not None:
+                    used_indexes.extend(used)
+                    return _frozen(positions)
+            return _frozen(np.flatnonzero(query_mask(df, condition)))
+
+        # Cache the matching row positions rather than a second copy of the rows
+        if condition:
+            positions = self._memoized("filter", data_name, {"condition": condition}, compute, kwargs.get("cache", True))
+            filtered_rows = len(positions)
+        else:
+            positions, filtered_rows = None, len(df)
+
+        # Store filtered result, unless it already holds this version and condition
+        filtered_name = f"{data_name}_filtered"
+        source = (self.versions.get(data_name), condition)
+        if self.filter_sources.get(filtered_name) != (source, self.versions.get(filtered_name)):
+            self._store_dataframe(filtered_name, df if positions is None else df.iloc[positions])
+            self.filter_sources[filtered_name] = (source, self.versions[filtered_name])
+
+        result = {
+            "original_rows": len(df),
+            "filtered_rows": filtered_rows,
+            "filtered_name": filtered_name,
+        }
+        if used_indexes:
+            result["indexes_used"] = used_indexes
+        return result
+
+    def _build_indexes(self, **kwargs) -> Dict[str, Any]:
+        """Build sorted or hash indexes on columns of a stored dataframe.
+
+        Filters on the dataframe use them for equality, ``in`` and range
+        predicates. Indexes are dropped when the dataframe changes.
+        """
+        data_name = kwargs.get("name", "default")
+        columns = kwargs.get("columns")
+        kind = kwargs.get("kind", "auto")
+
         if data_name not in self.dataframes:
             raise ValueError(f"Dataset '{data_name}' not found")
+        if not columns:
+            raise ValueError("Columns are required to build an index")
 
         df = self.dataframes[data_name]
-        # Store filtered result
+        columns = [columns] if isinstance(columns, str) else columns
+        indexes = self.indexes.setdefault(data_name, {})
+        for col in columns:
+            indexes[col] = build_index(df[col], kind)
+
+        return {
+            "name": data_name,
+            "indexes": {col: index.kind for col, index in indexes.items()},
+        }
+
+    def _filter_stream(self, data_name: str, condition: Optional[str], output: Optional[str]) -> Dict[str, Any]:
+        """Filter a streamed dataset chunk by chunk.
+
+        Matching rows are appended to ``output`` and registered as a new
+        streamed dataset when an output path is given; otherwise they are
+        collected into an in-memory dataframe.
+        """
+        stream = self.streams[data_name]
         filtered_name = f"{data_name}_filtered"
-        self.dataframes[filtered_name] = df.query(condition) if condition else df
+        target = CSVStream(output, chunksize=stream.chunksize) if output else None
+        matches = []
+        filtered_rows = 0
+
+        for chunk in stream.chunks():
+            part = chunk.query(condition) if condition else chunk
+            filtered_rows += len(part)
+            if target is None:
+                matches.append(part)
+                continue
+            if not target.dtypes:
+                target.dtypes = part.dtypes.to_dict()
+            part.to_csv(output, mode="a" if target.stats.columns else "w",
+                        header=not target.stats.columns, index=False)
+            target.stats.update(part)
+
+        if target is not None:
+            self._store_stream(filtered_name, target)
+        else:
+            self._store_dataframe(filtered_name, pd.concat(matches, ignore_index=True))
 
         return {
-            "original_rows": len(df),
-            "filtered_rows": len(self.dataframes[filtered_name]),
+            "original_rows": stream.shape[0],
+            "filtered_rows": filtered_rows,
             "filtered_name": filtered_name,
         }
 
@@ -118,21 +566,279 @@ class DataAnalysisAgent(BaseAgent):
         group_by = kwargs.get("group_by")
         agg_func = kwargs.get("agg_func", "mean")
 
+        if group_by and (data_name in self.plans or kwargs.get("lazy")):
+            return self._plan_step(data_name, kwargs).aggregate(group_by, agg_func).describe()
+
+        if data_name in self.streams and group_by:
+            result = self._memoized(
+                "aggregate",
+                data_name,
+                {"group_by": group_by, "agg_func": agg_func},
+                lambda: self._aggregate_stream(self.streams[data_name], group_by, agg_func),
+                kwargs.get("cache", True),
+            )
+            return {**self._format_frame(result, "aggregated_data", kwargs), "groups": group_by}
+
         if data_name not in self.dataframes:
             raise ValueError(f"Dataset '{data_name}' not found")
 
         df = self.dataframes[data_name]
 
         if group_by:
-            result = df.groupby(group_by).agg(agg_func)
-            return {"aggregated_data": result.to_dict(), "groups": group_by}
+            def compute():
+                if kwargs.get("parallel"):
+                    workers = kwargs.get("workers") or self.aggregate_workers
+                    return parallel_aggregate(df, group_by, agg_func, self._get_aggregate_pool(), workers)
+                return df.groupby(group_by).agg(agg_func)
+
+            result = self._memoized(
+                "aggregate", data_name, {"group_by": group_by, "agg_func": agg_func}, compute, kwargs.get("cache", True)
+            )
+            return {**self._format_frame(result, "aggregated_data", kwargs), "groups": group_by}
         else:
             return {"message": "No grouping specified"}
 
+    def _aggregate_stream(self, stream: CSVStream, group_by: Any, agg_func: Any) -> pd.DataFrame:
+        """Aggregate a streamed dataset by merging per-chunk partial aggregates"""
+        spec = None
+        merged = None
+
+        for chunk in stream.chunks():
+            if spec is None:
+                spec = normalize_agg(chunk, group_by, agg_func)
+            partial = partial_aggregate(chunk, group_by, spec)
+            merged = partial if merged is None else merge_partials([merged, partial])
+
+        if merged is None:
+            raise ValueError("Cannot aggregate an empty stream")
+        return finalize_aggregate(merged, spec, agg_func)
+
+    def _store_dataframe(self, data_name: str, df: pd.DataFrame) -> None:
+        """Store a dataframe under a fresh version"""
+        self.dataframes[data_name] = df
+        self.streams.pop(data_name, None)
+        self.mark_modified(data_name)
+
+    def _store_stream(self, data_name: str, stream: CSVStream) -> None:
+        """Register a streamed dataset under a fresh version"""
+        self.streams[data_name] = stream
+        self.dataframes.pop(data_name, None)
+        self.mark_modified(data_name)
+
+    def mark_modified(self, name: str) -> int:
+        """Bump a dataset's version, e.g. after mutating it in place.
+
+        Cached results are keyed by version, so entries for older versions
+        are never served again and age out of the LRU.
+        """
+        self.versions[name] = next(self._version_counter)
+        self.append_lineage[name] = {self.versions[name]}
+        self.indexes.pop(name, None)
+        self.dataframes.mark_dirty(name)
+        return self.versions[name]
+
+    def _drop_cached_frames(self, name: str) -> None:
+        """Forget cached frame results of a spilled dataset, so they do not stay in memory in its place"""
+        self.result_cache.discard_where(
+            lambda key, value: key[1] == name and isinstance(value, (pd.DataFrame, pd.Series))
+        )
+
+    def _memoized(self, kind: str, data_name: str, args: Dict[str, Any], compute, use_cache: bool = True) -> Any:
+        """Return a cached result for (dataset version, task, args) or compute it.
+
+        Callers get a copy, so mutating a result cannot corrupt the cache.
+        """
+        if not use_cache:
+            return compute()
+
+        key = (kind, data_name, self.versions.get(data_name), json.dumps(args, sort_keys=True, default=str))
+        result = self.result_cache.get(key)
+        if result is None:
+            result = compute()
+            self.result_cache.put(key, result)
+        return _copy_result(result)
+
+    def _format_frame(self, frame: pd.DataFrame, key: str, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """Return a result inline, or as a paginated handle when it is large or as_handle is set"""
+        if not kwargs.get("as_handle") and len(frame) <= self.max_inline_rows:
+            return {key: frame.to_dict()}
+
+        handle = self._create_handle(frame)
+        return {**handle.describe(), "page": handle.page(0, kwargs.get("page_size", 100))}
+
+    def _create_handle(self, frame: pd.DataFrame) -> ResultHandle:
+        handle = ResultHandle(f"result_{next(self._handle_counter)}", frame)
+        self.results.put(handle.handle_id, handle)
+        return handle
+
+    def get_result(self, handle_id: str) -> ResultHandle:
+        """Get a result handle by id"""
+        handle = self.results.get(handle_id)
+        if handle is None:
+            raise ValueError(f"Result '{handle_id}' not found or expired")
+        return handle
+
+    def _fetch_result(self, **kwargs) -> Dict[str, Any]:
+        """Read one page of a result handle"""
+        handle = self.get_result(kwargs.get("handle"))
+        return handle.page(kwargs.get("offset", 0), kwargs.get("limit", 100))
+
+    def _get_aggregate_pool(self) -> ProcessPoolExecutor:
+        """Get the process pool used for parallel aggregation, creating it on first use"""
+        if self._aggregate_pool is None:
+            self._aggregate_pool = ProcessPoolExecutor(max_workers=self.aggregate_workers)
+        return self._aggregate_pool
+
+    def shutdown(self):
+        """Shut down the parallel aggregation pool"""
+        if self._aggregate_pool is not None:
+            self._aggregate_pool.shutdown()
+            self._aggregate_pool = None
+
+    def _plan_step(self, data_name: str, kwargs: Dict[str, Any]) -> QueryPlan:
+        """Get the lazy plan a step should be appended to, creating it if needed.
+
+        Steps addressed to an existing plan extend it; steps on a stored
+        dataframe start a new plan named ``plan_name`` (default ``<name>_plan``).
+        """
+        if data_name in self.plans:
+            return self.plans[data_name]
+        if data_name not in self.dataframes:
+            raise ValueError(f"Dataset '{data_name}' not found")
+
+        plan_name = kwargs.get("plan_name") or f"{data_name}_plan"
+        self.plans[plan_name] = QueryPlan(data_name)
+        return self.plans[plan_name]
+
+    def _get_plan(self, plan_name: str) -> QueryPlan:
+        if plan_name not in self.plans:
+            raise ValueError(f"Plan '{plan_name}' not found")
+        return self.plans[plan_name]
+
+    def _select_data(self, **kwargs) -> Dict[str, Any]:
+        """Lazily project columns"""
+        data_name = kwargs.get("name", "default")
+        columns = kwargs.get("columns")
+
+        if not columns:
+            raise ValueError("Columns are required for select")
+        return self._plan_step(data_name, kwargs).select(columns).describe()
+
+    def _sort_data(self, **kwargs) -> Dict[str, Any]:
+        """Lazily sort rows"""
+        data_name = kwargs.get("name", "default")
+        by = kwargs.get("by")
+
+        if not by:
+            raise ValueError("Sort columns are required")
+        return self._plan_step(data_name, kwargs).sort(by, kwargs.get("ascending", True)).describe()
+
+    def _explain_plan(self, **kwargs) -> Dict[str, Any]:
+        """Show a plan's steps and its optimized stages"""
+        return self._get_plan(kwargs.get("name", "default")).describe()
+
+    def _collect_plan(self, **kwargs) -> Dict[str, Any]:
+        """Execute a lazy plan once against its source dataframe"""
+        plan_name = kwargs.get("name", "default")
+        plan = self._get_plan(plan_name)
+
+        if plan.source not in self.dataframes:
+            raise ValueError(f"Dataset '{plan.source}' not found")
+
+        result = plan.execute(self.dataframes[plan.source])
+        store_as = kwargs.get("store_as")
+        if store_as:
+            self._store_dataframe(store_as, result)
+        if not kwargs.get("keep_plan", True):
+            del self.plans[plan_name]
+
+        if plan.is_aggregate:
+            return {**self._format_frame(result, "aggregated_data", kwargs), "rows": len(result), "stored_as": store_as}
+
+        if kwargs.get("as_handle"):
+            return {**self._create_handle(result).describe(), "stored_as": store_as}
+
+        return {
+            "rows": len(result),
+            "columns": list(result.columns),
+            "data": result.head(kwargs.get("limit", 100)).to_dict("records"),
+            "stored_as": store_as,
+        }
+
+    def drop_plan(self, name: str) -> None:
+        """Discard a lazy plan"""
+        self.plans.pop(name, None)
+
+    def list_plans(self) -> List[str]:
+        """List all lazy plans"""
+        return list(self.plans.keys())
+
+    def get_status(self) -> Dict[str, Any]:
+        """Get current agent status"""
+        status = super().get_status()
+        status["cache"] = self.result_cache.stats()
+        return status
+
     def get_dataframe(self, name: str = "default") -> Optional[pd.DataFrame]:
         """Get a stored dataframe"""
         return self.dataframes.get(name)
 
-    def list_dataframes(self) -> List[str]:
-        """List all stored dataframes"""
+    def list_dataframes(self, detailed: bool = False) -> List[Any]:
+        """List all stored dataframes.
+
+        With ``detailed=True``, each entry reports whether the frame is
+        resident or spilled to disk, its size in bytes and its pin state.
+        """
+        if detailed:
+            return self.dataframes.info()
         return list(self.dataframes.keys())
+
+    def pin_dataframe(self, name: str) -> None:
+        """Keep a stored dataframe in memory"""
+        self.dataframes.pin(name)
+
+    def unpin_dataframe(self, name: str) -> None:
+        """Allow a stored dataframe to be spilled to disk"""
+        self.dataframes.unpin(name)
+
+    def drop_dataframe(self, name: str) -> None:
+        """Remove a stored dataframe"""
+        self.dataframes.pop(name, None)
+        self.versions.pop(name, None)
+        self.indexes.pop(name, None)
+        self.sketches.pop(name, None)
+        self.append_lineage.pop(name, None)
+
+    def list_streams(self) -> List[str]:
+        """List all streamed datasets"""
+        return list(self.streams.keys())
+
+
+def _frozen(array: np.ndarray) -> np.ndarray:
+    """A read-only array, which cached results can share without copying"""
+    array.flags.writeable = False
+    return array
+
+
+def _copy_result(value: Any) -> Any:
+    """An independent copy of a cached result"""
+    if isinstance(value, np.ndarray) and not value.flags.writeable:
+        return value
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return value.copy()
+    return copy.deepcopy(value)
+
+
+def _estimate_size(value: Any) -> int:
+    """Rough size in bytes of a cached result"""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=True))
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(_estimate_size(k) + _estimate_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(_estimate_size(v) for v in value)
+    return sys.getsizeof(value)
@@ -0,0 +1,167 @@
+from typing import Any, List, Optional, Sequence
+import logging
+import os
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+FORMAT_SUFFIXES = {
+    ".parquet": "parquet",
+    ".pq": "parquet",
+    ".feather": "feather",
+    ".arrow": "feather",
+    ".ipc": "feather",
+    ".npy": "npy",
+}
+
+# Each format's own default codec: snappy for Parquet, none for Feather
+_DEFAULT_COMPRESSION = "default"
+
+# Filters use the pyarrow/pandas DNF convention: [(col, op, value), ...] is an
+# AND of predicates, and a list of such lists is an OR of ANDs.
+Filters = Sequence[Any]
+
+
+def detect_format(source: Any) -> Optional[str]:
+    """Detect a columnar/binary format from the file suffix"""
+    if not isinstance(source, (str, os.PathLike)):
+        return None
+    return FORMAT_SUFFIXES.get(os.path.splitext(str(source))[1].lower())
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        raise ImportError("pyarrow is required for Parquet and Feather support: pip install pyarrow")
+
+
+def read_dataset(
+    source: str,
+    fmt: str,
+    columns: Optional[List[str]] = None,
+    filters: Optional[Filters] = None,
+    memory_map: bool = True,
+) -> pd.DataFrame:
+    """Read a Parquet, Feather/Arrow IPC or .npy file.
+
+    Only ``columns`` are read, and ``filters`` are pushed down to row groups
+    (Parquet) or applied to the Arrow table before conversion to pandas.
+    """
+    if filters:
+        filters = _normalize_filters(filters)
+
+    if fmt == "parquet":
+        _require_pyarrow()
+        import pyarrow.parquet as pq
+
+        table = pq.read_table(source, columns=columns, filters=filters, memory_map=memory_map)
+        return table.to_pandas()
+
+    if fmt == "feather":
+        _require_pyarrow()
+        import pyarrow.feather as feather
+        import pyarrow.parquet as pq
+
+        read_columns = columns
+        if columns is not None and filters:
+            read_columns = list(dict.fromkeys(list(columns) + _filter_columns(filters)))
+        table = feather.read_table(source, columns=read_columns, memory_map=memory_map)
+        if filters:
+            table = table.filter(pq.filters_to_expression(filters))
+        if columns is not None:
+            table = table.select(columns)
+        return table.to_pandas()
+
+    if fmt == "npy":
+        array = np.load(source, mmap_mode="r" if memory_map else None, allow_pickle=False)
+        if not filters:
+            return _frame_from_array(array, columns)
+        read_columns = columns
+        if columns is not None:
+            read_columns = list(dict.fromkeys(list(columns) + _filter_columns(filters)))
+        df = _frame_from_array(array, read_columns)
+        df = df[_filters_mask(df, filters)]
+        return df if columns is None else df[columns]
+
+    raise ValueError(f"Unsupported dataset format: {fmt}")
+
+
+def write_dataset(df: pd.DataFrame, path: str, fmt: Optional[str] = None,
+                  compression: Optional[str] = _DEFAULT_COMPRESSION) -> str:
+    """Write a dataframe as Parquet, Feather/Arrow IPC or .npy; returns the format.
+
+    Parquet is snappy-compressed unless ``compression`` says otherwise;
+    ``compression=None`` writes it uncompressed.
+    """
+    fmt = fmt or detect_format(path)
+
+    if fmt == "parquet":
+        _require_pyarrow()
+        df.to_parquet(path, compression="snappy" if compression == _DEFAULT_COMPRESSION else compression)
+    elif fmt == "feather":
+        _require_pyarrow()
+        import pyarrow as pa
+        import pyarrow.feather as feather
+
+        feather.write_feather(pa.Table.from_pandas(df), path, compression=(
+            "uncompressed" if compression in (None, _DEFAULT_COMPRESSION) else compression
+        ))
+    elif fmt == "npy":
+        if not all(pd.api.types.is_numeric_dtype(dtype) for dtype in df.dtypes):
+            raise ValueError("Only numeric dataframes can be saved as .npy")
+        np.save(path, df.to_records(index=False), allow_pickle=False)
+    else:
+        raise ValueError(f"Unsupported dataset format: {fmt}")
+
+    logger.info(f"Saved dataframe to {path} ({fmt})")
+    return fmt
+
+
+def _frame_from_array(array: np.ndarray, columns: Optional[List[str]]) -> pd.DataFrame:
+    """Wrap a (possibly memory-mapped) array in a dataframe without copying"""
+    if array.dtype.names:
+        names = list(columns) if columns is not None else list(array.dtype.names)
+        return pd.DataFrame({name: array[name] for name in names}, copy=False)
+
+    if array.ndim == 1:
+        return pd.DataFrame({(columns or ["value"])[0]: array}, copy=False)
+
+    df = pd.DataFrame(array, copy=False)
+    if columns is not None:
+        df = df[[int(col) if str(col).isdigit() else col for col in columns]]
+    return df
+
+
+def _normalize_filters(filters: Filters) -> List[List[tuple]]:
+    """Normalize a filter (possibly decoded from JSON lists) to OR-of-AND tuples"""
+    groups = filters if isinstance(filters[0][0], (list, tuple)) else [filters]
+    return [[tuple(predicate) for predicate in group] for group in groups]
+
+
+def _filter_columns(filters: List[List[tuple]]) -> List[str]:
+    """Column names referenced by a normalized filter"""
+    return list(dict.fromkeys(col for group in filters for col, _, _ in group))
+
+
+def _filters_mask(df: pd.DataFrame, filters: List[List[tuple]]) -> np.ndarray:
+    """Evaluate a DNF filter against an in-memory dataframe"""
+    ops = {
+        "==": lambda s, v: s == v,
+        "=": lambda s, v: s == v,
+        "!=": lambda s, v: s != v,
+        "<": lambda s, v: s < v,
+        "<=": lambda s, v: s <= v,
+        ">": lambda s, v: s > v,
+        ">=": lambda s, v: s >= v,
+        "in": lambda s, v: s.isin(v),
+        "not in": lambda s, v: ~s.isin(v),
+    }
+    mask = np.zeros(len(df), dtype=bool)
+    for group in filters:
+        group_mask = np.ones(len(df), dtype=bool)
+        for col, op, value in group:
+            group_mask &= ops[op](df[col], value).to_numpy()
+        mask |= group_mask
+    return mask
@@ -0,0 +1,173 @@
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from collections import OrderedDict
+from collections.abc import MutableMapping
+import itertools
+import logging
+import os
+import shutil
+import tempfile
+import weakref
+import pandas as pd
+from .dataset_io import read_dataset, write_dataset
+
+logger = logging.getLogger(__name__)
+
+
+class _Entry:
+    __slots__ = ("frame", "path", "format", "bytes", "pinned")
+
+    def __init__(self, frame: pd.DataFrame, size: int):
+        self.frame = frame
+        self.path = None
+        self.format = None
+        self.bytes = size
+        self.pinned = False
+
+
+class DatasetRegistry(MutableMapping):
+    """Dict-like store of dataframes with a memory budget.
+
+    When resident frames exceed ``memory_budget`` bytes, the least recently
+    used unpinned frames are spilled to Feather files (pickle when a frame
+    cannot be written as Feather) and reloaded transparently on access.
+    A frame handed out may have been edited in place, so it is written out
+    afresh every time it is spilled. ``on_spill`` is called with the name
+    of each spilled frame.
+    """
+
+    def __init__(
+        self,
+        memory_budget: Optional[int] = None,
+        spill_dir: Optional[str] = None,
+        on_spill: Optional[Callable[[str], None]] = None,
+    ):
+        self.memory_budget = memory_budget
+        self.on_spill = on_spill
+        self._spill_dir = spill_dir
+        self._spill_ids = itertools.count()
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self.spills = 0
+        self.reloads = 0
+
+    def __getitem__(self, name: str) -> pd.DataFrame:
+        entry = self._entries[name]
+        self._entries.move_to_end(name)
+        if entry.frame is None:
+            entry.frame = self._reload(entry)
+            self.reloads += 1
+            self._enforce_budget(keep=name)
+        return entry.frame
+
+    def __setitem__(self, name: str, frame: pd.DataFrame) -> None:
+        old = self._entries.pop(name, None)
+        entry = _Entry(frame, int(frame.memory_usage(index=True, deep=True).sum()))
+        if old is not None:
+            entry.pinned = old.pinned
+            self._remove_file(old)
+        self._entries[name] = entry
+        self._enforce_budget(keep=name)
+
+    def __delitem__(self, name: str) -> None:
+        self._remove_file(self._entries.pop(name))
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._entries
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._entries))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def pin(self, name: str) -> None:
+        """Keep a dataframe resident, reloading it if it was spilled"""
+        self.__getitem__(name)
+        self._entries[name].pinned = True
+
+    def unpin(self, name: str) -> None:
+        """Allow a dataframe to be spilled again"""
+        self._entries[name].pinned = False
+        self._enforce_budget()
+
+    def mark_dirty(self, name: str) -> None:
+        """Drop the spill file of a frame that was mutated in place and re-measure it"""
+        entry = self._entries.get(name)
+        if entry is None or entry.frame is None:
+            return
+        self._remove_file(entry)
+        entry.path = None
+        entry.bytes = int(entry.frame.memory_usage(index=True, deep=True).sum())
+        self._enforce_budget(keep=name)
+
+    @property
+    def resident_bytes(self) -> int:
+        return sum(entry.bytes for entry in self._entries.values() if entry.frame is not None)
+
+    def info(self) -> List[Dict[str, Any]]:
+        """Residency, size and pin state of every entry, least recently used first"""
+        return [
+            {
+                "name": name,
+                "state": "resident" if entry.frame is not None else "spilled",
+                "bytes": entry.bytes,
+                "pinned": entry.pinned,
+                "path": entry.path,
+            }
+            for name, entry in self._entries.items()
+        ]
+
+    def is_resident(self, name: str) -> bool:
+        """Whether a dataframe is in memory, without reloading it"""
+        return self._entries[name].frame is not None
+
+    def spill_path(self, name: str) -> Optional[str]:
+        """On-disk location of a dataframe, if it has been spilled"""
+        entry = self._entries.get(name)
+        return entry.path if entry is not None else None
+
+    def _enforce_budget(self, keep: Optional[str] = None) -> None:
+        if self.memory_budget is None:
+            return
+        resident = self.resident_bytes
+        for name, entry in list(self._entries.items()):
+            if resident <= self.memory_budget:
+                break
+            if name == keep or entry.pinned or entry.frame is None:
+                continue
+            self._spill(name, entry)
+            resident -= entry.bytes
+
+    def _spill(self, name: str, entry: _Entry) -> None:
+        self._remove_file(entry)
+        base = os.path.join(self._get_spill_dir(), f"frame_{next(self._spill_ids)}")
+        try:
+            entry.path = base + ".feather"
+            entry.format = write_dataset(entry.frame, entry.path, "feather")
+        except Exception:
+            # Non-string column names, MultiIndex columns or no pyarrow
+            if os.path.exists(entry.path):
+                os.remove(entry.path)
+            entry.path = base + ".pkl"
+            entry.format = "pickle"
+            entry.frame.to_pickle(entry.path)
+        entry.frame = None
+        self.spills += 1
+        logger.info(f"Spilled dataframe '{name}' ({entry.bytes} bytes) to {entry.path}")
+        if self.on_spill is not None:
+            self.on_spill(name)
+
+    def _reload(self, entry: _Entry) -> pd.DataFrame:
+        if entry.format == "pickle":
+            return pd.read_pickle(entry.path)
+        return read_dataset(entry.path, entry.format)
+
+    def _remove_file(self, entry: _Entry) -> None:
+        if entry.path and os.path.exists(entry.path):
+            os.remove(entry.path)
+
+    def _get_spill_dir(self) -> str:
+        if self._spill_dir is None:
+            self._spill_dir = tempfile.mkdtemp(prefix="dataset_spill_")
+            weakref.finalize(self, shutil.rmtree, self._spill_dir, True)
+        os.makedirs(self._spill_dir, exist_ok=True)
+        return self._spill_dir
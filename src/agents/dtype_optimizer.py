@@ -0,0 +1,95 @@
+from typing import Any, Dict
+import warnings
+import numpy as np
+import pandas as pd
+
+
+def memory_usage(df: pd.DataFrame) -> int:
+    """Deep memory footprint of a dataframe in bytes"""
+    return int(df.memory_usage(deep=True).sum())
+
+
+def optimize_dtypes(
+    df: pd.DataFrame,
+    category_threshold: float = 0.5,
+    parse_dates: bool = True,
+    downcast_integers: bool = False,
+) -> pd.DataFrame:
+    """Return a copy of ``df`` with compact dtypes.
+
+    Floats are downcast to float32 only when that is lossless, string columns
+    that parse with a single inferred datetime format become datetimes, and
+    string columns with at most ``category_threshold`` unique values per row
+    become categoricals. Integers keep their type unless ``downcast_integers``
+    is set, since arithmetic in later filters would wrap around in a narrow
+    type; even then they are only downcast to signed types.
+    """
+    columns = {}
+    for col in df.columns:
+        columns[col] = _optimize_series(df[col], category_threshold, parse_dates, downcast_integers)
+    return pd.DataFrame(columns, index=df.index)
+
+
+def _optimize_series(
+    series: pd.Series, category_threshold: float, parse_dates: bool, downcast_integers: bool
+) -> pd.Series:
+    if pd.api.types.is_bool_dtype(series) or isinstance(series.dtype, pd.CategoricalDtype):
+        return series
+
+    if pd.api.types.is_integer_dtype(series):
+        if downcast_integers and pd.api.types.is_signed_integer_dtype(series):
+            return pd.to_numeric(series, downcast="integer")
+        return series
+
+    if pd.api.types.is_float_dtype(series):
+        downcast = series.astype(np.float32)
+        if np.array_equal(downcast.to_numpy(dtype=np.float64), series.to_numpy(dtype=np.float64), equal_nan=True):
+            return downcast
+        return series
+
+    if pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series):
+        non_null = series.dropna()
+        if len(non_null) == 0:
+            return series
+        if parse_dates:
+            parsed = _parse_datetimes(series, non_null)
+            if parsed is not None:
+                return parsed
+        try:
+            if non_null.nunique() <= category_threshold * len(non_null):
+                return series.astype("category")
+        except TypeError:
+            # Unhashable values such as lists cannot be categorized
+            pass
+
+    return series
+
+
+def _parse_datetimes(series: pd.Series, non_null: pd.Series):
+    """Parse a string column as datetimes if pandas can infer one format"""
+    if not all(isinstance(value, str) for value in non_null.iloc[:100]):
+        return None
+    try:
+        with warnings.catch_warnings():
+            # pandas warns when it falls back to per-element dateutil parsing,
+            # which is both slow and the sign of a column that is not dates
+            warnings.simplefilter("error")
+            return pd.to_datetime(series)
+    except (ValueError, TypeError, OverflowError, UserWarning):
+        return None
+
+
+def optimization_report(before: pd.DataFrame, after: pd.DataFrame) -> Dict[str, Any]:
+    """Summarize the memory saved by an optimization"""
+    bytes_before = memory_usage(before)
+    bytes_after = memory_usage(after)
+    return {
+        "memory_bytes_before": bytes_before,
+        "memory_bytes_after": bytes_after,
+        "memory_reduction": round(1 - bytes_after / bytes_before, 4) if bytes_before else 0.0,
+        "optimized_dtypes": {
+            col: str(after[col].dtype)
+            for col in after.columns
+            if after[col].dtype != before[col].dtype
+        },
+    }
@@ -0,0 +1,195 @@
+from typing import Any, Dict, List, Optional, Tuple
+import ast
+import numpy as np
+import pandas as pd
+
+
+Predicate = Tuple[str, str, Any]
+
+_FLIPPED = {"<": ">", "<=": ">=", ">": "<", ">=": "<=", "==": "==", "!=": "!="}
+_AST_OPS = {
+    ast.Eq: "==",
+    ast.NotEq: "!=",
+    ast.Lt: "<",
+    ast.LtE: "<=",
+    ast.Gt: ">",
+    ast.GtE: ">=",
+    ast.In: "in",
+}
+
+
+class SortedIndex:
+    """Column values sorted once, answering equality and range lookups by binary search"""
+
+    kind = "sorted"
+
+    def __init__(self, values: pd.Series):
+        array = values.to_numpy()
+        valid = np.flatnonzero(values.notna().to_numpy())
+        order = valid[np.argsort(array[valid], kind="stable")]
+        self.positions = order
+        self.values = array[order]
+
+    def lookup(self, op: str, value: Any) -> Optional[np.ndarray]:
+        values = self.values
+        if op == "==":
+            return self.positions[np.searchsorted(values, value, "left"): np.searchsorted(values, value, "right")]
+        if op == "in":
+            return np.concatenate([self.lookup("==", v) for v in dict.fromkeys(value)] or [np.empty(0, dtype=np.int64)])
+        if op == ">":
+            return self.positions[np.searchsorted(values, value, "right"):]
+        if op == ">=":
+            return self.positions[np.searchsorted(values, value, "left"):]
+        if op == "<":
+            return self.positions[: np.searchsorted(values, value, "left")]
+        if op == "<=":
+            return self.positions[: np.searchsorted(values, value, "right")]
+        return None
+
+
+class HashIndex:
+    """Row positions grouped by value, answering equality and membership lookups"""
+
+    kind = "hash"
+
+    def __init__(self, values: pd.Series):
+        positions = pd.Series(np.arange(len(values)), index=values.index)
+        self.groups = positions.groupby(values.to_numpy(), sort=False, observed=True).indices
+
+    def lookup(self, op: str, value: Any) -> Optional[np.ndarray]:
+        empty = np.empty(0, dtype=np.int64)
+        if op == "==":
+            return self.groups.get(value, empty)
+        if op == "in":
+            return np.concatenate([self.groups.get(v, empty) for v in dict.fromkeys(value)] or [empty])
+        return None
+
+
+def build_index(values: pd.Series, kind: str = "auto"):
+    """Build a sorted (range + equality) or hash (equality only) index"""
+    if kind == "auto":
+        categorical = isinstance(values.dtype, pd.CategoricalDtype)
+        kind = "hash" if categorical or pd.api.types.is_object_dtype(values) else "sorted"
+    if kind == "sorted":
+        return SortedIndex(values)
+    if kind == "hash":
+        return HashIndex(values)
+    raise ValueError(f"Unknown index kind: {kind}")
+
+
+def split_condition(condition: str) -> Tuple[List[Predicate], List[str]]:
+    """Split a ``DataFrame.query`` condition into simple predicates and the rest.
+
+    Only top-level conjunctions are split. Each ``column <op> literal``
+    comparison (including chained ranges such as ``1 < x <= 5``) becomes a
+    predicate; any other conjunct is returned as residual query text.
+    Conditions with a top-level ``or`` come back whole as residual.
+    """
+    try:
+        tree = ast.parse(condition.strip(), mode="eval").body
+    except SyntaxError:
+        return [], [condition]
+
+    predicates, residual = [], []
+    for node in _conjuncts(tree):
+        parsed = _predicates(node)
+        if parsed is None:
+            residual.append(ast.get_source_segment(condition.strip(), node) or ast.unparse(node))
+        else:
+            predicates.extend(parsed)
+    return predicates, residual
+
+
+def _conjuncts(node: ast.AST) -> List[ast.AST]:
+    if isinstance(node, ast.BoolOp) and isinstance(node.op, ast.And):
+        return [leaf for value in node.values for leaf in _conjuncts(value)]
+    if isinstance(node, ast.BinOp) and isinstance(node.op, ast.BitAnd):
+        return _conjuncts(node.left) + _conjuncts(node.right)
+    return [node]
+
+
+def _predicates(node: ast.AST) -> Optional[List[Predicate]]:
+    if not isinstance(node, ast.Compare):
+        return None
+    operands = [node.left] + node.comparators
+    predicates = []
+    for left, op, right in zip(operands, node.ops, operands[1:]):
+        symbol = _AST_OPS.get(type(op))
+        if symbol is None:
+            return None
+        if isinstance(left, ast.Name) and _is_literal(right):
+            predicates.append((left.id, symbol, ast.literal_eval(right)))
+        elif isinstance(right, ast.Name) and _is_literal(left) and symbol != "in":
+            predicates.append((right.id, _FLIPPED[symbol], ast.literal_eval(left)))
+        else:
+            return None
+    return predicates
+
+
+def _is_literal(node: ast.AST) -> bool:
+    try:
+        ast.literal_eval(node)
+        return True
+    except ValueError:
+        return False
+
+
+def indexed_filter(
+    df: pd.DataFrame, condition: str, indexes: Dict[str, Any]
+) -> Tuple[Optional[pd.DataFrame], List[str]]:
+    """Evaluate ``condition`` using indexes for the predicates they cover.
+
+    Returns the filtered frame (rows in original order, as ``df.query``
+    would) and the indexed columns used, or ``(None, [])`` when no index
+    applies and a full scan is needed.
+    """
+    positions, used = indexed_positions(df, condition, indexes)
+    if positions is None:
+        return None, []
+    return df.iloc[positions], used
+
+
+def indexed_positions(
+    df: pd.DataFrame, condition: str, indexes: Dict[str, Any]
+) -> Tuple[Optional[np.ndarray], List[str]]:
+    """Sorted row positions matching ``condition``, like ``indexed_filter``"""
+    predicates, residual = split_condition(condition)
+    positions = None
+    used = []
+
+    for col, op, value in predicates:
+        index = indexes.get(col)
+        matched = None
+        if index is not None:
+            try:
+                matched = index.lookup(op, _coerce(df[col], value))
+            except (TypeError, ValueError):
+                matched = None
+        if matched is None:
+            residual.append(f"{col} {op} {value!r}")
+            continue
+        positions = matched if positions is None else np.intersect1d(positions, matched, assume_unique=True)
+        used.append(col)
+
+    if positions is None:
+        return None, []
+
+    positions = np.sort(positions)
+    if residual:
+        expr = " and ".join(f"({part})" for part in residual)
+        positions = positions[query_mask(df.iloc[positions], expr)]
+    return positions, used
+
+
+def query_mask(df: pd.DataFrame, condition: str) -> np.ndarray:
+    """The boolean row mask ``df.query(condition)`` selects"""
+    return np.asarray(df.eval(condition), dtype=bool)
+
+
+def _coerce(column: pd.Series, value: Any) -> Any:
+    """Convert a literal to the column's type where comparisons need it"""
+    if pd.api.types.is_datetime64_any_dtype(column):
+        if isinstance(value, (list, tuple)):
+            return [pd.Timestamp(v).to_datetime64() for v in value]
+        return pd.Timestamp(value).to_datetime64()
+    return value
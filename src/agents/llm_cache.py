@@ -0,0 +1,168 @@
+from typing import Any, Dict, Optional
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+from .cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+
+_PIECES = re.compile(r"\w+|[^\w\s]")
+
+
+def estimate_tokens(text: str) -> int:
+    """Fast local token estimate for when the provider reports no usage.
+
+    Counts words and punctuation marks, with long words costing one token
+    per four characters, which tracks BPE tokenizers closely on English
+    text without loading a vocabulary.
+    """
+    if not text:
+        return 0
+    return sum((len(piece) + 3) // 4 for piece in _PIECES.findall(text))
+
+
+def cache_key(provider: str, model: str, temperature: float, max_tokens: int, prompt: str, **extra: Any) -> str:
+    """Exact-match key over the parameters that determine a completion"""
+    prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+    params = {
+        "provider": provider,
+        "model": model,
+        "temperature": temperature,
+        "max_tokens": max_tokens,
+        "prompt": prompt_hash,
+        **extra,
+    }
+    return hashlib.sha256(json.dumps(params, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Exact-match LLM response cache with TTL and LRU limits.
+
+    Entries live in an in-memory LRU and, when ``path`` is set, in a SQLite
+    file that survives restarts and is bounded by ``max_disk_entries``.
+    Expired entries are never returned and are purged lazily.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl: Optional[float] = 24 * 3600,
+        path: Optional[str] = None,
+        max_disk_entries: int = 100000,
+    ):
+        self.ttl = ttl
+        self.path = path
+        self.max_disk_entries = max_disk_entries
+        self._memory = LRUCache(max_entries)
+        self._lock = threading.Lock()
+        self._db = None
+        self.hits = 0
+        self.misses = 0
+        self.saved_tokens = 0
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, response TEXT, tokens INTEGER, created REAL, accessed REAL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+            self._db.commit()
+
+    def _expired(self, created: float, now: float) -> bool:
+        return self.ttl is not None and now - created > self.ttl
+
+    def get(self, key: str) -> Optional[str]:
+        """The cached response for ``key``, or None on a miss or expiry"""
+        now = time.time()
+        entry = self._memory.get(key)
+        if entry is not None and self._expired(entry["created"], now):
+            self._memory.pop(key)
+            entry = None
+        if entry is None and self._db is not None:
+            entry = self._disk_get(key, now)
+            if entry is not None:
+                self._memory.put(key, entry)
+
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.saved_tokens += entry["tokens"]
+        return entry["response"]
+
+    def put(self, key: str, response: str, tokens: int) -> None:
+        entry = {"response": response, "tokens": tokens, "created": time.time()}
+        self._memory.put(key, entry)
+        if self._db is None:
+            return
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                (key, response, tokens, entry["created"], entry["created"]),
+            )
+            count = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            if count > self.max_disk_entries:
+                self._db.execute(
+                    "DELETE FROM responses WHERE key IN "
+                    "(SELECT key FROM responses ORDER BY accessed LIMIT ?)",
+                    (count - self.max_disk_entries,),
+                )
+            self._db.commit()
+
+    def _disk_get(self, key: str, now: float) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT response, tokens, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if self._expired(row[2], now):
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._db.commit()
+                return None
+            self._db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self._db.commit()
+        return {"response": row[0], "tokens": row[1], "created": row[2]}
+
+    def purge_expired(self) -> int:
+        """Delete expired entries from disk, returning how many were removed"""
+        if self._db is None or self.ttl is None:
+            return 0
+        with self._lock:
+            removed = self._db.execute(
+                "DELETE FROM responses WHERE created < ?", (time.time() - self.ttl,)
+            ).rowcount
+            self._db.commit()
+        return removed
+
+    def clear(self) -> None:
+        self._memory.clear()
+        if self._db is not None:
+            with self._lock:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        stats = {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "saved_tokens": self.saved_tokens,
+            "memory_entries": len(self._memory),
+        }
+        if self._db is not None:
+            with self._lock:
+                stats["disk_entries"] = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        return stats
@@ -1,131 +1,718 @@
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from collections import deque
 import logging
 from .base_agent import BaseAgent
+from .conversation_memory import ConversationMemory
+from .llm_cache import ResponseCache, cache_key, estimate_tokens
+from .llm_metrics import LLMMetrics
+from .llm_providers import ProviderAdapter, get_adapter
+from .llm_resilience import LatencyTracker, is_retryable, retry_delay
+from .prompt_templates import TemplateRegistry, default_templates
+from .semantic_cache import SemanticCache
+from .text_chunking import chunk_text, pack_texts
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+import hashlib
 import os
+import random
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
 
+NOT_INITIALIZED = "LLM client not initialized. Please install required packages and set API key."
+
+
 class LLMIntegrationAgent(BaseAgent):
-    """Agent for integrating with LLM providers (OpenAI, Claude)"""
+    """Agent for integrating with LLM providers (OpenAI, Claude, or an offline mock)
+
+    Provider adapters are shared: agents with the same provider, API key and
+    connection settings reuse one pooled HTTP client. Calls given a
+    ``conversation_id`` are multi-turn: recent exchanges of that conversation
+    are sent along, with older ones summarized to stay within
+    ``context_tokens``. Every call's tokens, latency and cost are recorded
+    per ``task_name`` (``"execute"`` unless given), model and ``caller``, and
+    calls are rejected once a budget on any of those keys is spent.
+
+    Transient provider errors are retried with jittered exponential backoff,
+    then the ``fallbacks`` (``{"provider", "model", "api_key"}`` entries) are
+    tried in order. With ``hedge_after`` (seconds, or a latency quantile such
+    as ``"p95"`` of recent calls) a second request is sent when the first is
+    slower than that, and whichever answers first is used.
+
+    Tasks can name a registered prompt ``template`` with its ``variables``.
+    The template's static instructions are sent as a stable system prefix;
+    prefixes of at least ``prefix_cache_tokens`` are marked for provider-side
+    prompt caching, and cached prompt tokens are reported in the metrics.
+    """
 
-    def __init__(self, provider: str = "openai", api_key: Optional[str] = None):
+    def __init__(
+        self,
+        provider: str = "openai",
+        api_key: Optional[str] = None,
+        cache: Optional[ResponseCache] = None,
+        cache_path: Optional[str] = None,
+        cache_ttl: Optional[float] = 24 * 3600,
+        cache_entries: int = 1024,
+        semantic_cache: Any = None,
+        semantic_threshold: float = 0.9,
+        max_concurrency: int = 8,
+        adapter: Optional[ProviderAdapter] = None,
+        max_connections: int = 20,
+        timeout: float = 60.0,
+        provider_options: Optional[Dict[str, Any]] = None,
+        memory: Optional[ConversationMemory] = None,
+        context_tokens: int = 2000,
+        history_limit: int = 1000,
+        chunk_tokens: int = 3000,
+        chunk_overlap: int = 200,
+        metrics: Optional[LLMMetrics] = None,
+        budgets: Optional[Dict[str, Dict[str, Any]]] = None,
+        prices: Optional[Dict[str, Any]] = None,
+        max_retries: int = 2,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8.0,
+        hedge_after: Any = None,
+        fallbacks: Optional[List[Dict[str, Any]]] = None,
+        templates: Optional[TemplateRegistry] = None,
+        prefix_cache_tokens: int = 1024,
+    ):
         super().__init__(
             name="LLMIntegrationAgent",
             description=f"Integrates with {provider} for AI-powered tasks",
         )
         self.provider = provider.lower()
         self.api_key = api_key or os.getenv(f"{provider.upper()}_API_KEY")
-        self.conversation_history = []
+        self.conversation_history = deque(maxlen=history_limit)
+        self.memory = memory if memory is not None else ConversationMemory(context_tokens=context_tokens)
+        self.cache = cache or ResponseCache(cache_entries, cache_ttl, cache_path)
+        if semantic_cache is True:
+            semantic_cache = SemanticCache(threshold=semantic_threshold, ttl=cache_ttl)
+        self.semantic_cache = semantic_cache if isinstance(semantic_cache, SemanticCache) else None
+        self.usage = {"prompt_tokens": 0, "completion_tokens": 0, "cached_prompt_tokens": 0}
+        self.templates = templates if templates is not None else default_templates()
+        self.prefix_cache_tokens = prefix_cache_tokens
+        self.max_concurrency = max_concurrency
+        self.chunk_tokens = chunk_tokens
+        self.chunk_overlap = chunk_overlap
+        self.metrics = metrics if metrics is not None else LLMMetrics(prices=prices, budgets=budgets)
+        self._usage_lock = threading.Lock()
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge_after = hedge_after
+        self.latencies = LatencyTracker()
+        self._random = random.Random()
+        self._hedge_pool = None
+        if hedge_after is not None:
+            self._hedge_pool = ThreadPoolExecutor(max_workers=2 * max_concurrency, thread_name_prefix="llm-hedge")
+        self.adapter = adapter
         self.client = None
-        self._initialize_client()
+        self._initialize_client(max_connections, timeout, provider_options or {})
+        self.fallbacks = self._initialize_fallbacks(fallbacks or [], max_connections, timeout)
 
-    def _initialize_client(self):
-        """Initialize the LLM client based on provider"""
-        try:
-            if self.provider == "openai":
-                try:
-                    import openai
-                    if self.api_key:
-                        openai.api_key = self.api_key
-                    self.client = openai
-                    logger.info("OpenAI client initialized")
-                except ImportError:
-                    logger.warning("openai package not installed")
-
-            elif self.provider == "anthropic" or self.provider == "claude":
-                try:
-                    import anthropic
-                    if self.api_key:
-                        self.client = anthropic.Anthropic(api_key=self.api_key)
-                    logger.info("Anthropic client initialized")
-                except ImportError:
-                    logger.warning("anthropic package not installed")
+    def _initialize_client(self, max_connections: int, timeout: float, provider_options: Dict[str, Any]):
+        """Attach the shared provider adapter (and its pooled HTTP client)"""
+        if self.adapter is None:
+            try:
+                if self.provider != "mock" and not self.api_key:
+                    logger.warning(f"No API key set for {self.provider}")
+                else:
+                    self.adapter = get_adapter(
+                        self.provider,
+                        self.api_key,
+                        max_connections=max_connections,
+                        timeout=timeout,
+                        **provider_options,
+                    )
+                    logger.info(f"{self.provider} adapter initialized")
+            except ImportError:
+                logger.warning(f"{self.provider} package not installed")
+            except Exception as e:
+                logger.error(f"Failed to initialize {self.provider} client: {str(e)}")
 
-        except Exception as e:
-            logger.error(f"Failed to initialize {self.provider} client: {str(e)}")
+        self.client = getattr(self.adapter, "client", self.adapter)
+
+    def _initialize_fallbacks(
+        self, fallbacks: List[Dict[str, Any]], max_connections: int, timeout: float
+    ) -> List[Tuple[ProviderAdapter, Optional[str]]]:
+        """Resolve fallback entries to (adapter, model) pairs, skipping providers that cannot be set up"""
+        targets = []
+        for fallback in fallbacks:
+            adapter = fallback.get("adapter")
+            provider = fallback.get("provider", self.provider).lower()
+            if adapter is None:
+                api_key = fallback.get("api_key") or (
+                    self.api_key if provider == self.provider else os.getenv(f"{provider.upper()}_API_KEY")
+                )
+                if provider != "mock" and not api_key:
+                    logger.warning(f"No API key set for fallback {provider}")
+                    continue
+                try:
+                    adapter = get_adapter(
+                        provider,
+                        api_key,
+                        max_connections=max_connections,
+                        timeout=timeout,
+                        **fallback.get("provider_options", {}),
+                    )
+                except Exception as e:
+                    logger.warning(f"Failed to initialize fallback {provider}: {str(e)}")
+                    continue
+            targets.append((adapter, fallback.get("model")))
+        return targets
 
     def execute(self, task: str, **kwargs) -> Dict[str, Any]:
         """Execute an LLM-powered task"""
         logger.info(f"Executing LLM task: {task}")
 
         try:
-            prompt = kwargs.get("prompt", task)
-            result = self._generate_response(prompt, **kwargs)
+            if "prompts" in kwargs:
+                prompts = kwargs.pop("prompts")
+                results = self.batch_execute(prompts, task, task_name=kwargs.pop("task_name", "batch"), **kwargs)
+                return {
+                    "status": "success",
+                    "task": task,
+                    "results": results,
+                    "failed": sum(result["status"] == "failed" for result in results),
+                    "provider": self.provider,
+                    "history_length": len(self.conversation_history),
+                }
+
+            prompt = self._resolve_prompt(task, kwargs)
+            completion = self._complete(prompt, **{"task_name": "execute", **kwargs})
+            result = completion["text"]
 
             self.conversation_history.append({
                 "prompt": prompt,
                 "response": result,
             })
 
-            return {
+            response = {
                 "status": "success",
                 "task": task,
                 "response": result,
                 "provider": self.provider,
+                "cached": completion["cached"],
                 "history_length": len(self.conversation_history),
             }
+            if kwargs.get("conversation_id") is not None:
+                response["conversation_id"] = kwargs["conversation_id"]
+            return response
 
         except Exception as e:
             logger.error(f"LLM task failed: {str(e)}")
             return {"status": "failed", "task": task, "error": str(e)}
 
+    def _resolve_prompt(self, task: str, kwargs: Dict[str, Any]) -> str:
+        """Pop the prompt from ``kwargs``, rendering a ``template`` and setting its ``prefix`` if one is named"""
+        template = kwargs.pop("template", None)
+        if template is None:
+            return kwargs.pop("prompt", task)
+        rendered = self.templates.render(template, **kwargs.pop("variables", {}))
+        kwargs["prefix"] = rendered["system"]
+        return rendered["prompt"]
+
+    def register_template(self, name: str, system: str, template: str = "{text}") -> None:
+        """Add a prompt template: static ``system`` instructions and a ``template`` with ``{field}`` slots"""
+        self.templates.register(name, system, template)
+
     def _generate_response(self, prompt: str, **kwargs) -> str:
-        """Generate response from LLM"""
-        if not self.client:
-            return "LLM client not initialized. Please install required packages and set API key."
+        """Generate response from LLM, raising if every attempt failed"""
+        return self._complete(prompt, **kwargs)["text"]
+
+    def _complete(self, prompt: str, **kwargs) -> Dict[str, Any]:
+        """Generate a response, serving repeated deterministic prompts from the cache.
+
+        Calls are cached when ``temperature`` is 0, or when ``cache=True`` is
+        passed explicitly; ``cache=False`` always calls the provider. With a
+        semantic cache configured, exact misses fall back to near-duplicate
+        prompts unless ``semantic=False`` is passed. With a ``conversation_id``
+        the call carries that conversation's context and is added to it.
+        Raises the last provider error once retries and fallbacks are spent.
+        """
+        if self.adapter is None:
+            return {"text": NOT_INITIALIZED, "cached": False}
+
+        request = self._prepare_request(prompt, kwargs)
+        cached = self._lookup_cache(prompt, request)
+        if cached is not None:
+            self._observe(request, cached=True)
+            self._remember(prompt, cached["text"], request)
+            return cached
+
+        self.metrics.check_budget(self._metric_keys(request))
+        for adapter, model in self._attempts(request):
+            try:
+                text, usage = self._hedged_call(adapter, model, prompt, request)
+                break
+            except Exception as e:
+                request["error"] = e
+        else:
+            logger.error(f"Error generating response: {str(request['error'])}")
+            self._observe(request, error=True)
+            raise request["error"]
 
-        model = kwargs.get("model")
+        self._record_completion(prompt, text, usage, request)
+        self._remember(prompt, text, request)
+        return {"text": text, "cached": False}
+
+    def _prepare_request(self, prompt: str, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """Resolve generation parameters and the caches a call may use"""
+        model = kwargs.get("model") or self.adapter.default_model
         temperature = kwargs.get("temperature", 0.7)
         max_tokens = kwargs.get("max_tokens", 1000)
+        use_cache = kwargs.get("cache")
+        if use_cache is None:
+            use_cache = temperature == 0
+        conversation_id = kwargs.get("conversation_id")
+        context = self.memory.build_context(conversation_id, prompt) if conversation_id is not None else None
+        prefix = kwargs.get("prefix")
+        if prefix:
+            context = dict(context or {"system": None, "messages": [{"role": "user", "content": prompt}]})
+            context["prefix"] = prefix
+            context["cache_prefix"] = estimate_tokens(prefix) >= self.prefix_cache_tokens
+        prefix_hash = hashlib.sha256(prefix.encode("utf-8")).hexdigest()[:16] if prefix else ""
 
-        try:
-            if self.provider == "openai":
-                model = model or "gpt-3.5-turbo"
-                response = self.client.ChatCompletion.create(
-                    model=model,
-                    messages=[{"role": "user", "content": prompt}],
-                    temperature=temperature,
-                    max_tokens=max_tokens,
-                )
-                return response.choices[0].message.content
-
-            elif self.provider in ["anthropic", "claude"]:
-                model = model or "claude-3-sonnet-20240229"
-                message = self.client.messages.create(
-                    model=model,
-                    max_tokens=max_tokens,
-                    temperature=temperature,
-                    messages=[{"role": "user", "content": prompt}],
-                )
-                return message.content[0].text
+        return {
+            "model": model,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "task": kwargs.get("task_name", "completion"),
+            "caller": kwargs.get("caller", "default"),
+            "started": time.perf_counter(),
+            "ttfb": None,
+            "retries": 0,
+            "hedged": False,
+            "failovers": 0,
+            "error": None,
+            "conversation_id": conversation_id,
+            "context": context,
+            # A conversational reply depends on the whole context, so only exact matches on it are reused
+            "key": cache_key(self.provider, model, temperature, max_tokens, prompt, context=context)
+            if use_cache else None,
+            "semantic": self.semantic_cache
+            if use_cache and conversation_id is None and kwargs.get("semantic", True) else None,
+            "scope": f"{self.provider}|{model}|{temperature}|{max_tokens}|{prefix_hash}",
+        }
 
-        except Exception as e:
-            logger.error(f"Error generating response: {str(e)}")
-            return f"Error: {str(e)}"
+    def _lookup_cache(self, prompt: str, request: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if request["key"] is not None:
+            cached = self.cache.get(request["key"])
+            if cached is not None:
+                return {"text": cached, "cached": True}
+        if request["semantic"] is not None:
+            match = request["semantic"].get(prompt, request["scope"])
+            if match is not None:
+                return {"text": match["response"], "cached": True, "similarity": match["similarity"]}
+        return None
+
+    def _record_completion(self, prompt: str, text: str, usage: Dict[str, int], request: Dict[str, Any]) -> None:
+        """Account token usage and store a fresh completion in the caches"""
+        with self._usage_lock:
+            for field in self.usage:
+                self.usage[field] += usage.get(field, 0)
+        self._observe(request, usage)
+        tokens = usage["prompt_tokens"] + usage["completion_tokens"]
+        if request["key"] is not None:
+            self.cache.put(request["key"], text, tokens)
+        if request["semantic"] is not None:
+            request["semantic"].put(prompt, text, tokens, request["scope"])
+
+    def _observe(
+        self,
+        request: Dict[str, Any],
+        usage: Optional[Dict[str, int]] = None,
+        cached: bool = False,
+        error: bool = False,
+    ) -> None:
+        usage = usage or {}
+        self.metrics.record(
+            self._metric_keys(request),
+            request["model"],
+            prompt_tokens=usage.get("prompt_tokens", 0),
+            completion_tokens=usage.get("completion_tokens", 0),
+            latency=time.perf_counter() - request["started"],
+            ttfb=request["ttfb"],
+            retries=request["retries"],
+            hedged=request["hedged"],
+            failovers=request["failovers"],
+            cached_prompt_tokens=usage.get("cached_prompt_tokens", 0),
+            prefix_cached=bool(request["context"] and request["context"].get("cache_prefix")),
+            cached=cached,
+            error=error,
+        )
+
+    @staticmethod
+    def _metric_keys(request: Dict[str, Any]) -> List[str]:
+        return LLMMetrics.keys(request["task"], request["model"], request["caller"])
+
+    def _remember(self, prompt: str, text: str, request: Dict[str, Any]) -> None:
+        if request["conversation_id"] is not None:
+            self.memory.record(request["conversation_id"], prompt, text)
+
+    def _attempts(self, request: Dict[str, Any]) -> Iterator[Tuple[ProviderAdapter, str]]:
+        """Yield the (adapter, model) to try next until the caller stops after a success.
+
+        Callers store each failure in ``request["error"]``. Retryable errors
+        are retried on the same target after a backoff; otherwise, or once
+        retries are spent, the next fallback is tried. ``request["model"]``
+        is set to the model being tried, so metrics and costs follow it.
+        """
+        targets = [(self.adapter, request["model"])]
+        targets += [(adapter, model or adapter.default_model) for adapter, model in self.fallbacks]
+        for index, (adapter, model) in enumerate(targets):
+            if index:
+                request["failovers"] += 1
+                logger.warning(f"Failing over to {adapter.name}/{model}: {str(request['error'])}")
+            request["model"] = model
+            for attempt in range(self.max_retries + 1):
+                yield adapter, model
+                error = request["error"]
+                if attempt == self.max_retries or not is_retryable(error):
+                    break
+                delay = retry_delay(error, attempt, self.backoff_base, self.backoff_max, self._random)
+                logger.warning(f"Retrying {adapter.name}/{model} in {delay:.2f}s: {str(error)}")
+                request["retries"] += 1
+                time.sleep(delay)
+
+    def _hedge_threshold(self, target: Tuple[str, str]) -> Optional[float]:
+        hedge_after = self.hedge_after
+        if isinstance(hedge_after, str) and hedge_after.startswith("p"):
+            return self.latencies.quantile(target, float(hedge_after[1:]) / 100)
+        return hedge_after
+
+    def _hedged_call(self, adapter: ProviderAdapter, model: str, prompt: str, request: Dict[str, Any]):
+        """Call one target, sending a second identical request if the first outlasts the hedge threshold.
+
+        The threshold counts from when the first request starts, not from
+        when it was queued. The losing request is cancelled if it has not
+        started; otherwise its tokens are accounted when it finishes, since
+        the provider bills them.
+        """
+        target = (adapter.name, model)
+
+        def call(started: threading.Event):
+            started.set()
+            began = time.perf_counter()
+            result = self._call_provider(
+                prompt, model, request["temperature"], request["max_tokens"], request["context"], adapter
+            )
+            self.latencies.record(target, time.perf_counter() - began)
+            return result
+
+        threshold = self._hedge_threshold(target) if self._hedge_pool is not None else None
+        if threshold is None:
+            return call(threading.Event())
+
+        first_started = threading.Event()
+        first = self._hedge_pool.submit(call, first_started)
+        first_started.wait()
+        done, _ = wait([first], timeout=threshold)
+        if done:
+            return first.result()
+
+        request["hedged"] = True
+        futures = [first, self._hedge_pool.submit(call, threading.Event())]
+        pending = set(futures)
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    self._charge_hedge_losers([f for f in futures if f is not future], model, request)
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def _charge_hedge_losers(self, futures: List[Future], model: str, request: Dict[str, Any]) -> None:
+        """Cancel losing hedge requests, or add their usage to the totals, metrics and budgets once they finish"""
+        keys = LLMMetrics.keys(request["task"], model, request["caller"])
+
+        def charge(future: Future) -> None:
+            if future.cancelled() or future.exception() is not None:
+                return
+            _, usage = future.result()
+            with self._usage_lock:
+                for field in self.usage:
+                    self.usage[field] += usage.get(field, 0)
+            self.metrics.charge(
+                keys,
+                model,
+                prompt_tokens=usage.get("prompt_tokens", 0),
+                completion_tokens=usage.get("completion_tokens", 0),
+                cached_prompt_tokens=usage.get("cached_prompt_tokens", 0),
+            )
+
+        for future in futures:
+            if not future.cancel():
+                future.add_done_callback(charge)
+
+    def _call_provider(
+        self,
+        prompt: str,
+        model: str,
+        temperature: float,
+        max_tokens: int,
+        context: Optional[Dict[str, Any]] = None,
+        adapter: Optional[ProviderAdapter] = None,
+    ):
+        """Call the provider API, returning the text and token usage"""
+        return (adapter or self.adapter).complete(prompt, model, temperature, max_tokens, context)
+
+    def stream_execute(self, task: str, **kwargs) -> Iterator[str]:
+        """Execute an LLM task, yielding text chunks as the provider emits them.
+
+        The assembled response is recorded in the history once the stream
+        completes. Cached responses are yielded as a single chunk.
+        """
+        logger.info(f"Streaming LLM task: {task}")
+        prompt = self._resolve_prompt(task, kwargs)
+        parts = []
+        for chunk in self._stream_complete(prompt, **{"task_name": "stream", **kwargs}):
+            parts.append(chunk)
+            yield chunk
+
+        self.conversation_history.append({
+            "prompt": prompt,
+            "response": "".join(parts),
+        })
+
+    def _stream_complete(self, prompt: str, **kwargs) -> Iterator[str]:
+        if self.adapter is None:
+            yield NOT_INITIALIZED
+            return
+
+        request = self._prepare_request(prompt, kwargs)
+        cached = self._lookup_cache(prompt, request)
+        if cached is not None:
+            self._observe(request, cached=True)
+            self._remember(prompt, cached["text"], request)
+            yield cached["text"]
+            return
+
+        self.metrics.check_budget(self._metric_keys(request))
+        usage: Dict[str, Any] = {}
+        parts = []
+        succeeded = False
+        # Retries and failover are only possible until the first chunk has been yielded
+        for adapter, model in self._attempts(request):
+            try:
+                for chunk in self._stream_provider(
+                    prompt, model, request["temperature"], request["max_tokens"], usage, request["context"], adapter
+                ):
+                    if request["ttfb"] is None:
+                        request["ttfb"] = time.perf_counter() - request["started"]
+                    parts.append(chunk)
+                    yield chunk
+                succeeded = True
+                break
+            except Exception as e:
+                request["error"] = e
+                if parts:
+                    break
+                usage.clear()
+        if not succeeded:
+            logger.error(f"Error streaming response: {str(request['error'])}")
+            self._observe(request, error=True)
+            raise request["error"]
+
+        text = "".join(parts)
+        self._record_completion(prompt, text, {
+            "prompt_tokens": usage.get("prompt_tokens") or estimate_tokens(prompt),
+            "completion_tokens": usage.get("completion_tokens") or estimate_tokens(text),
+            "cached_prompt_tokens": usage.get("cached_prompt_tokens") or 0,
+        }, request)
+        self._remember(prompt, text, request)
+
+    def _stream_provider(
+        self,
+        prompt: str,
+        model: str,
+        temperature: float,
+        max_tokens: int,
+        usage: Dict[str, Any],
+        context: Optional[Dict[str, Any]] = None,
+        adapter: Optional[ProviderAdapter] = None,
+    ) -> Iterator[str]:
+        """Stream text deltas from the provider, filling ``usage`` when it is reported"""
+        return (adapter or self.adapter).stream(prompt, model, temperature, max_tokens, usage, context)
+
+    def batch_execute(
+        self, prompts: List[Any], task: str = "batch", max_concurrency: Optional[int] = None, **kwargs
+    ) -> List[Dict[str, Any]]:
+        """Run many prompts concurrently, returning results in input order.
+
+        Each item is a prompt string or a dict with a ``prompt`` (or a
+        ``template`` and its ``variables``) and per-item overrides of
+        ``kwargs``. At most ``max_concurrency`` requests are in flight; a
+        failed item reports its error without affecting the rest. Metrics
+        are keyed on ``task_name``, which defaults to ``task``.
+        """
+        items = [item if isinstance(item, dict) else {"prompt": item} for item in prompts]
+        workers = max(1, min(max_concurrency or self.max_concurrency, len(items)))
+
+        def run(item: Dict[str, Any]) -> Dict[str, Any]:
+            if "template" not in item and not isinstance(item.get("prompt"), str):
+                return {"status": "failed", "prompt": item.get("prompt"),
+                        "error": "Each batch item needs a prompt string or a template"}
+            options = {"task_name": task, **kwargs, **item}
+            try:
+                prompt = self._resolve_prompt(task, options)
+            except ValueError as e:
+                return {"status": "failed", "prompt": item.get("prompt"), "error": str(e)}
+            try:
+                completion = self._complete(prompt, **options)
+                return {"status": "success", "prompt": prompt, "response": completion["text"],
+                        "cached": completion["cached"]}
+            except Exception as e:
+                return {"status": "failed", "prompt": prompt, "error": str(e)}
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(run, items))
+
+        for index, result in enumerate(results):
+            result["index"] = index
+            if result["status"] == "success":
+                self.conversation_history.append({"prompt": result["prompt"], "response": result["response"]})
+        logger.info(f"Batch '{task}' finished: {len(results)} prompts, {workers} in flight")
+        return results
 
     def chat(self, message: str, **kwargs) -> str:
         """Simple chat interface"""
-        result = self.execute("chat", prompt=message, **kwargs)
+        result = self.execute("chat", prompt=message, **{"task_name": "chat", **kwargs})
         return result.get("response", "No response")
 
-    def summarize(self, text: str, **kwargs) -> str:
-        """Summarize text"""
-        prompt = f"Please summarize the following text:\n\n{text}"
-        result = self.execute("summarize", prompt=prompt, **kwargs)
+    def stream_chat(self, message: str, **kwargs) -> Iterator[str]:
+        """Chat, yielding the response as it is generated"""
+        return self.stream_execute("chat", prompt=message, **{"task_name": "chat", **kwargs})
+
+    def summarize(self, text: str, chunked: Optional[bool] = None, **kwargs) -> str:
+        """Summarize text, map-reducing over chunks when it exceeds ``chunk_tokens`` (or ``chunked=True``)"""
+        if chunked is None:
+            chunked = estimate_tokens(text) > self.chunk_tokens
+        if chunked:
+            result = self.summarize_document(text, **kwargs)
+            return result.get("summary", "No response")
+        result = self.execute(
+            "summarize", template="summarize", variables={"text": text}, **{"task_name": "summarize", **kwargs}
+        )
         return result.get("response", "No response")
 
+    def summarize_document(
+        self, text: str, chunk_tokens: Optional[int] = None, overlap_tokens: Optional[int] = None, **kwargs
+    ) -> Dict[str, Any]:
+        """Map-reduce summary of a long text.
+
+        The text is split into overlapping content-defined chunks that are
+        summarized concurrently; the partial summaries are then combined in
+        groups that fit the chunk budget, level by level, until one remains.
+        Every step is cached by its exact input, so re-summarizing an edited
+        document only calls the provider for the chunks that changed and the
+        combinations above them.
+        """
+        chunk_tokens = chunk_tokens or self.chunk_tokens
+        overlap_tokens = self.chunk_overlap if overlap_tokens is None else overlap_tokens
+        kwargs = {"cache": True, "semantic": False, **kwargs}
+        try:
+            chunks = chunk_text(text, chunk_tokens, overlap_tokens)
+            if not chunks:
+                raise ValueError("Nothing to summarize")
+
+            partials = self._summary_step(chunks, "chunk_summary", kwargs)
+            cached = sum(partial["cached"] for partial in partials)
+            summaries = [partial["response"] for partial in partials]
+            levels = 0
+            while len(summaries) > 1:
+                groups = pack_texts(summaries, chunk_tokens)
+                if len(groups) == len(summaries):
+                    # Summaries too long to pack: still halve the count each level
+                    groups = [summaries[i:i + 2] for i in range(0, len(summaries), 2)]
+                combined = self._summary_step(["\n\n".join(group) for group in groups], "combine", kwargs)
+                cached += sum(partial["cached"] for partial in combined)
+                summaries = [partial["response"] for partial in combined]
+                levels += 1
+
+            return {
+                "status": "success",
+                "summary": summaries[0],
+                "chunks": len(chunks),
+                "reduce_levels": levels,
+                "cached_steps": cached,
+            }
+        except Exception as e:
+            logger.error(f"Document summarization failed: {str(e)}")
+            return {"status": "failed", "error": str(e)}
+
+    def _summary_step(self, texts: List[str], template: str, kwargs: Dict[str, Any]) -> List[Dict[str, Any]]:
+        if self.adapter is None:
+            raise ValueError(NOT_INITIALIZED)
+        items = [{"template": template, "variables": {"text": text}} for text in texts]
+        results = self.batch_execute(items, "summarize", **kwargs)
+        failed = [result for result in results if result["status"] == "failed"]
+        if failed:
+            raise ValueError(f"{len(failed)} of {len(results)} summaries failed: {failed[0]['error']}")
+        return results
+
     def analyze_sentiment(self, text: str, **kwargs) -> str:
         """Analyze sentiment of text"""
-        prompt = f"Analyze the sentiment of the following text and provide a brief analysis:\n\n{text}"
-        result = self.execute("analyze_sentiment", prompt=prompt, **kwargs)
+        result = self.execute(
+            "analyze_sentiment", template="sentiment", variables={"text": text},
+            **{"task_name": "analyze_sentiment", **kwargs}
+        )
         return result.get("response", "No response")
 
+    def batch_summarize(self, texts: List[str], **kwargs) -> List[Dict[str, Any]]:
+        """Summarize many texts concurrently"""
+        prompts = [{"template": "summarize", "variables": {"text": text}} for text in texts]
+        return self.batch_execute(prompts, "summarize", **kwargs)
+
+    def batch_analyze_sentiment(self, texts: List[str], **kwargs) -> List[Dict[str, Any]]:
+        """Analyze the sentiment of many texts concurrently"""
+        prompts = [{"template": "sentiment", "variables": {"text": text}} for text in texts]
+        return self.batch_execute(prompts, "analyze_sentiment", **kwargs)
+
     def get_conversation_history(self) -> List[Dict]:
-        """Get conversation history"""
-        return self.conversation_history
+        """Get the most recent ``history_limit`` exchanges"""
+        return list(self.conversation_history)
+
+    def get_conversation(self, conversation_id: str) -> Optional[Dict[str, Any]]:
+        """The summary and recent turns of a conversation, or None if it is unknown or evicted"""
+        session = self.memory.get(conversation_id, create=False)
+        return session.describe() if session is not None else None
+
+    def end_conversation(self, conversation_id: str) -> None:
+        """Forget a conversation"""
+        self.memory.end(conversation_id)
+
+    def get_status(self) -> Dict[str, Any]:
+        """Get agent status with response cache and token usage"""
+        status = super().get_status()
+        status["provider"] = self.provider
+        status["cache"] = self.cache.stats()
+        if self.semantic_cache is not None:
+            status["semantic_cache"] = self.semantic_cache.stats()
+        status["usage"] = dict(self.usage)
+        status["conversations"] = self.memory.stats()
+        status["metrics"] = self.metrics.summary()
+        return status
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Token, latency and cost aggregates per task, model and caller, with budget usage"""
+        return self.metrics.snapshot()
+
+    def set_budget(self, key: str, **limits: Any) -> None:
+        """Budget the tokens and/or cost of ``total``, ``task:<name>``, ``model:<name>`` or ``caller:<name>``"""
+        self.metrics.set_budget(key, **limits)
+
+    def shutdown(self):
+        """Shut down the hedging thread pool"""
+        if self._hedge_pool is not None:
+            self._hedge_pool.shutdown(wait=False, cancel_futures=True)
+            self._hedge_pool = None
 
     def clear_history(self):
         """Clear conversation history"""
-        self.conversation_history = []
+        self.conversation_history.clear()
         logger.info("Conversation history cleared")
+
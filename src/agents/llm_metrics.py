@@ -0,0 +1,320 @@
+from typing import Any, Dict, List, Optional, Tuple
+from bisect import bisect_left
+from collections import OrderedDict
+import threading
+import time
+
+# USD per 1k (prompt, completion) tokens; unknown models are costed at zero
+MODEL_PRICES: Dict[str, Tuple[float, float]] = {
+    "gpt-3.5-turbo": (0.0005, 0.0015),
+    "gpt-4": (0.03, 0.06),
+    "gpt-4-turbo": (0.01, 0.03),
+    "gpt-4o": (0.005, 0.015),
+    "gpt-4o-mini": (0.00015, 0.0006),
+    "claude-3-haiku-20240307": (0.00025, 0.00125),
+    "claude-3-sonnet-20240229": (0.003, 0.015),
+    "claude-3-opus-20240229": (0.015, 0.075),
+}
+
+# Share of the prompt price charged for tokens read from a provider's prompt cache
+CACHED_PROMPT_PRICE = {"claude": 0.1, "gpt": 0.5}
+
+# Latency histogram bucket upper bounds in seconds, doubling from 10ms to ~164s
+_LATENCY_BOUNDS = [0.01 * 2 ** i for i in range(15)]
+_COUNTERS = ("calls", "errors", "cached", "retries", "hedges", "hedge_losers", "failovers", "prompt_tokens",
+             "completion_tokens", "cached_prompt_tokens", "prefix_calls", "prefix_hits", "cost", "latency", "ttfb",
+             "ttfb_calls")
+
+
+def estimate_cost(
+    model: str,
+    prompt_tokens: int,
+    completion_tokens: int,
+    prices: Optional[Dict[str, Tuple[float, float]]] = None,
+    cached_prompt_tokens: int = 0,
+) -> float:
+    prompt_price, completion_price = (prices or MODEL_PRICES).get(model, (0.0, 0.0))
+    cached_share = next((share for family, share in CACHED_PROMPT_PRICE.items() if model.startswith(family)), 1.0)
+    prompt_cost = (prompt_tokens - cached_prompt_tokens + cached_prompt_tokens * cached_share) * prompt_price
+    return (prompt_cost + completion_tokens * completion_price) / 1000
+
+
+class _Aggregate:
+    """Counters plus a log-scale latency histogram"""
+
+    __slots__ = _COUNTERS + ("latency_max", "histogram")
+
+    def __init__(self):
+        for name in _COUNTERS:
+            setattr(self, name, 0)
+        self.latency_max = 0.0
+        self.histogram = [0] * (len(_LATENCY_BOUNDS) + 1)
+
+    def add(self, other: "_Aggregate") -> None:
+        for name in _COUNTERS:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        self.latency_max = max(self.latency_max, other.latency_max)
+        self.histogram = [a + b for a, b in zip(self.histogram, other.histogram)]
+
+    def _percentile(self, fraction: float) -> Optional[float]:
+        total = sum(self.histogram)
+        if not total:
+            return None
+        rank, seen = fraction * total, 0
+        for index, count in enumerate(self.histogram):
+            seen += count
+            if seen >= rank:
+                return _LATENCY_BOUNDS[index] if index < len(_LATENCY_BOUNDS) else self.latency_max
+        return self.latency_max
+
+    def summary(self) -> Dict[str, Any]:
+        provider_calls = self.calls - self.cached
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "cached": self.cached,
+            "retries": self.retries,
+            "hedges": self.hedges,
+            "hedge_losers": self.hedge_losers,
+            "failovers": self.failovers,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cached_prompt_tokens": self.cached_prompt_tokens,
+            "prefix_hit_rate": round(self.prefix_hits / self.prefix_calls, 4) if self.prefix_calls else None,
+            "cost": round(self.cost, 6),
+            "avg_latency": round(self.latency / provider_calls, 4) if provider_calls else None,
+            "p50_latency": self._percentile(0.5),
+            "p95_latency": self._percentile(0.95),
+            "max_latency": round(self.latency_max, 4),
+            "avg_ttfb": round(self.ttfb / self.ttfb_calls, 4) if self.ttfb_calls else None,
+        }
+
+
+class RollingAggregate:
+    """Lifetime totals plus a ring of per-interval aggregates covering the last ``window`` seconds"""
+
+    def __init__(self, interval: float = 60.0, intervals: int = 60):
+        self.interval = interval
+        self.total = _Aggregate()
+        self._ring: List[Optional[Tuple[int, _Aggregate]]] = [None] * intervals
+
+    def _current(self, now: float) -> _Aggregate:
+        slot = int(now // self.interval)
+        entry = self._ring[slot % len(self._ring)]
+        if entry is None or entry[0] != slot:
+            entry = (slot, _Aggregate())
+            self._ring[slot % len(self._ring)] = entry
+        return entry[1]
+
+    def record(self, now: float, sample: _Aggregate) -> None:
+        self.total.add(sample)
+        self._current(now).add(sample)
+
+    def window(self, now: float) -> _Aggregate:
+        oldest = int(now // self.interval) - len(self._ring)
+        merged = _Aggregate()
+        for entry in self._ring:
+            if entry is not None and entry[0] > oldest:
+                merged.add(entry[1])
+        return merged
+
+
+class LLMMetrics:
+    """Per-call token, latency, retry, hedge, prompt-cache and cost accounting with optional budgets.
+
+    Every call is aggregated under ``total`` and its ``task:``, ``model:``
+    and ``caller:`` keys. At most ``max_keys`` keys are tracked; beyond that
+    the least recently used key without a budget is evicted. Budgets can be
+    set on any of these keys; once a budget's tokens or cost are spent
+    within its period, ``check_budget`` raises until the period rolls over.
+    """
+
+    def __init__(
+        self,
+        interval: float = 60.0,
+        intervals: int = 60,
+        prices: Optional[Dict[str, Tuple[float, float]]] = None,
+        budgets: Optional[Dict[str, Dict[str, Any]]] = None,
+        max_keys: int = 256,
+    ):
+        self.interval = interval
+        self.intervals = intervals
+        self.prices = {**MODEL_PRICES, **(prices or {})}
+        self.max_keys = max_keys
+        self.evicted = 0
+        self._aggregates: "OrderedDict[str, RollingAggregate]" = OrderedDict()
+        self._budgets: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        for key, limits in (budgets or {}).items():
+            self.set_budget(key, **limits)
+
+    @staticmethod
+    def keys(task: str, model: str, caller: str) -> List[str]:
+        return ["total", f"task:{task}", f"model:{model}", f"caller:{caller}"]
+
+    def set_budget(
+        self,
+        key: str,
+        max_tokens: Optional[int] = None,
+        max_cost: Optional[float] = None,
+        period: Optional[float] = None,
+    ) -> None:
+        """Limit the tokens and/or cost spent under ``key``, per ``period`` seconds or in total"""
+        if max_tokens is None and max_cost is None:
+            raise ValueError("A budget needs max_tokens or max_cost")
+        with self._lock:
+            self._budgets[key] = {
+                "max_tokens": max_tokens,
+                "max_cost": max_cost,
+                "period": period,
+                "tokens": 0,
+                "cost": 0.0,
+                "started": time.time(),
+            }
+
+    def _roll(self, budget: Dict[str, Any], now: float) -> None:
+        if budget["period"] and now - budget["started"] >= budget["period"]:
+            budget["tokens"], budget["cost"] = 0, 0.0
+            budget["started"] = now - (now - budget["started"]) % budget["period"]
+
+    def check_budget(self, keys: List[str]) -> None:
+        """Raise ValueError if any budget on ``keys`` is exhausted"""
+        now = time.time()
+        with self._lock:
+            for key in keys:
+                budget = self._budgets.get(key)
+                if budget is None:
+                    continue
+                self._roll(budget, now)
+                if budget["max_tokens"] is not None and budget["tokens"] >= budget["max_tokens"]:
+                    raise ValueError(f"Token budget exhausted for {key}")
+                if budget["max_cost"] is not None and budget["cost"] >= budget["max_cost"]:
+                    raise ValueError(f"Cost budget exhausted for {key}")
+
+    def record(
+        self,
+        keys: List[str],
+        model: str,
+        prompt_tokens: int = 0,
+        completion_tokens: int = 0,
+        latency: float = 0.0,
+        ttfb: Optional[float] = None,
+        retries: int = 0,
+        hedged: bool = False,
+        failovers: int = 0,
+        cached_prompt_tokens: int = 0,
+        prefix_cached: bool = False,
+        cached: bool = False,
+        error: bool = False,
+    ) -> float:
+        """Account one call under ``keys``, returning its estimated cost"""
+        sample = _Aggregate()
+        sample.calls = 1
+        sample.errors = int(error)
+        sample.cached = int(cached)
+        sample.retries = retries
+        sample.hedges = int(hedged)
+        sample.failovers = failovers
+        sample.prompt_tokens = prompt_tokens
+        sample.completion_tokens = completion_tokens
+        sample.cached_prompt_tokens = cached_prompt_tokens
+        sample.prefix_calls = int(prefix_cached and not cached and not error)
+        sample.prefix_hits = int(prefix_cached and cached_prompt_tokens > 0)
+        sample.cost = estimate_cost(model, prompt_tokens, completion_tokens, self.prices, cached_prompt_tokens)
+        if not cached:
+            sample.latency = latency
+            sample.latency_max = latency
+            sample.histogram[bisect_left(_LATENCY_BOUNDS, latency)] += 1
+        if ttfb is not None:
+            sample.ttfb = ttfb
+            sample.ttfb_calls = 1
+        self._add(keys, sample)
+        return sample.cost
+
+    def charge(
+        self,
+        keys: List[str],
+        model: str,
+        prompt_tokens: int = 0,
+        completion_tokens: int = 0,
+        cached_prompt_tokens: int = 0,
+    ) -> float:
+        """Account the tokens of a hedged request that lost the race, without counting another call"""
+        sample = _Aggregate()
+        sample.hedge_losers = 1
+        sample.prompt_tokens = prompt_tokens
+        sample.completion_tokens = completion_tokens
+        sample.cached_prompt_tokens = cached_prompt_tokens
+        sample.cost = estimate_cost(model, prompt_tokens, completion_tokens, self.prices, cached_prompt_tokens)
+        self._add(keys, sample)
+        return sample.cost
+
+    def _add(self, keys: List[str], sample: _Aggregate) -> None:
+        now = time.time()
+        with self._lock:
+            for key in keys:
+                aggregate = self._aggregates.get(key)
+                if aggregate is None:
+                    self._evict()
+                    aggregate = self._aggregates[key] = RollingAggregate(self.interval, self.intervals)
+                else:
+                    self._aggregates.move_to_end(key)
+                aggregate.record(now, sample)
+                budget = self._budgets.get(key)
+                if budget is not None:
+                    self._roll(budget, now)
+                    budget["tokens"] += sample.prompt_tokens + sample.completion_tokens
+                    budget["cost"] += sample.cost
+
+    def _evict(self) -> None:
+        """Make room for one more key by dropping the least recently used unbudgeted ones"""
+        if len(self._aggregates) < self.max_keys:
+            return
+        for key in list(self._aggregates):
+            if key != "total" and key not in self._budgets:
+                del self._aggregates[key]
+                self.evicted += 1
+                if len(self._aggregates) < self.max_keys:
+                    return
+
+    def summary(self) -> Dict[str, Any]:
+        """Overall lifetime and recent-window aggregates"""
+        now = time.time()
+        with self._lock:
+            aggregate = self._aggregates.get("total") or RollingAggregate(self.interval, self.intervals)
+            return {
+                "lifetime": aggregate.total.summary(),
+                "window": aggregate.window(now).summary(),
+                "window_seconds": self.interval * self.intervals,
+            }
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Lifetime and recent-window aggregates for every key, grouped by dimension, plus budget usage"""
+        now = time.time()
+        with self._lock:
+            groups: Dict[str, Dict[str, Any]] = {"by_task": {}, "by_model": {}, "by_caller": {}}
+            total = None
+            for key, aggregate in self._aggregates.items():
+                entry = {"lifetime": aggregate.total.summary(), "window": aggregate.window(now).summary()}
+                if key == "total":
+                    total = entry
+                else:
+                    dimension, name = key.split(":", 1)
+                    groups[f"by_{dimension}"][name] = entry
+            budgets = {}
+            for key, budget in self._budgets.items():
+                self._roll(budget, now)
+                budgets[key] = {
+                    "max_tokens": budget["max_tokens"],
+                    "max_cost": budget["max_cost"],
+                    "period": budget["period"],
+                    "tokens": budget["tokens"],
+                    "cost": round(budget["cost"], 6),
+                }
+        return {
+            "total": total,
+            **groups,
+            "budgets": budgets,
+            "evicted_keys": self.evicted,
+            "window_seconds": self.interval * self.intervals,
+        }
@@ -0,0 +1,423 @@
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+import hashlib
+import importlib
+import json
+import logging
+import random
+import threading
+import time
+from .llm_cache import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+Usage = Dict[str, int]
+Context = Dict[str, Any]
+
+
+class ProviderError(Exception):
+    """A provider call failed; ``status_code`` follows HTTP conventions when known"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class ProviderAdapter(ABC):
+    """Uniform completion interface over an LLM provider SDK"""
+
+    name = ""
+    default_model = ""
+
+    @abstractmethod
+    def complete(
+        self, prompt: str, model: str, temperature: float, max_tokens: int, context: Optional[Context] = None
+    ) -> Tuple[str, Usage]:
+        """Return the completion text and token usage.
+
+        ``context`` carries a multi-turn conversation as ``messages`` (ending
+        with ``prompt``), an optional ``system`` text and an optional static
+        ``prefix`` sent ahead of it; with ``cache_prefix`` set the provider is
+        asked to cache that prefix. Usage includes ``cached_prompt_tokens``.
+        """
+
+    @abstractmethod
+    def stream(
+        self,
+        prompt: str,
+        model: str,
+        temperature: float,
+        max_tokens: int,
+        usage: Dict[str, Any],
+        context: Optional[Context] = None,
+    ) -> Iterator[str]:
+        """Yield text deltas, filling ``usage`` when the provider reports it"""
+
+    def close(self) -> None:
+        pass
+
+
+def _messages(prompt: str, context: Optional[Context]) -> List[Dict[str, str]]:
+    if context and context.get("messages"):
+        return list(context["messages"])
+    return [{"role": "user", "content": prompt}]
+
+
+def _system_text(context: Optional[Context]) -> Optional[str]:
+    """The static prefix followed by the per-call system text"""
+    if not context:
+        return None
+    return "\n\n".join(part for part in (context.get("prefix"), context.get("system")) if part) or None
+
+
+def _input_text(prompt: str, context: Optional[Context]) -> str:
+    system = _system_text(context) or ""
+    return "\n\n".join([system] + [message["content"] for message in _messages(prompt, context)])
+
+
+def _usage(
+    prompt: str,
+    text: str,
+    prompt_tokens: Any,
+    completion_tokens: Any,
+    cached_tokens: Any = None,
+    context: Optional[Context] = None,
+) -> Usage:
+    return {
+        "prompt_tokens": prompt_tokens if isinstance(prompt_tokens, int) else estimate_tokens(
+            _input_text(prompt, context)
+        ),
+        "completion_tokens": completion_tokens if isinstance(completion_tokens, int) else estimate_tokens(text),
+        "cached_prompt_tokens": cached_tokens if isinstance(cached_tokens, int) else 0,
+    }
+
+
+def _openai_cached(usage: Any) -> Any:
+    return getattr(getattr(usage, "prompt_tokens_details", None), "cached_tokens", None)
+
+
+def _anthropic_prompt_tokens(usage: Any) -> Tuple[Any, Any]:
+    """Total prompt tokens and cache reads; Anthropic counts cache reads and writes apart from input_tokens"""
+    input_tokens = getattr(usage, "input_tokens", None)
+    if not isinstance(input_tokens, int):
+        return None, None
+    read = getattr(usage, "cache_read_input_tokens", None)
+    written = getattr(usage, "cache_creation_input_tokens", None)
+    read = read if isinstance(read, int) else 0
+    written = written if isinstance(written, int) else 0
+    return input_tokens + read + written, read
+
+
+def pooled_http_client(sdk: Any, max_connections: int = 20, max_keepalive: int = 10, timeout: float = 60.0):
+    """A keep-alive connection pool for a provider SDK.
+
+    SDKs may pin their own httpx distribution, so the client and its limit
+    and timeout types come from the SDK's ``DefaultHttpxClient`` when it
+    has one.
+    """
+    client_class = getattr(sdk, "DefaultHttpxClient", None)
+    if client_class is None:
+        import httpx
+
+        client_class, http = httpx.Client, httpx
+    else:
+        base = next(cls for cls in client_class.__mro__ if cls.__name__ == "Client")
+        http = importlib.import_module(base.__module__.split(".")[0])
+
+    return client_class(
+        limits=http.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive),
+        timeout=http.Timeout(timeout, connect=min(timeout, 10.0)),
+    )
+
+
+class OpenAIAdapter(ProviderAdapter):
+    """OpenAI chat completions through the v1 client.
+
+    OpenAI caches long prompt prefixes automatically; keeping the static
+    prefix first in the system message makes it eligible.
+    """
+
+    name = "openai"
+    default_model = "gpt-3.5-turbo"
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        client: Any = None,
+        client_options: Optional[Dict[str, Any]] = None,
+        **pool: Any,
+    ):
+        self._http_client = None
+        if client is None:
+            import openai
+
+            self._http_client = pooled_http_client(openai, **pool)
+            # Retries are handled by the agent, across providers
+            client = openai.OpenAI(
+                api_key=api_key, http_client=self._http_client, max_retries=0, **(client_options or {})
+            )
+        self.client = client
+
+    @staticmethod
+    def _chat_messages(prompt, context):
+        messages = _messages(prompt, context)
+        system = _system_text(context)
+        if system:
+            messages.insert(0, {"role": "system", "content": system})
+        return messages
+
+    def complete(self, prompt, model, temperature, max_tokens, context=None):
+        response = self.client.chat.completions.create(
+            model=model,
+            messages=self._chat_messages(prompt, context),
+            temperature=temperature,
+            max_tokens=max_tokens,
+        )
+        text = response.choices[0].message.content or ""
+        usage = getattr(response, "usage", None)
+        return text, _usage(
+            prompt,
+            text,
+            getattr(usage, "prompt_tokens", None),
+            getattr(usage, "completion_tokens", None),
+            _openai_cached(usage),
+            context,
+        )
+
+    def stream(self, prompt, model, temperature, max_tokens, usage, context=None):
+        stream = self.client.chat.completions.create(
+            model=model,
+            messages=self._chat_messages(prompt, context),
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=True,
+            stream_options={"include_usage": True},
+        )
+        for chunk in stream:
+            if getattr(chunk, "usage", None) is not None:
+                usage["prompt_tokens"] = chunk.usage.prompt_tokens
+                usage["completion_tokens"] = chunk.usage.completion_tokens
+                usage["cached_prompt_tokens"] = _openai_cached(chunk.usage) or 0
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    def close(self):
+        if self._http_client is not None:
+            self._http_client.close()
+
+
+class AnthropicAdapter(ProviderAdapter):
+    """Anthropic Messages API, marking long static prefixes for prompt caching"""
+
+    name = "anthropic"
+    default_model = "claude-3-sonnet-20240229"
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        client: Any = None,
+        client_options: Optional[Dict[str, Any]] = None,
+        **pool: Any,
+    ):
+        self._http_client = None
+        if client is None:
+            import anthropic
+
+            self._http_client = pooled_http_client(anthropic, **pool)
+            client = anthropic.Anthropic(
+                api_key=api_key, http_client=self._http_client, max_retries=0, **(client_options or {})
+            )
+        self.client = client
+
+    @staticmethod
+    def _request(prompt, context):
+        request: Dict[str, Any] = {"messages": _messages(prompt, context)}
+        if not context:
+            return request
+        if context.get("prefix"):
+            prefix = {"type": "text", "text": context["prefix"]}
+            if context.get("cache_prefix"):
+                prefix["cache_control"] = {"type": "ephemeral"}
+            request["system"] = [prefix]
+            if context.get("system"):
+                request["system"].append({"type": "text", "text": context["system"]})
+        elif context.get("system"):
+            request["system"] = context["system"]
+        return request
+
+    def complete(self, prompt, model, temperature, max_tokens, context=None):
+        message = self.client.messages.create(
+            model=model,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            **self._request(prompt, context),
+        )
+        text = message.content[0].text
+        usage = getattr(message, "usage", None)
+        prompt_tokens, cached = _anthropic_prompt_tokens(usage)
+        return text, _usage(prompt, text, prompt_tokens, getattr(usage, "output_tokens", None), cached, context)
+
+    def stream(self, prompt, model, temperature, max_tokens, usage, context=None):
+        stream = self.client.messages.create(
+            model=model,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            stream=True,
+            **self._request(prompt, context),
+        )
+        for event in stream:
+            if event.type == "message_start":
+                prompt_tokens, cached = _anthropic_prompt_tokens(getattr(event.message, "usage", None))
+                usage["prompt_tokens"] = prompt_tokens
+                usage["cached_prompt_tokens"] = cached or 0
+            elif event.type == "content_block_delta":
+                text = getattr(event.delta, "text", None)
+                if text:
+                    yield text
+            elif event.type == "message_delta":
+                usage["completion_tokens"] = getattr(getattr(event, "usage", None), "output_tokens", None)
+
+    def close(self):
+        if self._http_client is not None:
+            self._http_client.close()
+
+
+class MockAdapter(ProviderAdapter):
+    """Deterministic offline provider for tests and throughput benchmarks.
+
+    Responses depend only on the prompt. ``latency`` seconds pass before the
+    first token and ``token_delay`` between streamed tokens;
+    ``failure_rate`` makes that fraction of calls raise a retryable 503, and
+    ``tail_rate`` makes that fraction take ``tail_latency`` seconds instead.
+    Cacheable prefixes are reported as cached from their second use on.
+    """
+
+    name = "mock"
+    default_model = "mock-1"
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        token_delay: float = 0.0,
+        failure_rate: float = 0.0,
+        response: Optional[Callable[[str], str]] = None,
+        seed: int = 0,
+        tail_rate: float = 0.0,
+        tail_latency: float = 0.0,
+    ):
+        self.latency = latency
+        self.token_delay = token_delay
+        self.failure_rate = failure_rate
+        self.tail_rate = tail_rate
+        self.tail_latency = tail_latency
+        self.response = response or self._default_response
+        self.calls = 0
+        self.last_context: Optional[Context] = None
+        self._prefixes: set = set()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _default_response(prompt: str) -> str:
+        digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:8]
+        return f"Mock response {digest} to: {prompt[:80]}"
+
+    def _begin(self, context: Optional[Context]) -> None:
+        with self._lock:
+            self.calls += 1
+            self.last_context = context
+            failed = self._random.random() < self.failure_rate
+            slow = self._random.random() < self.tail_rate
+        latency = self.tail_latency if slow else self.latency
+        if latency:
+            time.sleep(latency)
+        if failed:
+            raise ProviderError("Mock provider failure", status_code=503)
+
+    def _cached_tokens(self, context: Optional[Context]) -> int:
+        if not context or not context.get("cache_prefix"):
+            return 0
+        prefix = context["prefix"]
+        with self._lock:
+            seen = prefix in self._prefixes
+            self._prefixes.add(prefix)
+        return estimate_tokens(prefix) if seen else 0
+
+    def complete(self, prompt, model, temperature, max_tokens, context=None):
+        self._begin(context)
+        text = self.response(prompt)
+        return text, _usage(prompt, text, None, None, self._cached_tokens(context), context)
+
+    def stream(self, prompt, model, temperature, max_tokens, usage, context=None):
+        self._begin(context)
+        text = self.response(prompt)
+        for index, word in enumerate(text.split(" ")):
+            if index and self.token_delay:
+                time.sleep(self.token_delay)
+            yield word if index == 0 else " " + word
+        usage.update(_usage(prompt, text, None, None, self._cached_tokens(context), context))
+
+
+_ADAPTERS: Dict[str, Callable[..., ProviderAdapter]] = {
+    "openai": OpenAIAdapter,
+    "anthropic": AnthropicAdapter,
+    "claude": AnthropicAdapter,
+}
+_SHARED: Dict[Tuple[Any, ...], ProviderAdapter] = {}
+_SHARED_LOCK = threading.Lock()
+# Set by the adapters themselves, so they cannot come from provider_options
+_RESERVED_OPTIONS = {"api_key", "http_client", "max_retries"}
+
+
+def register_provider(name: str, factory: Callable[..., ProviderAdapter]) -> None:
+    """Register an adapter factory taking ``api_key`` and the pool settings of ``pooled_http_client``.
+
+    Provider options, when given, are passed as ``client_options``.
+    """
+    _ADAPTERS[name.lower()] = factory
+
+
+def get_adapter(
+    provider: str,
+    api_key: Optional[str] = None,
+    max_connections: int = 20,
+    max_keepalive: int = 10,
+    timeout: float = 60.0,
+    **options: Any,
+) -> ProviderAdapter:
+    """Get the shared adapter for a provider, key and connection settings, creating it once.
+
+    Every agent asking for the same combination reuses one adapter and so
+    one pooled HTTP client. For OpenAI and Anthropic, ``options`` (such as
+    ``base_url`` or ``default_headers``) are passed to the SDK client and
+    are part of what is shared. ``mock`` adapters are built fresh from
+    ``options`` since they hold no connections.
+    """
+    provider = provider.lower()
+    if provider == "mock":
+        return MockAdapter(**options)
+    if provider not in _ADAPTERS:
+        raise ValueError(f"Unknown provider: {provider}")
+    reserved = _RESERVED_OPTIONS.intersection(options)
+    if reserved:
+        raise ValueError(f"Provider options {sorted(reserved)} are managed by the adapter")
+
+    key = (provider, api_key, max_connections, max_keepalive, timeout, json.dumps(options, sort_keys=True, default=str))
+    with _SHARED_LOCK:
+        adapter = _SHARED.get(key)
+        if adapter is None:
+            settings = {"max_connections": max_connections, "max_keepalive": max_keepalive, "timeout": timeout}
+            if options:
+                settings["client_options"] = options
+            adapter = _ADAPTERS[provider](api_key=api_key, **settings)
+            _SHARED[key] = adapter
+            logger.info(f"Created shared {provider} adapter ({max_connections} connections, {timeout}s timeout)")
+        return adapter
+
+
+def close_adapters() -> None:
+    """Close every shared adapter and its connection pool"""
+    with _SHARED_LOCK:
+        for adapter in _SHARED.values():
+            adapter.close()
+        _SHARED.clear()
@@ -0,0 +1,73 @@
+from typing import Any, Dict, Hashable, Optional
+from collections import deque
+import random
+import threading
+
+_RETRYABLE_STATUS = {408, 409, 425, 429, 500, 502, 503, 504, 529}
+_RETRYABLE_NAMES = ("Timeout", "Connection", "RateLimit", "Overloaded", "InternalServer", "ServiceUnavailable")
+
+
+def _status_code(error: BaseException) -> Optional[int]:
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Whether a provider error is transient: timeouts, dropped connections, rate limits and 5xx"""
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    status = _status_code(error)
+    if status is not None:
+        return status in _RETRYABLE_STATUS
+    return any(name in type(error).__name__ for name in _RETRYABLE_NAMES)
+
+
+def retry_delay(error: BaseException, attempt: int, base: float, cap: float, rng: random.Random) -> float:
+    """Seconds to wait before retry ``attempt`` (0-based).
+
+    Full-jitter exponential backoff, or the server's ``Retry-After`` when it
+    sends one, both bounded by ``cap``.
+    """
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        retry_after = float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        retry_after = None
+    if retry_after is not None and retry_after >= 0:
+        return min(retry_after, cap)
+    return rng.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class LatencyTracker:
+    """Recent successful call latencies per target, for hedging thresholds"""
+
+    def __init__(self, samples: int = 200, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._samples: Dict[Hashable, deque] = {}
+        self._samples_per_target = samples
+        self._lock = threading.Lock()
+
+    def record(self, target: Hashable, latency: float) -> None:
+        with self._lock:
+            samples = self._samples.get(target)
+            if samples is None:
+                samples = self._samples[target] = deque(maxlen=self._samples_per_target)
+            samples.append(latency)
+
+    def quantile(self, target: Hashable, q: float) -> Optional[float]:
+        """The ``q`` latency quantile of ``target``, or None until ``min_samples`` calls were seen"""
+        with self._lock:
+            samples = sorted(self._samples.get(target, ()))
+        if len(samples) < self.min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            targets = list(self._samples)
+        return {
+            str(target): {"p50": self.quantile(target, 0.5), "p95": self.quantile(target, 0.95)}
+            for target in targets
+        }
@@ -0,0 +1,82 @@
+from typing import Any, Dict, List, Optional, Tuple
+from string import Formatter
+import hashlib
+import threading
+from .llm_cache import estimate_tokens
+
+
+class PromptTemplate:
+    """A prompt split into a static ``system`` prefix and a ``template`` for the variable part.
+
+    The template is parsed once into literal and field pieces, so rendering
+    is a join. The prefix never changes between calls, which lets providers
+    cache it; ``prefix_tokens`` and ``prefix_hash`` describe it.
+    """
+
+    def __init__(self, name: str, system: str, template: str):
+        self.name = name
+        self.system = system
+        self.template = template
+        self._pieces: List[Tuple[str, Optional[str]]] = []
+        for literal, field, spec, conversion in Formatter().parse(template):
+            if field is not None and (spec or conversion or not field.isidentifier()):
+                raise ValueError(f"Template '{name}' fields must be plain names, got '{field}'")
+            self._pieces.append((literal, field))
+        self.fields = [field for _, field in self._pieces if field is not None]
+        self.prefix_tokens = estimate_tokens(system)
+        self.prefix_hash = hashlib.sha256(system.encode("utf-8")).hexdigest()[:16]
+
+    def render(self, **values: Any) -> Dict[str, str]:
+        """The ``system`` prefix and the rendered ``prompt``"""
+        missing = [field for field in self.fields if field not in values]
+        if missing:
+            raise ValueError(f"Template '{self.name}' is missing values for: {', '.join(missing)}")
+        prompt = "".join(literal + (str(values[field]) if field is not None else "") for literal, field in self._pieces)
+        return {"system": self.system, "prompt": prompt}
+
+
+class TemplateRegistry:
+    """Named prompt templates"""
+
+    def __init__(self):
+        self._templates: Dict[str, PromptTemplate] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, system: str, template: str = "{text}") -> PromptTemplate:
+        prompt_template = PromptTemplate(name, system, template)
+        with self._lock:
+            self._templates[name] = prompt_template
+        return prompt_template
+
+    def get(self, name: str) -> PromptTemplate:
+        template = self._templates.get(name)
+        if template is None:
+            raise ValueError(f"Unknown prompt template: {name}")
+        return template
+
+    def render(self, name: str, **values: Any) -> Dict[str, str]:
+        return self.get(name).render(**values)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._templates
+
+    def describe(self) -> List[Dict[str, Any]]:
+        return [
+            {"name": t.name, "fields": t.fields, "prefix_tokens": t.prefix_tokens, "prefix_hash": t.prefix_hash}
+            for t in self._templates.values()
+        ]
+
+
+def default_templates() -> TemplateRegistry:
+    """A registry holding the agent's built-in task templates"""
+    registry = TemplateRegistry()
+    registry.register("summarize", "Please summarize the text the user provides.")
+    registry.register(
+        "chunk_summary", "Summarize the section of a longer document the user provides, keeping its key facts."
+    )
+    registry.register(
+        "combine", "Combine the summaries of consecutive sections of a document the user provides into one concise "
+                   "summary."
+    )
+    registry.register("sentiment", "Analyze the sentiment of the text the user provides and give a brief analysis.")
+    return registry
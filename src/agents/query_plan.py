@@ -0,0 +1,132 @@
+from typing import Any, Dict, List, Optional, Set
+import re
+import pandas as pd
+
+
+_IDENTIFIER = re.compile(r"`([^`]+)`|([A-Za-z_][A-Za-z0-9_]*)")
+
+
+def referenced_columns(condition: str, columns) -> Set[str]:
+    """Column names a ``DataFrame.query`` condition refers to"""
+    names = {quoted or bare for quoted, bare in _IDENTIFIER.findall(condition)}
+    return names & set(columns)
+
+
+class QueryPlan:
+    """A lazy chain of filter/select/sort/aggregate steps over a stored dataframe.
+
+    Steps are only recorded; ``execute`` optimizes the chain (fusing
+    predicates and pruning unused columns) and evaluates it once.
+    """
+
+    def __init__(self, source: str):
+        self.source = source
+        self.steps: List[Dict[str, Any]] = []
+
+    def filter(self, condition: str) -> "QueryPlan":
+        self.steps.append({"op": "filter", "condition": condition})
+        return self
+
+    def select(self, columns: List[str]) -> "QueryPlan":
+        self.steps.append({"op": "select", "columns": list(columns)})
+        return self
+
+    def sort(self, by: Any, ascending: Any = True) -> "QueryPlan":
+        self.steps.append({"op": "sort", "by": [by] if isinstance(by, str) else list(by), "ascending": ascending})
+        return self
+
+    def aggregate(self, group_by: Any, agg_func: Any = "mean") -> "QueryPlan":
+        keys = [group_by] if isinstance(group_by, str) else list(group_by)
+        self.steps.append({"op": "aggregate", "group_by": keys, "agg_func": agg_func})
+        return self
+
+    @property
+    def is_aggregate(self) -> bool:
+        return any(step["op"] == "aggregate" for step in self.steps)
+
+    def optimize(self) -> List[Dict[str, Any]]:
+        """Collapse the steps into stages separated by aggregations.
+
+        Within a stage all filters are fused into one predicate evaluated
+        first, only the last sort and select survive, and a sort ahead of an
+        aggregation is dropped since grouping reorders rows anyway.
+        """
+        stages = []
+        stage = self._new_stage()
+
+        for step in self.steps:
+            op = step["op"]
+            if op == "filter":
+                stage["filters"].append(step["condition"])
+            elif op == "select":
+                stage["select"] = step["columns"]
+            elif op == "sort":
+                stage["sort"] = step
+            elif op == "aggregate":
+                stage["aggregate"] = step
+                stage["sort"] = None
+                stages.append(stage)
+                stage = self._new_stage()
+
+        if stage["filters"] or stage["select"] or stage["sort"] or not stages:
+            stages.append(stage)
+
+        for stage in stages:
+            filters = stage.pop("filters")
+            stage["predicate"] = " and ".join(f"({f})" for f in filters) if filters else None
+        return stages
+
+    @staticmethod
+    def _new_stage() -> Dict[str, Any]:
+        return {"filters": [], "select": None, "sort": None, "aggregate": None}
+
+    def execute(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Run the optimized plan against ``df``"""
+        frame = df
+        for stage in self.optimize():
+            frame = self._run_stage(frame, stage)
+        return frame
+
+    def _run_stage(self, frame: pd.DataFrame, stage: Dict[str, Any]) -> pd.DataFrame:
+        predicate = stage["predicate"]
+        needed = self._needed_columns(frame, stage)
+
+        if needed is not None and len(needed) < len(frame.columns):
+            # Prune before filtering so the filtered copy only holds used columns
+            frame = frame[[col for col in frame.columns if col in needed]]
+        if predicate:
+            frame = frame.query(predicate)
+
+        if stage["sort"]:
+            frame = frame.sort_values(stage["sort"]["by"], ascending=stage["sort"]["ascending"])
+
+        aggregate = stage["aggregate"]
+        if stage["select"]:
+            keys = [k for k in aggregate["group_by"] if k not in stage["select"]] if aggregate else []
+            frame = frame[stage["select"] + keys]
+        if aggregate:
+            frame = frame.groupby(aggregate["group_by"]).agg(aggregate["agg_func"])
+        return frame
+
+    @staticmethod
+    def _needed_columns(frame: pd.DataFrame, stage: Dict[str, Any]) -> Optional[Set[str]]:
+        """Columns a stage reads, or None when every column is needed"""
+        aggregate = stage["aggregate"]
+        if stage["select"] is not None:
+            needed = set(stage["select"])
+        elif aggregate and isinstance(aggregate["agg_func"], dict):
+            needed = set(aggregate["group_by"]) | set(aggregate["agg_func"])
+        else:
+            return None
+
+        if stage["predicate"]:
+            needed |= referenced_columns(stage["predicate"], frame.columns)
+        if stage["sort"]:
+            needed |= set(stage["sort"]["by"])
+        if aggregate:
+            needed |= set(aggregate["group_by"])
+        return needed
+
+    def describe(self) -> Dict[str, Any]:
+        """The recorded steps and the optimized stages"""
+        return {"source": self.source, "steps": list(self.steps), "stages": self.optimize()}
@@ -0,0 +1,85 @@
+from typing import Any, Dict, Iterator, Optional
+import io
+import json
+import pandas as pd
+
+
+class ResultHandle:
+    """A large analysis result kept server-side and read in pages.
+
+    Group keys are moved out of the index and MultiIndex column labels are
+    flattened ("value_mean"), so every encoding sees a plain table.
+    """
+
+    def __init__(self, handle_id: str, frame: pd.DataFrame):
+        frame = frame.copy(deep=False)
+        if not isinstance(frame.index, pd.RangeIndex) or frame.index.name is not None:
+            frame = frame.reset_index()
+        if isinstance(frame.columns, pd.MultiIndex):
+            frame.columns = ["_".join(str(part) for part in col if part != "") for col in frame.columns]
+        frame.columns = [str(col) for col in frame.columns]
+        self.handle_id = handle_id
+        self.frame = frame
+
+    @property
+    def rows(self) -> int:
+        return len(self.frame)
+
+    @property
+    def columns(self):
+        return list(self.frame.columns)
+
+    def describe(self) -> Dict[str, Any]:
+        return {"result_handle": self.handle_id, "rows": self.rows, "columns": self.columns}
+
+    def columnar_json(self, offset: int = 0, limit: Optional[int] = None) -> str:
+        """Encode a row range as {"columns": [...], "data": {column: [values]}}.
+
+        Each column is serialized by pandas directly to a JSON array, so no
+        per-row Python objects are created.
+        """
+        page = self.frame.iloc[offset: None if limit is None else offset + limit]
+        arrays = ",".join(
+            f"{json.dumps(col)}:{page[col].to_json(orient='values', date_format='iso')}" for col in page.columns
+        )
+        return f'{{"columns":{json.dumps(list(page.columns))},"offset":{offset},"rows":{len(page)},"data":{{{arrays}}}}}'
+
+    def page(self, offset: int = 0, limit: int = 100) -> Dict[str, Any]:
+        """A decoded columnar page plus paging metadata"""
+        page = json.loads(self.columnar_json(offset, limit))
+        page["total_rows"] = self.rows
+        page["next_offset"] = offset + limit if offset + limit < self.rows else None
+        return page
+
+    def iter_json(self, chunk_rows: int = 10000, offset: int = 0, limit: Optional[int] = None) -> Iterator[str]:
+        """Newline-delimited columnar JSON pages"""
+        stop = self.rows if limit is None else min(self.rows, offset + limit)
+        for start in range(offset, stop, chunk_rows):
+            yield self.columnar_json(start, min(chunk_rows, stop - start)) + "\n"
+
+    def iter_arrow(self, chunk_rows: int = 65536, offset: int = 0, limit: Optional[int] = None) -> Iterator[bytes]:
+        """Arrow IPC stream format, converting one record batch at a time"""
+        import pyarrow as pa
+
+        stop = self.rows if limit is None else min(self.rows, offset + limit)
+        schema = pa.Schema.from_pandas(self.frame, preserve_index=False)
+        sink = io.BytesIO()
+        with pa.ipc.new_stream(sink, schema) as writer:
+            for start in range(offset, stop, chunk_rows):
+                batch = pa.RecordBatch.from_pandas(
+                    self.frame.iloc[start: min(stop, start + chunk_rows)], schema=schema, preserve_index=False
+                )
+                writer.write_batch(batch)
+                yield _drain(sink)
+        yield _drain(sink)
+
+    def to_arrow_ipc(self) -> bytes:
+        """The whole result as one Arrow IPC stream"""
+        return b"".join(self.iter_arrow())
+
+
+def _drain(sink: io.BytesIO) -> bytes:
+    data = sink.getvalue()
+    sink.seek(0)
+    sink.truncate()
+    return data
@@ -1,15 +1,29 @@
 from src.agents.base_agent import BaseAgent
+from src.agents.alert_dedup import AlertDeduplicator
 from typing import Dict, Any, List, Optional
 import logging
 from datetime import datetime
-import json
+import time
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
 class SecurityMonitorAgent(BaseAgent):
-    """AI Agent for CCTV monitoring and emergency response"""
+    """AI Agent for CCTV monitoring and emergency response
     
-    def __init__(self):
+    Automatic alerts are deduplicated per (zone, threat_type): repeated
+    detections within the ``debounce`` and ``cooldown`` windows are
+    suppressed unless their confidence rises by ``escalation_step``. Pass
+    ``dedup=False`` to alert on every detection.
+    """
+    
+    def __init__(
+        self,
+        dedup: bool = True,
+        debounce: float = 30.0,
+        cooldown: float = 300.0,
+        escalation_step: float = 0.1
+    ):
         super().__init__(
             name="SecurityMonitorAgent",
             description="Monitors CCTV feeds for security threats and coordinates emergency response"
@@ -33,6 +47,7 @@ class SecurityMonitorAgent(BaseAgent):
             "weapon_detected": "critical"
         }
         self.alert_history = []
+        self.deduplicator = AlertDeduplicator(debounce, cooldown, escalation_step) if dedup else None
         
     def execute(self, task: str, **kwargs) -> Dict[str, Any]:
         """Execute security monitoring task"""
@@ -41,6 +56,9 @@ class SecurityMonitorAgent(BaseAgent):
         task_lower = task.lower()
         
         try:
+            # Batches skip task-name matching so the per-call overhead is paid once
+            if "detections" in kwargs:
+                return self.ingest_detections(kwargs["detections"])
             if "monitor" in task_lower:
                 return self._start_monitoring(**kwargs)
             elif "detect" in task_lower or "analyze" in task_lower:
@@ -95,6 +113,8 @@ class SecurityMonitorAgent(BaseAgent):
         frame_data = kwargs.get('frame_data', {})
         
         threat_level = self.threat_levels.get(threat_type, "low")
+        detected_at = kwargs.get('timestamp')
+        timestamp = self._detection_time(detected_at)
         
         analysis = {
             "threat_detected": confidence > 0.7,
@@ -102,26 +122,23 @@ class SecurityMonitorAgent(BaseAgent):
             "threat_level": threat_level,
             "confidence": confidence,
             "zone": zone,
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": timestamp,
             "requires_action": confidence > 0.8 and threat_level in ["high", "critical"]
         }
         
         # Auto-alert for high-confidence critical threats
         if analysis["requires_action"]:
-            alert_result = self._send_alert(
-                threat_type=threat_type,
-                zone=zone,
-                confidence=confidence
+            alert, emergency_call, decision = self._act_on_threat(
+                threat_type, zone, confidence, threat_level, timestamp, self._event_time(detected_at)
             )
-            analysis["alert_sent"] = alert_result["status"] == "success"
+            analysis["alert_sent"] = alert is not None
+            if decision is not None:
+                analysis["incident_id"] = decision["incident_id"]
+                analysis["alert_suppressed"] = not decision["notify"]
             
             # Auto-call emergency services for critical threats
             if threat_level == "critical":
-                emergency_result = self._initiate_emergency_call(
-                    threat_type=threat_type,
-                    zone=zone
-                )
-                analysis["emergency_called"] = emergency_result["status"] == "success"
+                analysis["emergency_called"] = emergency_call is not None
         
         # Update monitoring zone stats
         if zone in self.monitoring_zones:
@@ -135,12 +152,198 @@ class SecurityMonitorAgent(BaseAgent):
             "analysis": analysis
         }
     
+    def ingest_detections(self, detections: Any) -> Dict[str, Any]:
+        """Analyze a batch of detections at once.
+        
+        ``detections`` is a list of dicts, a dict of equal-length arrays or a
+        DataFrame, with ``zone``, ``threat_type``, ``confidence`` and an
+        optional ``timestamp`` (epoch seconds or ISO string). Thresholds are
+        applied to whole arrays and zone stats are updated once per zone;
+        only the resulting alerts and emergency calls are returned.
+        """
+        columns = self._detection_columns(detections)
+        zones = columns["zone"]
+        threat_types = columns["threat_type"]
+        confidence = columns["confidence"]
+        count = len(confidence)
+        if count == 0:
+            return {"status": "success", "processed": 0, "detected": 0, "alerts": [], "emergency_calls": []}
+        
+        types, type_index = np.unique(threat_types, return_inverse=True)
+        levels = np.array([self.threat_levels.get(t, "low") for t in types.tolist()])[type_index]
+        detected = confidence > 0.7
+        severe = (levels == "high") | (levels == "critical")
+        actionable = np.flatnonzero((confidence > 0.8) & severe)
+        
+        # Bulk zone stats: one update per zone with its count and latest threat
+        zone_names, zone_index = np.unique(zones, return_inverse=True)
+        zone_counts = np.bincount(zone_index)
+        last_rows = np.zeros(len(zone_names), dtype=np.int64)
+        np.maximum.at(last_rows, zone_index, np.arange(count))
+        for name, zone_count, last_row in zip(zone_names.tolist(), zone_counts.tolist(), last_rows.tolist()):
+            stats = self.monitoring_zones.get(name)
+            if stats is not None:
+                stats["threats_detected"] = stats.get("threats_detected", 0) + zone_count
+                stats["last_threat"] = str(threat_types[last_row])
+        
+        now = datetime.now().isoformat()
+        now_seconds = time.time()
+        timestamps = columns.get("timestamp")
+        alerts = []
+        emergency_calls = []
+        for row in actionable.tolist():
+            detected_at = timestamps[row] if timestamps is not None else None
+            alert, emergency_call, _ = self._act_on_threat(
+                str(threat_types[row]),
+                str(zones[row]),
+                float(confidence[row]),
+                str(levels[row]),
+                self._detection_time(detected_at) if detected_at is not None else now,
+                self._event_time(detected_at) if detected_at is not None else now_seconds
+            )
+            if alert is not None:
+                alerts.append(alert)
+            if emergency_call is not None:
+                emergency_calls.append(emergency_call)
+        
+        logger.info(f"Ingested {count} detections: {int(detected.sum())} threats, {len(alerts)} alerts")
+        
+        return {
+            "status": "success",
+            "processed": count,
+            "detected": int(detected.sum()),
+            "actionable": len(actionable),
+            "alerts": alerts,
+            "emergency_calls": emergency_calls
+        }
+    
+    def _act_on_threat(
+        self,
+        threat_type: str,
+        zone: str,
+        confidence: float,
+        threat_level: str,
+        timestamp: str,
+        event_time: float
+    ):
+        """Alert (and call emergency services for critical threats) unless deduplication suppresses it
+        
+        Returns the alert, the emergency call and the deduplication decision,
+        each None when not made.
+        """
+        decision = None
+        if self.deduplicator is not None:
+            decision = self.deduplicator.observe(zone, threat_type, confidence, event_time)
+            if not decision["notify"]:
+                return None, None, decision
+        
+        alert_result = self._send_alert(
+            threat_type=threat_type,
+            zone=zone,
+            confidence=confidence,
+            timestamp=timestamp
+        )
+        alert = alert_result["alert"]
+        if decision is not None:
+            alert["incident_id"] = decision["incident_id"]
+            alert["reason"] = decision["reason"]
+            alert["suppressed_since_last"] = decision["suppressed_since_last"]
+        
+        emergency_call = None
+        if threat_level == "critical" and (
+            self.deduplicator is None or self.deduplicator.claim_emergency_call(zone, threat_type)
+        ):
+            emergency_result = self._initiate_emergency_call(
+                threat_type=threat_type,
+                zone=zone,
+                timestamp=timestamp
+            )
+            if emergency_result["status"] == "success":
+                emergency_call = emergency_result["emergency_call"]
+        return alert, emergency_call, decision
+    
+    def _event_time(self, value: Any) -> float:
+        """Epoch seconds of a detection timestamp, or now"""
+        if value is None:
+            return time.time()
+        if isinstance(value, (int, float, np.integer, np.floating)):
+            return float(value)
+        if hasattr(value, "timestamp"):
+            return value.timestamp()
+        try:
+            return datetime.fromisoformat(str(value)).timestamp()
+        except ValueError:
+            return time.time()
+    
+    def _detection_columns(self, detections: Any) -> Dict[str, Any]:
+        """Normalize a detection batch to numpy columns"""
+        if hasattr(detections, "to_dict") and hasattr(detections, "columns"):
+            columns = {name: detections[name].to_numpy() for name in detections.columns}
+        elif isinstance(detections, dict):
+            columns = dict(detections)
+        else:
+            detections = list(detections)
+            keys = {key for detection in detections for key in detection}
+            columns = {key: [detection.get(key) for detection in detections] for key in keys}
+        
+        count = len(next(iter(columns.values()), []))
+        if any(len(values) != count for values in columns.values()):
+            raise ValueError("Detection columns must all have the same length")
+        
+        def column(name: str, default: Any, dtype: Any) -> np.ndarray:
+            values = columns.get(name)
+            if values is None:
+                return np.full(count, default, dtype=dtype)
+            values = np.asarray(values, dtype=object)
+            values[np.equal(values, None)] = default
+            return values.astype(dtype)
+        
+        normalized = {
+            "zone": column("zone", "main", object),
+            "threat_type": column("threat_type", "unknown", object),
+            "confidence": column("confidence", 0.0, float),
+        }
+        if columns.get("timestamp") is not None:
+            normalized["timestamp"] = self._detection_timestamps(columns["timestamp"])
+        return normalized
+    
+    def _detection_timestamps(self, values: Any) -> np.ndarray:
+        """Timestamps as datetimes, epoch seconds or strings, validated before any state is changed"""
+        values = np.asarray(values)
+        if values.dtype.kind == "M":
+            # datetime64 columns become datetimes (NaT becomes None) instead of integer nanoseconds
+            return values.astype("datetime64[us]").astype(object)
+        values = values.astype(object)
+        for row, value in enumerate(values.tolist()):
+            if isinstance(value, np.datetime64):
+                values[row] = value.astype("datetime64[us]").item()
+            elif isinstance(value, (int, float, np.integer, np.floating)):
+                if value != value:
+                    values[row] = None
+                    continue
+                try:
+                    datetime.fromtimestamp(value)
+                except (OverflowError, OSError, ValueError):
+                    raise ValueError(f"Invalid timestamp for detection {row}: {value}")
+        return values
+    
+    def _detection_time(self, value: Any) -> str:
+        """ISO timestamp of a detection given as epoch seconds, a datetime or a string"""
+        if value is None:
+            return datetime.now().isoformat()
+        if isinstance(value, (int, float, np.integer, np.floating)):
+            return datetime.fromtimestamp(float(value)).isoformat()
+        if hasattr(value, "isoformat"):
+            return value.isoformat()
+        return str(value)
+    
     def _send_alert(self, **kwargs) -> Dict[str, Any]:
         """Send alert notification"""
         threat_type = kwargs.get('threat_type', 'unknown')
         zone = kwargs.get('zone', 'unknown')
         confidence = kwargs.get('confidence', 0.0)
         message = kwargs.get('message', '')
+        timestamp = kwargs.get('timestamp') or datetime.now().isoformat()
         
         alert = {
             "id": f"alert_{len(self.alert_history) + 1}",
@@ -148,7 +351,7 @@ class SecurityMonitorAgent(BaseAgent):
             "zone": zone,
             "confidence": confidence,
             "message": message or f"{threat_type.replace('_', ' ').title()} detected in {zone}",
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": timestamp,
             "status": "sent",
             "notification_channels": []
         }
@@ -159,7 +362,7 @@ class SecurityMonitorAgent(BaseAgent):
             alert["notification_channels"].append({
                 "channel": channel,
                 "status": "sent",
-                "sent_at": datetime.now().isoformat()
+                "sent_at": timestamp
             })
         
         self.active_alerts.append(alert)
@@ -179,6 +382,7 @@ class SecurityMonitorAgent(BaseAgent):
         threat_type = kwargs.get('threat_type', 'unknown')
         zone = kwargs.get('zone', 'unknown')
         priority = kwargs.get('priority', 'high')
+        timestamp = kwargs.get('timestamp') or datetime.now().isoformat()
         
         # Determine which emergency service to call
         service_type = self._determine_emergency_service(threat_type)
@@ -204,7 +408,7 @@ class SecurityMonitorAgent(BaseAgent):
             "threat_type": threat_type,
             "zone": zone,
             "priority": priority,
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": timestamp,
             "status": "initiated",
             "message": f"Emergency: {threat_type.replace('_', ' ').title()} detected in {zone}. Immediate assistance required."
         }
@@ -216,7 +420,7 @@ class SecurityMonitorAgent(BaseAgent):
             "recipient": "owner",
             "number": self.emergency_contacts["owner"]["number"],
             "message": f"Emergency call made to {service_type}: {emergency_call['message']}",
-            "timestamp": datetime.now().isoformat()
+            "timestamp": timestamp
         }
         
         return {
@@ -251,7 +455,8 @@ class SecurityMonitorAgent(BaseAgent):
             "monitoring_zones": self.monitoring_zones,
             "active_alerts": len(self.active_alerts),
             "total_alerts": len(self.alert_history),
-            "emergency_contacts": self.emergency_contacts
+            "emergency_contacts": self.emergency_contacts,
+            "deduplication": self.deduplicator.summary() if self.deduplicator is not None else None
         }
     
     def configure_emergency_contacts(self, contacts: Dict[str, Dict]) -> None:
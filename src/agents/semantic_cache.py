@@ -0,0 +1,231 @@
+from typing import Any, Dict, List, Optional, Tuple
+from collections import OrderedDict
+import re
+import threading
+import time
+import zlib
+import numpy as np
+
+
+_WORD = re.compile(r"\w+")
+_MIX = np.uint64(0x9E3779B97F4A7C15)
+
+
+def normalize_prompt(text: str) -> str:
+    """Lowercase and collapse whitespace"""
+    return " ".join(text.lower().split())
+
+
+class HashedVectorizer:
+    """Hashed word + character n-gram TF-IDF vectors, L2-normalized and sparse.
+
+    Document frequencies are counted online as prompts are added, so no
+    fitting pass or external model is needed.
+    """
+
+    def __init__(self, dim: int = 1 << 14, ngram: int = 3, max_features: int = 256):
+        self.dim = dim
+        self.ngram = ngram
+        self.max_features = max_features
+        self.doc_freq = np.zeros(dim, dtype=np.int64)
+        self.docs = 0
+
+    def features(self, text: str) -> np.ndarray:
+        """Hashed feature ids: whole words (order-free) and character n-grams"""
+        words = [zlib.crc32(word.encode("utf-8")) for word in _WORD.findall(text)]
+        data = np.frombuffer(text.encode("utf-8"), dtype=np.uint8).astype(np.uint64)
+        if len(data) >= self.ngram:
+            grams = np.zeros(len(data) - self.ngram + 1, dtype=np.uint64)
+            for offset in range(self.ngram):
+                grams = (grams << np.uint64(8)) | data[offset: len(data) - self.ngram + 1 + offset]
+            with np.errstate(over="ignore"):
+                grams = (grams + np.uint64(1 << 40)) * _MIX
+            grams = grams >> np.uint64(32)
+        else:
+            grams = np.empty(0, dtype=np.uint64)
+        ids = np.concatenate([np.asarray(words, dtype=np.uint64), grams])
+        return (ids % np.uint64(self.dim)).astype(np.int64)
+
+    def transform(self, text: str, learn: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+        """Sparse (indices, weights) vector of a normalized prompt"""
+        indices, counts = np.unique(self.features(text), return_counts=True)
+        if learn:
+            self.doc_freq[indices] += 1
+            self.docs += 1
+        idf = np.log((1 + self.docs) / (1 + self.doc_freq[indices])) + 1
+        weights = (1 + np.log(counts)) * idf
+        if len(weights) > self.max_features:
+            keep = np.sort(np.argpartition(-weights, self.max_features)[: self.max_features])
+            indices, weights = indices[keep], weights[keep]
+        norm = np.linalg.norm(weights)
+        return indices, (weights / norm if norm else weights).astype(np.float32)
+
+
+class SemanticCache:
+    """Near-duplicate prompt cache over an in-memory LSH index.
+
+    Prompts equal after normalization (case, whitespace, word order) hit
+    exactly. Otherwise the prompt's SimHash signature is split into bands;
+    entries sharing a band bucket are candidates, the most frequent
+    candidates are re-scored by exact cosine similarity, and the best one
+    is returned if it reaches ``threshold``. Entries are scoped (provider,
+    model and generation parameters) so only compatible responses are
+    reused. The oldest entries are evicted beyond ``max_entries``.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.9,
+        max_entries: int = 100000,
+        ttl: Optional[float] = 24 * 3600,
+        bands: int = 16,
+        band_bits: int = 16,
+        max_candidates: int = 64,
+        vectorizer: Optional[HashedVectorizer] = None,
+        seed: int = 0,
+    ):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.bands = bands
+        self.max_candidates = max_candidates
+        self.vectorizer = vectorizer or HashedVectorizer()
+        rng = np.random.default_rng(seed)
+        self._planes = rng.standard_normal((self.vectorizer.dim, bands * band_bits)).astype(np.float32)
+        self._powers = (1 << np.arange(band_bits, dtype=np.int64)).astype(np.int64)
+        self._buckets: List[Dict[int, List[int]]] = [{} for _ in range(bands)]
+        self._exact: Dict[Tuple[str, str], int] = {}
+        self._entries: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._ids = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.saved_tokens = 0
+
+    def _canonical(self, normalized: str) -> str:
+        return " ".join(sorted(normalized.split()))
+
+    def _band_keys(self, indices: np.ndarray, weights: np.ndarray) -> np.ndarray:
+        projection = weights @ self._planes[indices]
+        bits = (projection > 0).reshape(self.bands, -1)
+        return bits @ self._powers
+
+    def get(self, prompt: str, scope: str = "") -> Optional[Dict[str, Any]]:
+        """The closest cached response at or above the threshold, with its similarity"""
+        normalized = normalize_prompt(prompt)
+        now = time.time()
+        with self._lock:
+            entry_id = self._exact.get((scope, self._canonical(normalized)))
+            match = None
+            if entry_id is not None and self._live(entry_id, now):
+                match = (self._entries[entry_id], 1.0)
+            else:
+                match = self._nearest(normalized, scope, now)
+
+            if match is None:
+                self.misses += 1
+                return None
+            entry, similarity = match
+            self.hits += 1
+            self.saved_tokens += entry["tokens"]
+            return {"response": entry["response"], "similarity": similarity}
+
+    def _nearest(self, normalized: str, scope: str, now: float) -> Optional[Tuple[Dict[str, Any], float]]:
+        indices, weights = self.vectorizer.transform(normalized)
+        if not len(indices):
+            return None
+        found = [
+            bucket
+            for table, key in zip(self._buckets, self._band_keys(indices, weights).tolist())
+            for bucket in [table.get(key)]
+            if bucket
+        ]
+        if not found:
+            return None
+        candidates, collisions = np.unique(np.concatenate(found), return_counts=True)
+        if len(candidates) > self.max_candidates:
+            candidates = candidates[np.argpartition(-collisions, self.max_candidates)[: self.max_candidates]]
+
+        query = np.zeros(self.vectorizer.dim, dtype=np.float32)
+        query[indices] = weights
+        best, best_score = None, self.threshold
+        for entry_id in candidates.tolist():
+            if not self._live(entry_id, now):
+                continue
+            entry = self._entries[entry_id]
+            if entry["scope"] != scope:
+                continue
+            score = float(entry["weights"] @ query[entry["indices"]])
+            if score >= best_score:
+                best, best_score = entry, score
+        return (best, round(min(best_score, 1.0), 4)) if best is not None else None
+
+    def _live(self, entry_id: int, now: float) -> bool:
+        entry = self._entries.get(entry_id)
+        if entry is None:
+            return False
+        if self.ttl is not None and now - entry["created"] > self.ttl:
+            self._remove(entry_id)
+            return False
+        return True
+
+    def put(self, prompt: str, response: str, tokens: int, scope: str = "") -> None:
+        normalized = normalize_prompt(prompt)
+        with self._lock:
+            indices, weights = self.vectorizer.transform(normalized, learn=True)
+            band_keys = self._band_keys(indices, weights).tolist() if len(indices) else []
+            entry_id = self._ids
+            self._ids += 1
+            canonical = (scope, self._canonical(normalized))
+            old = self._exact.get(canonical)
+            if old is not None:
+                self._remove(old)
+            self._entries[entry_id] = {
+                "response": response,
+                "tokens": tokens,
+                "scope": scope,
+                "indices": indices,
+                "weights": weights,
+                "band_keys": band_keys,
+                "canonical": canonical,
+                "created": time.time(),
+            }
+            self._exact[canonical] = entry_id
+            for table, key in zip(self._buckets, band_keys):
+                table.setdefault(key, []).append(entry_id)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, entry_id: int) -> None:
+        entry = self._entries.pop(entry_id, None)
+        if entry is None:
+            return
+        if self._exact.get(entry["canonical"]) == entry_id:
+            del self._exact[entry["canonical"]]
+        for table, key in zip(self._buckets, entry["band_keys"]):
+            bucket = table.get(key)
+            if bucket is not None:
+                bucket.remove(entry_id)
+                if not bucket:
+                    del table[key]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._exact.clear()
+            for table in self._buckets:
+                table.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "saved_tokens": self.saved_tokens,
+            "entries": len(self._entries),
+            "threshold": self.threshold,
+        }
@@ -0,0 +1,274 @@
+from typing import Any, Dict, List, Optional, Sequence
+import math
+import numpy as np
+import pandas as pd
+
+
+_MASK64 = np.uint64(0xFFFFFFFFFFFFFFFF)
+
+
+def hash_values(values: Any) -> np.ndarray:
+    """Stable 64-bit hashes of a column's values (nulls included).
+
+    Numbers hash as float64 and everything else by its string form, so a
+    value hashes the same whichever dtype a chunk was inferred with.
+    """
+    series = pd.Series(values)
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        return pd.util.hash_array(series.to_numpy(dtype=float))
+    return pd.util.hash_array(series.astype(str).to_numpy(dtype=object))
+
+
+def _bit_length(values: np.ndarray) -> np.ndarray:
+    """Vectorized int.bit_length for uint64 arrays"""
+    values = values.copy()
+    length = np.zeros(len(values), dtype=np.int64)
+    for shift in (32, 16, 8, 4, 2, 1):
+        high = values >= (np.uint64(1) << np.uint64(shift))
+        length[high] += shift
+        values[high] >>= np.uint64(shift)
+    return length + (values > 0)
+
+
+def hll_precision(error: float) -> int:
+    """Number of HyperLogLog index bits needed for a relative standard error"""
+    return min(18, max(4, math.ceil(math.log2((1.04 / error) ** 2))))
+
+
+class HyperLogLog:
+    """Distinct-count sketch with a relative standard error of about ``error``"""
+
+    def __init__(self, error: float = 0.01):
+        self.precision = hll_precision(error)
+        self.registers = np.zeros(1 << self.precision, dtype=np.uint8)
+
+    @property
+    def error(self) -> float:
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def update_hashes(self, hashes: np.ndarray) -> None:
+        p = np.uint64(self.precision)
+        buckets = (hashes >> (np.uint64(64) - p)).astype(np.int64)
+        rest = hashes & (_MASK64 >> p)
+        ranks = (64 - self.precision) - _bit_length(rest) + 1
+        np.maximum.at(self.registers, buckets, ranks.astype(np.uint8))
+
+    def update(self, values: Any) -> None:
+        self.update_hashes(hash_values(values))
+
+    def merge(self, other: "HyperLogLog") -> None:
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLog sketches of different precision")
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def count(self) -> int:
+        m = len(self.registers)
+        alpha = {16: 0.673, 32: 0.697, 64: 0.709}.get(m, 0.7213 / (1 + 1.079 / m))
+        estimate = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            # Linear counting is more accurate for small cardinalities
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+
+class TDigest:
+    """Mergeable quantile sketch; ``compression`` bounds the number of centroids.
+
+    Each batch is merged into the centroids in one vectorized pass: points are
+    sorted, assigned to clusters by the arcsine scale function of their
+    cumulative weight, and each cluster collapses to its weighted mean. Tail
+    clusters stay small, so extreme quantiles are the most accurate.
+    """
+
+    def __init__(self, compression: float = 200):
+        self.compression = compression
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self.min = np.inf
+        self.max = -np.inf
+
+    @property
+    def count(self) -> float:
+        return float(self.weights.sum())
+
+    def update(self, values: Any) -> None:
+        values = pd.to_numeric(pd.Series(values), errors="coerce").to_numpy(dtype=float)
+        values = values[~np.isnan(values)]
+        if len(values):
+            self.min = min(self.min, values.min())
+            self.max = max(self.max, values.max())
+            self._compress(np.concatenate([self.means, values]), np.concatenate([self.weights, np.ones(len(values))]))
+
+    def merge(self, other: "TDigest") -> None:
+        if len(other.means):
+            self.min = min(self.min, other.min)
+            self.max = max(self.max, other.max)
+            self._compress(np.concatenate([self.means, other.means]), np.concatenate([self.weights, other.weights]))
+
+    def _compress(self, means: np.ndarray, weights: np.ndarray) -> None:
+        order = np.argsort(means, kind="stable")
+        means, weights = means[order], weights[order]
+        cumulative = np.cumsum(weights)
+        q = (cumulative - weights / 2) / cumulative[-1]
+        k = self.compression / math.pi * np.arcsin(2 * q - 1)
+        clusters = np.floor(k - k[0]).astype(np.int64)
+        totals = np.bincount(clusters, weights=weights)
+        used = totals > 0
+        self.weights = totals[used]
+        self.means = np.bincount(clusters, weights=means * weights)[used] / self.weights
+
+    def quantile(self, q: float) -> float:
+        if not len(self.means):
+            return np.nan
+        cumulative = np.cumsum(self.weights)
+        centers = cumulative - self.weights / 2
+        xs = np.concatenate([[0.0], centers, [cumulative[-1]]])
+        ys = np.concatenate([[self.min], self.means, [self.max]])
+        return float(np.interp(q * cumulative[-1], xs, ys))
+
+
+class CountMinSketch:
+    """Frequency sketch with heavy-hitter tracking.
+
+    Estimates overshoot true counts by at most ``epsilon`` times the total
+    with probability ``1 - delta``. The ``capacity`` most frequent candidate
+    values are kept alongside the counters to answer top-k queries.
+    """
+
+    def __init__(self, epsilon: float = 0.001, delta: float = 0.01, capacity: int = 100, seed: int = 0):
+        self.epsilon = epsilon
+        self.delta = delta
+        self.capacity = capacity
+        self.width = math.ceil(math.e / epsilon)
+        self.depth = math.ceil(math.log(1 / delta))
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, 2 ** 63, self.depth, dtype=np.uint64) | np.uint64(1)
+        self._b = rng.integers(0, 2 ** 63, self.depth, dtype=np.uint64)
+        self.table = np.zeros((self.depth, self.width), dtype=np.int64)
+        self.total = 0
+        self.candidates: Dict[Any, int] = {}
+
+    def _columns(self, hashes: np.ndarray) -> np.ndarray:
+        with np.errstate(over="ignore"):
+            mixed = hashes[None, :] * self._a[:, None] + self._b[:, None]
+        return ((mixed >> np.uint64(32)) % np.uint64(self.width)).astype(np.int64)
+
+    def update(self, values: Any) -> None:
+        counts = pd.Series(values).value_counts(dropna=False)
+        if counts.empty:
+            return
+        columns = self._columns(hash_values(counts.index))
+        for row in range(self.depth):
+            np.add.at(self.table[row], columns[row], counts.to_numpy())
+        self.total += int(counts.sum())
+        self._refresh_candidates(list(counts.index[: self.capacity]))
+
+    def merge(self, other: "CountMinSketch") -> None:
+        if self.table.shape != other.table.shape or not np.array_equal(self._a, other._a):
+            raise ValueError("Cannot merge Count-Min sketches with different parameters")
+        self.table += other.table
+        self.total += other.total
+        self._refresh_candidates(list(other.candidates))
+
+    def estimate(self, values: Sequence[Any]) -> np.ndarray:
+        columns = self._columns(hash_values(list(values)))
+        return self.table[np.arange(self.depth)[:, None], columns].min(axis=0)
+
+    def _refresh_candidates(self, new: List[Any]) -> None:
+        keys = list(dict.fromkeys(list(self.candidates) + new))
+        estimates = self.estimate(keys)
+        keep = np.argsort(-estimates, kind="stable")[: self.capacity]
+        self.candidates = {keys[i]: int(estimates[i]) for i in keep}
+
+    def top_k(self, k: int = 10) -> List[Dict[str, Any]]:
+        ranked = sorted(self.candidates.items(), key=lambda item: -item[1])[:k]
+        return [{"value": _plain(value), "count": count} for value, count in ranked]
+
+
+class DatasetSketch:
+    """Per-column sketches built in one streaming pass and merged incrementally.
+
+    Every column gets a HyperLogLog; numeric columns get a t-digest and the
+    rest get a Count-Min sketch with heavy hitters.
+    """
+
+    def __init__(self, error: float = 0.01, compression: float = 200, epsilon: float = 0.001,
+                 delta: float = 0.01, top_k: int = 10):
+        self.config = {
+            "error": error,
+            "compression": compression,
+            "epsilon": epsilon,
+            "delta": delta,
+            "top_k": top_k,
+        }
+        self.rows = 0
+        self.distinct: Dict[str, HyperLogLog] = {}
+        self.quantiles: Dict[str, TDigest] = {}
+        self.frequent: Dict[str, CountMinSketch] = {}
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        """Fold a chunk of rows into the sketches"""
+        config = self.config
+        for col in chunk.columns:
+            values = chunk[col]
+            if col not in self.distinct:
+                self.distinct[col] = HyperLogLog(config["error"])
+                if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+                    self.quantiles[col] = TDigest(config["compression"])
+                else:
+                    self.frequent[col] = CountMinSketch(
+                        config["epsilon"], config["delta"], capacity=max(100, 10 * config["top_k"])
+                    )
+            self.distinct[col].update(values)
+            if col in self.quantiles:
+                self.quantiles[col].update(values)
+            else:
+                self.frequent[col].update(values)
+        self.rows += len(chunk)
+
+    def merge(self, other: "DatasetSketch") -> None:
+        """Combine another sketch of the same columns built with the same config"""
+        if other.config != self.config:
+            raise ValueError("Cannot merge sketches built with different error bounds")
+        for kind in ("distinct", "quantiles", "frequent"):
+            mine, theirs = getattr(self, kind), getattr(other, kind)
+            for col, sketch in theirs.items():
+                if col in mine:
+                    mine[col].merge(sketch)
+                else:
+                    mine[col] = sketch
+        self.rows += other.rows
+
+    def summary(self, quantiles: Sequence[float] = (0.25, 0.5, 0.75), top_k: Optional[int] = None) -> Dict[str, Any]:
+        top_k = top_k or self.config["top_k"]
+        columns = {}
+        for col, hll in self.distinct.items():
+            stats: Dict[str, Any] = {"approx_distinct": hll.count()}
+            if col in self.quantiles:
+                digest = self.quantiles[col]
+                stats["quantiles"] = {str(q): digest.quantile(q) for q in quantiles}
+                stats["min"] = float(digest.min) if digest.count else np.nan
+                stats["max"] = float(digest.max) if digest.count else np.nan
+            else:
+                stats["top_k"] = self.frequent[col].top_k(top_k)
+            columns[col] = stats
+        return {
+            "rows": self.rows,
+            "columns": columns,
+            "error_bounds": {
+                "distinct_relative_error": round(1.04 / math.sqrt(1 << hll_precision(self.config["error"])), 4),
+                "tdigest_compression": self.config["compression"],
+                "frequency_overestimate": self.config["epsilon"] * self.rows,
+                "frequency_confidence": 1 - self.config["delta"],
+            },
+        }
+
+
+def _plain(value: Any) -> Any:
+    """JSON-friendly form of a sketched value"""
+    if isinstance(value, np.generic):
+        return value.item()
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None
+    return value
@@ -0,0 +1,95 @@
+from typing import Any, Dict, Iterable, Iterator, Set
+import io
+import re
+import pandas as pd
+from .result_handles import _drain
+
+
+_IDENTIFIER = re.compile(r'"([^"]+)"|([A-Za-z_][A-Za-z0-9_]*)')
+_READ_ONLY = re.compile(r"^\s*(\(\s*)*(select|with|from|values|describe|explain|summarize)\b", re.IGNORECASE)
+
+
+def referenced_tables(query: str, names: Iterable[str]) -> Set[str]:
+    """Registered dataset names a SQL query refers to"""
+    identifiers = {quoted or bare for quoted, bare in _IDENTIFIER.findall(query)}
+    return identifiers & set(names)
+
+
+def connect():
+    """An in-memory DuckDB connection that cannot touch the file system.
+
+    Registered frames and Arrow datasets are still scannable, so queries
+    only see the datasets the agent hands them.
+    """
+    try:
+        import duckdb
+    except ImportError as e:
+        raise ValueError("SQL queries require the duckdb package") from e
+    return duckdb.connect(config={"enable_external_access": False})
+
+
+def run_query(query: str, tables: Dict[str, Any], batch_rows: int = 65536) -> Iterator[Any]:
+    """Run a read-only query over registered tables, returning an iterator of Arrow record batches.
+
+    ``tables`` maps names to DataFrames, Arrow datasets or record batch
+    readers. DuckDB pushes column projections and filters into the scans,
+    so only the columns and rows the query needs are read, and the result
+    is produced one batch at a time instead of being materialized. The query
+    is validated and started before this returns, so errors surface here.
+    """
+    con, reader = _open(query, tables, batch_rows)
+
+    def batches():
+        try:
+            for batch in reader:
+                yield batch
+        finally:
+            con.close()
+
+    return batches()
+
+
+def run_query_ipc(query: str, tables: Dict[str, Any], batch_rows: int = 65536) -> Iterator[bytes]:
+    """Run a query, returning its result as chunks of an Arrow IPC stream, one per record batch"""
+    import pyarrow as pa
+
+    con, reader = _open(query, tables, batch_rows)
+
+    def chunks():
+        sink = io.BytesIO()
+        try:
+            with pa.ipc.new_stream(sink, reader.schema) as writer:
+                for batch in reader:
+                    writer.write_batch(batch)
+                    yield _drain(sink)
+            yield _drain(sink)
+        finally:
+            con.close()
+
+    return chunks()
+
+
+def query_frame(query: str, tables: Dict[str, Any], batch_rows: int = 65536) -> pd.DataFrame:
+    """Run a query and collect the result as a DataFrame"""
+    con, reader = _open(query, tables, batch_rows)
+    try:
+        return reader.read_all().to_pandas()
+    finally:
+        con.close()
+
+
+def _open(query: str, tables: Dict[str, Any], batch_rows: int):
+    if not _READ_ONLY.match(query):
+        raise ValueError("Only SELECT queries are supported")
+
+    con = connect()
+    try:
+        for name, table in tables.items():
+            con.register(name, table)
+        result = con.execute(query)
+        if hasattr(result, "to_arrow_reader"):
+            return con, result.to_arrow_reader(batch_rows)
+        return con, result.fetch_record_batch(batch_rows)
+    except Exception:
+        con.close()
+        raise
@@ -0,0 +1,131 @@
+from typing import Any, Dict, Iterator, List, Optional
+import logging
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+class RunningStats:
+    """Single-pass column statistics with bounded memory.
+
+    Keeps count, mean and variance (Welford/Chan merge), min/max and null
+    counts exactly, and approximates quantiles from a fixed-size reservoir
+    sample per numeric column.
+    """
+
+    QUANTILES = (0.25, 0.5, 0.75)
+
+    def __init__(self, reservoir_size: int = 10000, seed: int = 0):
+        self.reservoir_size = reservoir_size
+        self.rows = 0
+        self.columns: List[str] = []
+        self.numeric: Dict[str, Dict[str, float]] = {}
+        self.nulls: Dict[str, int] = {}
+        self._reservoirs: Dict[str, np.ndarray] = {}
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        """Fold a chunk of rows into the running statistics"""
+        if not self.columns:
+            self.columns = list(chunk.columns)
+            for col in self.columns:
+                self.nulls[col] = 0
+                if pd.api.types.is_numeric_dtype(chunk[col]) and not pd.api.types.is_bool_dtype(chunk[col]):
+                    self.numeric[col] = {"count": 0, "mean": 0.0, "m2": 0.0, "min": np.inf, "max": -np.inf}
+                    self._reservoirs[col] = np.empty(0)
+
+        self.rows += len(chunk)
+        for col, nulls in chunk.isnull().sum().items():
+            self.nulls[col] = self.nulls.get(col, 0) + int(nulls)
+
+        for col, acc in self.numeric.items():
+            values = pd.to_numeric(chunk[col], errors="coerce").to_numpy(dtype=float)
+            values = values[~np.isnan(values)]
+            if len(values) == 0:
+                continue
+            self._sample(col, values, acc["count"])
+
+            n_b = len(values)
+            mean_b = values.mean()
+            m2_b = ((values - mean_b) ** 2).sum()
+            n = acc["count"] + n_b
+            delta = mean_b - acc["mean"]
+            acc["mean"] += delta * n_b / n
+            acc["m2"] += m2_b + delta ** 2 * acc["count"] * n_b / n
+            acc["count"] = n
+            acc["min"] = min(acc["min"], values.min())
+            acc["max"] = max(acc["max"], values.max())
+
+    def _sample(self, col: str, values: np.ndarray, seen: int) -> None:
+        """Vectorized reservoir sampling (Algorithm R) over a batch of values"""
+        reservoir = self._reservoirs[col]
+        room = self.reservoir_size - len(reservoir)
+        if room > 0:
+            reservoir = np.concatenate([reservoir, values[:room]])
+            values = values[room:]
+            seen += room
+        if len(values):
+            positions = self._rng.integers(0, np.arange(seen + 1, seen + len(values) + 1))
+            keep = positions < self.reservoir_size
+            # Later items overwrite earlier ones at the same slot, as in the sequential algorithm
+            reservoir[positions[keep]] = values[keep]
+        self._reservoirs[col] = reservoir
+
+    def describe(self) -> Dict[str, Dict[str, float]]:
+        """Statistics in the same shape as ``DataFrame.describe().to_dict()``"""
+        summary = {}
+        for col, acc in self.numeric.items():
+            count = acc["count"]
+            stats = {"count": float(count), "mean": np.nan, "std": np.nan, "min": np.nan}
+            if count:
+                stats["mean"] = float(acc["mean"])
+                stats["std"] = float(np.sqrt(acc["m2"] / (count - 1))) if count > 1 else np.nan
+                stats["min"] = float(acc["min"])
+            quantiles = (
+                np.quantile(self._reservoirs[col], self.QUANTILES)
+                if len(self._reservoirs[col])
+                else [np.nan] * len(self.QUANTILES)
+            )
+            for q, value in zip(self.QUANTILES, quantiles):
+                stats[f"{int(q * 100)}%"] = float(value)
+            stats["max"] = float(acc["max"]) if count else np.nan
+            summary[col] = stats
+        return summary
+
+
+class CSVStream:
+    """A CSV source read in chunks instead of being materialized"""
+
+    def __init__(self, source: str, chunksize: int = 100000, **read_kwargs):
+        self.source = source
+        self.chunksize = chunksize
+        self.read_kwargs = read_kwargs
+        self.stats = RunningStats()
+        self.dtypes: Dict[str, Any] = {}
+
+    def chunks(self, columns: Optional[List[str]] = None) -> Iterator[pd.DataFrame]:
+        """Iterate over the file in chunks of ``chunksize`` rows"""
+        kwargs = dict(self.read_kwargs)
+        if columns is not None:
+            kwargs["usecols"] = columns
+        with pd.read_csv(self.source, chunksize=self.chunksize, **kwargs) as reader:
+            for chunk in reader:
+                yield chunk
+
+    def scan(self) -> "CSVStream":
+        """Read the whole file once, collecting running statistics"""
+        for chunk in self.chunks():
+            if not self.dtypes:
+                self.dtypes = chunk.dtypes.to_dict()
+            self.stats.update(chunk)
+        logger.info(f"Scanned {self.stats.rows} rows from {self.source}")
+        return self
+
+    @property
+    def columns(self) -> List[str]:
+        return self.stats.columns
+
+    @property
+    def shape(self):
+        return (self.stats.rows, len(self.stats.columns))
@@ -0,0 +1,81 @@
+from typing import List
+import re
+import zlib
+from .llm_cache import estimate_tokens
+
+_UNITS = re.compile(r"(?<=[.!?])\s+|\n\s*\n")
+# After the minimum size, a chunk ends at a unit whose hash is 0 modulo this
+_BOUNDARY_MODULUS = 4
+
+
+def split_units(text: str, max_tokens: int) -> List[str]:
+    """Paragraphs and sentences of ``text``, with any longer than ``max_tokens`` split on words"""
+    units = []
+    for unit in _UNITS.split(text):
+        unit = unit.strip()
+        if not unit:
+            continue
+        if estimate_tokens(unit) <= max_tokens:
+            units.append(unit)
+            continue
+        words, size = [], 0
+        for word in unit.split():
+            cost = estimate_tokens(word)
+            if words and size + cost > max_tokens:
+                units.append(" ".join(words))
+                words, size = [], 0
+            words.append(word)
+            size += cost
+        if words:
+            units.append(" ".join(words))
+    return units
+
+
+def chunk_text(text: str, chunk_tokens: int = 3000, overlap_tokens: int = 200) -> List[str]:
+    """Split ``text`` into chunks of at most ``chunk_tokens``, each repeating the previous chunk's tail.
+
+    Boundaries are content-defined: once a chunk holds half its budget it
+    ends at the first sentence whose hash selects it. An edit therefore only
+    moves the boundaries around it, and the other chunks keep their exact
+    text, so their cached summaries stay valid.
+    """
+    if overlap_tokens >= chunk_tokens:
+        raise ValueError("overlap_tokens must be smaller than chunk_tokens")
+    budget = chunk_tokens - overlap_tokens
+    units = split_units(text, budget)
+    tokens = [estimate_tokens(unit) for unit in units]
+
+    spans, start, size = [], 0, 0
+    for index, (unit, cost) in enumerate(zip(units, tokens)):
+        if size and size + cost > budget:
+            spans.append((start, index))
+            start, size = index, 0
+        size += cost
+        if size >= budget // 2 and zlib.crc32(unit.encode("utf-8")) % _BOUNDARY_MODULUS == 0:
+            spans.append((start, index + 1))
+            start, size = index + 1, 0
+    if start < len(units):
+        spans.append((start, len(units)))
+
+    chunks = []
+    for start, end in spans:
+        overlap, size = start, 0
+        while overlap > 0 and size + tokens[overlap - 1] <= overlap_tokens:
+            overlap -= 1
+            size += tokens[overlap]
+        chunks.append(" ".join(units[overlap:end]))
+    return chunks
+
+
+def pack_texts(texts: List[str], max_tokens: int) -> List[List[str]]:
+    """Group consecutive texts so each group fits in ``max_tokens`` (always at least one per group)"""
+    groups: List[List[str]] = []
+    size = 0
+    for text in texts:
+        cost = estimate_tokens(text)
+        if not groups or size + cost > max_tokens:
+            groups.append([])
+            size = 0
+        groups[-1].append(text)
+        size += cost
+    return groups
@@ -0,0 +1,253 @@
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+
+
+TIME_SERIES_OPS = ("resample", "rolling", "expanding", "bucket", "asof")
+# Task names routed to each operation; matched exactly so tasks like "load rolling_sales.csv" are not captured
+TIME_SERIES_TASKS = {
+    "resample": "resample",
+    "rolling": "rolling",
+    "rolling window": "rolling",
+    "expanding": "expanding",
+    "expanding window": "expanding",
+    "bucket": "bucket",
+    "time bucket": "bucket",
+    "time bucket groupby": "bucket",
+    "asof": "asof",
+    "asof join": "asof",
+    "as-of join": "asof",
+}
+_EXPANDING_FUNCS = {"count", "sum", "mean", "min", "max", "var", "std"}
+
+
+def time_indexed(df: pd.DataFrame, time_column: Optional[str] = None) -> Tuple[pd.DataFrame, bool]:
+    """Return ``df`` indexed by time and whether it was already in time order"""
+    if time_column is not None:
+        if time_column not in df.columns:
+            raise ValueError(f"Column '{time_column}' not found")
+        df = df.set_index(pd.DatetimeIndex(pd.to_datetime(df[time_column]), name=time_column)).drop(
+            columns=time_column
+        )
+    elif not isinstance(df.index, pd.DatetimeIndex):
+        raise ValueError("Time-series tasks need a DatetimeIndex or a time_column")
+
+    if df.index.is_monotonic_increasing:
+        return df, True
+    return df.sort_index(kind="stable"), False
+
+
+def _day_aligned(rule: str) -> bool:
+    """Whether fixed-size buckets of ``rule`` tile a day, so they can be recomputed from any day's start"""
+    offset = pd.tseries.frequencies.to_offset(rule)
+    if not isinstance(offset, pd.offsets.Tick):
+        return False
+    return pd.Timedelta(days=1) % pd.Timedelta(offset) == pd.Timedelta(0)
+
+
+class TimeSeriesView:
+    """A resample/rolling/expanding/bucket/as-of result kept current under appends.
+
+    ``compute`` evaluates the whole frame. ``update`` is given only the
+    appended rows, time-indexed, and re-evaluates what they can change: the
+    last bucket onwards, the trailing window, or the new rows joined against
+    the unchanged right side. The view keeps the sorted tail of earlier rows
+    those windows reach back into, so the full frame is not re-indexed or
+    re-sorted. ``update`` returns None, asking for a ``compute``, when
+    appended rows go back in time or the bucket size is not fixed.
+    """
+
+    def __init__(self, op: str, params: Dict[str, Any], right: Optional[pd.DataFrame] = None):
+        if op not in TIME_SERIES_OPS:
+            raise ValueError(f"Unknown time-series operation: {op}")
+        self.op = op
+        self.params = params
+        self.right = right
+        self.version = None
+        self.rows = 0
+        self.last_time = None
+        self.tail: Optional[pd.DataFrame] = None
+        self.result: Optional[pd.DataFrame] = None
+        self._expanding_state: Dict[str, Dict[str, float]] = {}
+
+    def compute(self, df: pd.DataFrame) -> pd.DataFrame:
+        self.result = self._evaluate(df)
+        if self.op == "expanding":
+            self._expanding_state = self._fold_state({}, self._columns(df))
+        self.rows = 0
+        self._advance(df)
+        return self.result
+
+    def update(self, new: pd.DataFrame) -> Optional[pd.DataFrame]:
+        if new.empty:
+            return self.result
+        if self.result is None or not new.index.is_monotonic_increasing or new.index[0] < self.last_time:
+            return None
+
+        op = self.op
+        df = pd.concat([self.tail, new])
+        if op in ("resample", "bucket"):
+            rule = self.params["rule"]
+            if not _day_aligned(rule):
+                return None
+            cutoff = self.last_time.floor(rule)
+            tail = self._evaluate(df.iloc[df.index.searchsorted(cutoff, "left"):])
+            times = self.result.index.get_level_values(0)
+            self.result = pd.concat([self.result[times < cutoff], tail])
+        elif op == "rolling":
+            window = self.params["window"]
+            if isinstance(window, int):
+                start = max(0, len(self.tail) - window + 1)
+            else:
+                start = df.index.searchsorted(new.index[0] - pd.Timedelta(window), "right")
+            tail = self._evaluate(df.iloc[start:]).iloc[-len(new):]
+            self.result = pd.concat([self.result, tail])
+        elif op == "expanding":
+            tail = self._expanding_tail(self._columns(new))
+            if tail is None:
+                return None
+            self.result = pd.concat([self.result, tail])
+        else:
+            self.result = pd.concat([self.result, self._evaluate(new)])
+
+        self._advance(df, appended=len(new))
+        return self.result
+
+    def _advance(self, df: pd.DataFrame, appended: Optional[int] = None) -> None:
+        """Count the rows seen and keep the tail of ``df`` the next update may look back into"""
+        self.rows += len(df) if appended is None else appended
+        self.last_time = df.index[-1] if len(df) else None
+        self.tail = df.iloc[self._lookback(df):]
+
+    def _lookback(self, df: pd.DataFrame) -> int:
+        """Position of the first row a later append can still affect the result through"""
+        if not len(df) or self.op in ("expanding", "asof"):
+            return len(df)
+        if self.op == "rolling":
+            window = self.params["window"]
+            if isinstance(window, int):
+                return max(0, len(df) - window + 1)
+            return df.index.searchsorted(self.last_time - pd.Timedelta(window), "right")
+        if not _day_aligned(self.params["rule"]):
+            return len(df)
+        return df.index.searchsorted(self.last_time.floor(self.params["rule"]), "left")
+
+    def _columns(self, df: pd.DataFrame) -> pd.DataFrame:
+        columns = self.params.get("columns")
+        if columns:
+            return df[columns]
+        agg_func = self.params.get("agg_func")
+        if isinstance(agg_func, dict):
+            return df[list(agg_func)]
+        if self.op in ("rolling", "expanding"):
+            return df.select_dtypes("number")
+        return df
+
+    def _evaluate(self, df: pd.DataFrame) -> pd.DataFrame:
+        params = self.params
+        agg_func = params.get("agg_func", "mean")
+        if self.op == "resample":
+            return self._columns(df).resample(params["rule"]).agg(agg_func)
+        if self.op == "bucket":
+            keys = params.get("group_by") or []
+            keys = [keys] if isinstance(keys, str) else list(keys)
+            frame = self._columns(df)
+            frame = frame.join(df[[k for k in keys if k not in frame.columns]])
+            return frame.groupby([pd.Grouper(freq=params["rule"])] + keys, observed=True).agg(agg_func)
+        if self.op == "rolling":
+            window = params["window"]
+            return self._columns(df).rolling(window, min_periods=params.get("min_periods")).agg(agg_func)
+        if self.op == "expanding":
+            return self._columns(df).expanding().agg(agg_func)
+        return pd.merge_asof(
+            df,
+            self.right,
+            left_index=True,
+            right_index=True,
+            by=params.get("by"),
+            tolerance=pd.Timedelta(params["tolerance"]) if params.get("tolerance") else None,
+            direction=params.get("direction", "backward"),
+            suffixes=("", "_right"),
+        )
+
+    def _fold_state(self, state: Dict[str, Dict[str, float]], frame: pd.DataFrame) -> Dict[str, Dict[str, float]]:
+        """Chan-merge whole-block count/mean/m2/min/max into the running expanding state"""
+        merged = {}
+        for col in frame.columns:
+            values = frame[col].to_numpy(dtype=float)
+            values = values[~np.isnan(values)]
+            prev = state.get(col, {"count": 0, "mean": 0.0, "m2": 0.0, "min": np.inf, "max": -np.inf})
+            n_b = len(values)
+            if not n_b:
+                merged[col] = prev
+                continue
+            mean_b = values.mean()
+            n = prev["count"] + n_b
+            delta = mean_b - prev["mean"]
+            merged[col] = {
+                "count": n,
+                "mean": prev["mean"] + delta * n_b / n,
+                "m2": prev["m2"] + ((values - mean_b) ** 2).sum() + delta ** 2 * prev["count"] * n_b / n,
+                "min": min(prev["min"], values.min()),
+                "max": max(prev["max"], values.max()),
+            }
+        return merged
+
+    def _expanding_tail(self, new: pd.DataFrame) -> Optional[pd.DataFrame]:
+        """Expanding aggregates of appended rows, continued from the running state"""
+        agg_func = self.params.get("agg_func", "mean")
+        funcs = [agg_func] if isinstance(agg_func, str) else agg_func
+        if not isinstance(funcs, list) or not set(funcs) <= _EXPANDING_FUNCS:
+            return None
+
+        columns = {}
+        for col in new.columns:
+            prev = self._expanding_state.get(col, {"count": 0, "mean": 0.0, "m2": 0.0, "min": np.inf, "max": -np.inf})
+            values = new[col].astype(float)
+            n_b = values.notna().cumsum().to_numpy(dtype=float)
+            expanding = values.expanding()
+            mean_b = np.nan_to_num(expanding.mean().to_numpy())
+            m2_b = np.nan_to_num(expanding.var(ddof=0).to_numpy()) * n_b
+            n = prev["count"] + n_b
+            with np.errstate(divide="ignore", invalid="ignore"):
+                delta = mean_b - prev["mean"]
+                mean = np.where(n_b > 0, prev["mean"] + delta * n_b / n, prev["mean"])
+                m2 = np.where(n_b > 0, prev["m2"] + m2_b + delta ** 2 * prev["count"] * n_b / n, prev["m2"])
+                var = m2 / (n - 1)
+            empty = n < 1
+            stats = {
+                "count": n,
+                "sum": np.where(empty, np.nan, mean * n),
+                "mean": np.where(empty, np.nan, mean),
+                "min": np.where(empty, np.nan, np.fmin(prev["min"], expanding.min().to_numpy())),
+                "max": np.where(empty, np.nan, np.fmax(prev["max"], expanding.max().to_numpy())),
+                "var": np.where(n < 2, np.nan, var),
+                "std": np.where(n < 2, np.nan, np.sqrt(var)),
+            }
+            for func in funcs:
+                columns[(col, func)] = stats[func]
+
+        self._expanding_state = self._fold_state(self._expanding_state, new)
+        tail = pd.DataFrame(columns, index=new.index)
+        if isinstance(agg_func, str):
+            tail.columns = tail.columns.get_level_values(0)
+        return tail
+
+
+def view_params(op: str, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    """The parameters of a time-series task that determine its result"""
+    keys: List[str] = {
+        "resample": ["rule", "agg_func", "columns"],
+        "bucket": ["rule", "group_by", "agg_func", "columns"],
+        "rolling": ["window", "agg_func", "min_periods", "columns"],
+        "expanding": ["agg_func", "columns"],
+        "asof": ["right", "by", "tolerance", "direction"],
+    }[op]
+    params = {key: kwargs[key] for key in keys if kwargs.get(key) is not None}
+    if op in ("resample", "bucket") and "rule" not in params:
+        raise ValueError(f"A 'rule' frequency is required for {op}")
+    if op == "rolling" and "window" not in params:
+        raise ValueError("A 'window' is required for rolling")
+    if op == "asof" and "right" not in params:
+        raise ValueError("A 'right' dataset is required for an as-of join")
+    return params
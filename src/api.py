@@ -1,6 +1,8 @@
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Any, Dict, List, Optional
+import json
 import logging
 from src.agents.agent_orchestrator import AgentOrchestrator
 from src.agents.task_automation_agent import TaskAutomationAgent
@@ -25,6 +27,14 @@ class AgentExecuteRequest(BaseModel):
     task: str
     kwargs: Optional[Dict[str, Any]] = {}
 
+class AgentStreamRequest(BaseModel):
+    task: str
+    kwargs: Optional[Dict[str, Any]] = {}
+
+class SQLQueryRequest(BaseModel):
+    query: str
+    batch_rows: int = 65536
+
 class AgentChainRequest(BaseModel):
     chain: List[Dict[str, Any]]
 
@@ -62,7 +72,17 @@ async def register_agent(request: AgentRegisterRequest):
         elif agent_type == "llm_integration":
             provider = request.config.get("provider", "openai")
             api_key = request.config.get("api_key")
-            agent = LLMIntegrationAgent(provider=provider, api_key=api_key)
+            options = {
+                key: request.config[key]
+                for key in (
+                    "max_connections", "timeout", "max_concurrency", "provider_options", "budgets", "prices",
+                    "max_retries", "hedge_after", "fallbacks", "prefix_cache_tokens",
+                )
+                if key in request.config
+            }
+            agent = LLMIntegrationAgent(provider=provider, api_key=api_key, **options)
+            for name, template in request.config.get("templates", {}).items():
+                agent.register_template(name, **template)
         else:
             raise HTTPException(status_code=400, detail=f"Unknown agent type: {agent_type}")
 
@@ -119,6 +139,84 @@ async def get_agent_status(agent_name: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/agents/{agent_name}/metrics")
+async def get_agent_metrics(agent_name: str):
+    """Get an agent's token, latency and cost aggregates"""
+    agent = orchestrator.agents.get(agent_name)
+    if agent is None or not hasattr(agent, "get_metrics"):
+        raise HTTPException(status_code=404, detail=f"Agent '{agent_name}' has no metrics")
+    return agent.get_metrics()
+
+@app.post("/agents/{agent_name}/stream")
+async def stream_agent(agent_name: str, request: AgentStreamRequest):
+    """Stream an agent's response as server-sent events, one event per text chunk"""
+    agent = orchestrator.agents.get(agent_name)
+    if agent is None or not hasattr(agent, "stream_execute"):
+        raise HTTPException(status_code=404, detail=f"Agent '{agent_name}' does not support streaming")
+
+    def events():
+        try:
+            for chunk in agent.stream_execute(request.task, **request.kwargs):
+                yield f"data: {json.dumps({'text': chunk})}\n\n"
+            yield "event: done\ndata: {}\n\n"
+        except Exception as e:
+            logger.error(f"Streaming task failed: {str(e)}")
+            yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.get("/agents/{agent_name}/results/{handle_id}")
+async def stream_result(
+    agent_name: str,
+    handle_id: str,
+    format: str = "json",
+    offset: int = 0,
+    limit: Optional[int] = None,
+    chunk_rows: int = 10000,
+):
+    """Stream a large result as newline-delimited columnar JSON or Arrow IPC"""
+    agent = orchestrator.agents.get(agent_name)
+    if agent is None or not hasattr(agent, "get_result"):
+        raise HTTPException(status_code=404, detail=f"Agent '{agent_name}' has no results")
+
+    try:
+        handle = agent.get_result(handle_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    if format == "arrow":
+        return StreamingResponse(
+            handle.iter_arrow(chunk_rows, offset, limit),
+            media_type="application/vnd.apache.arrow.stream",
+        )
+    if format == "json":
+        return StreamingResponse(
+            handle.iter_json(chunk_rows, offset, limit),
+            media_type="application/x-ndjson",
+        )
+    raise HTTPException(status_code=400, detail=f"Unknown format: {format}")
+
+@app.post("/agents/{agent_name}/sql")
+def stream_sql(agent_name: str, request: SQLQueryRequest):
+    """Stream a SQL query's result as Arrow IPC, one record batch at a time.
+
+    A plain def, so FastAPI runs the blocking query start on its threadpool.
+    """
+    agent = orchestrator.agents.get(agent_name)
+    if agent is None or not hasattr(agent, "stream_sql"):
+        raise HTTPException(status_code=404, detail=f"Agent '{agent_name}' does not support SQL")
+
+    try:
+        chunks = agent.stream_sql(request.query, request.batch_rows, format="arrow")
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return StreamingResponse(chunks, media_type="application/vnd.apache.arrow.stream")
+
 @app.delete("/agents/{agent_name}")
 async def unregister_agent(agent_name: str):
     """Unregister an agent"""
@@ -0,0 +1,635 @@
+import pytest
+import sys
+import os
+import numpy as np
+import pandas as pd
+
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.agents.data_analysis_agent import DataAnalysisAgent
+
+
+def make_frame(rows=1000):
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        "zone": rng.choice(["a", "b", "c"], rows),
+        "value": rng.normal(size=rows),
+        "count": rng.integers(0, 50, rows),
+    })
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / "data.csv"
+    make_frame().to_csv(path, index=False)
+    return str(path)
+
+
+def test_load_and_statistics():
+    agent = DataAnalysisAgent()
+    result = agent.execute("load data", source=make_frame().to_dict("list"), name="df")
+    assert result["status"] == "success"
+    stats = agent.execute("statistics", name="df")["result"]
+    assert stats["shape"] == (1000, 3)
+
+
+def test_streaming_statistics_match_exact(csv_path):
+    agent = DataAnalysisAgent()
+    result = agent.execute("load", source=csv_path, name="big", chunksize=128)
+    assert result["result"]["streamed"] is True
+    assert "big" not in agent.list_dataframes()
+
+    stats = agent.execute("statistics", name="big")["result"]
+    expected = make_frame().describe()
+    for stat in ["count", "mean", "std", "min", "max"]:
+        assert stats["statistics"]["value"][stat] == pytest.approx(expected["value"][stat])
+    assert stats["missing_values"]["zone"] == 0
+
+
+def test_streaming_aggregate_matches_pandas(csv_path):
+    agent = DataAnalysisAgent()
+    agent.execute("load", source=csv_path, name="big", chunksize=100)
+    result = agent.execute("aggregate", name="big", group_by="zone", agg_func=["mean", "var", "count"])
+    got = pd.DataFrame(result["result"]["aggregated_data"])
+    expected = make_frame().groupby("zone").agg(["mean", "var", "count"])
+    assert np.allclose(got.to_numpy(dtype=float), expected.to_numpy(dtype=float))
+
+
+def test_streaming_aggregate_rejects_median(csv_path):
+    agent = DataAnalysisAgent()
+    agent.execute("load", source=csv_path, name="big", chunksize=100)
+    result = agent.execute("aggregate", name="big", group_by="zone", agg_func="median")
+    assert result["status"] == "failed"
+
+
+def test_streaming_filter_to_file(csv_path, tmp_path):
+    agent = DataAnalysisAgent()
+    agent.execute("load", source=csv_path, name="big", chunksize=100)
+    output = str(tmp_path / "filtered.csv")
+    result = agent.execute("filter", name="big", condition="value > 1", output=output)["result"]
+    assert result["filtered_rows"] == (make_frame()["value"] > 1).sum()
+    assert "big_filtered" in agent.list_streams()
+    assert len(pd.read_csv(output)) == result["filtered_rows"]
+
+
+@pytest.mark.parametrize("suffix", ["parquet", "feather", "npy"])
+def test_save_and_reload_columnar(tmp_path, suffix):
+    pytest.importorskip("pyarrow")
+    agent = DataAnalysisAgent()
+    frame = make_frame()
+    if suffix == "npy":
+        frame = frame[["value", "count"]]
+    agent.execute("load", source=frame.to_dict("list"), name="df")
+    path = str(tmp_path / f"data.{suffix}")
+
+    saved = agent.execute("save", name="df", path=path)
+    assert saved["status"] == "success"
+    assert saved["result"]["format"] == suffix
+
+    loaded = agent.execute(
+        "load", source=path, name="back", columns=["value"], filters=[["count", ">=", 25]]
+    )
+    assert loaded["status"] == "success"
+    back = agent.get_dataframe("back")
+    assert list(back.columns) == ["value"]
+    assert len(back) == (frame["count"] >= 25).sum()
+
+
+def test_save_tasks_match_exact_names_and_honor_no_compression(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    csv_path = tmp_path / "export_2024.csv"
+    make_frame().to_csv(csv_path, index=False)
+    agent = DataAnalysisAgent()
+
+    loaded = agent.execute("Load export_2024.csv", source=str(csv_path), name="df")
+    assert loaded["status"] == "success"
+
+    path = str(tmp_path / "plain.parquet")
+    assert agent.execute("export", name="df", path=path, compression=None)["status"] == "success"
+    assert pq.ParquetFile(path).metadata.row_group(0).column(0).compression == "UNCOMPRESSED"
+
+
+def test_optimize_task_matches_exact_names(tmp_path):
+    csv_path = tmp_path / "optimized.csv"
+    make_frame().to_csv(csv_path, index=False)
+    agent = DataAnalysisAgent()
+
+    assert agent.execute("Load optimized.csv", source=str(csv_path), name="df")["status"] == "success"
+    assert agent.execute("Optimize dtypes", name="df")["status"] == "success"
+
+
+def test_npy_load_is_memory_mapped(tmp_path):
+    path = str(tmp_path / "matrix.npy")
+    np.save(path, np.arange(12, dtype=float).reshape(4, 3))
+    agent = DataAnalysisAgent()
+    agent.execute("load", source=path, name="m")
+    df = agent.get_dataframe("m")
+    assert df.shape == (4, 3)
+    assert memory_mapped(df[0].to_numpy())
+
+    agent.execute("load", source=path, name="copy", memory_map=False)
+    assert not memory_mapped(agent.get_dataframe("copy")[0].to_numpy())
+
+
+def memory_mapped(array):
+    """Whether an array is a view onto a np.memmap"""
+    while array is not None:
+        if isinstance(array, np.memmap):
+            return True
+        array = array.base
+    return False
+
+
+def test_load_with_dtype_optimization():
+    agent = DataAnalysisAgent()
+    frame = make_frame()
+    frame["day"] = pd.date_range("2024-01-01", periods=len(frame), freq="h").strftime("%Y-%m-%d %H:%M")
+    result = agent.execute("load", source=frame.to_dict("list"), name="df", optimize=True)["result"]
+
+    assert result["memory_bytes_after"] < result["memory_bytes_before"]
+    df = agent.get_dataframe("df")
+    assert isinstance(df["zone"].dtype, pd.CategoricalDtype)
+    assert df["count"].dtype == np.int64  # narrow integers would wrap in filter arithmetic
+    assert df["value"].dtype == np.float64  # float32 would lose precision
+    assert pd.api.types.is_datetime64_any_dtype(df["day"])
+
+
+def test_filter_arithmetic_after_optimize_does_not_wrap():
+    agent = DataAnalysisAgent()
+    agent.execute("load", source={"count": [10, 40, 200]}, name="df", optimize=True)
+
+    assert agent.execute("filter", name="df", condition="count * 10 > 300")["result"]["filtered_rows"] == 2
+    assert agent.execute("filter", name="df", condition="count - 50 < 0")["result"]["filtered_rows"] == 2
+
+    agent.execute("optimize", name="df", downcast_integers=True)
+    assert agent.get_dataframe("df")["count"].dtype == np.int16
+
+
+def test_optimize_on_demand_keeps_results():
+    agent = DataAnalysisAgent()
+    agent.execute("load", source=make_frame().to_dict("list"), name="df")
+    before = agent.execute("aggregate", name="df", group_by="zone", agg_func="sum")["result"]
+    result = agent.execute("optimize", name="df")
+    assert result["status"] == "success"
+    assert "zone" in result["result"]["optimized_dtypes"]
+    after = agent.execute("aggregate", name="df", group_by="zone", agg_func="sum")["result"]
+    assert after["aggregated_data"]["count"] == before["aggregated_data"]["count"]
+
+
+def test_lazy_plan_fuses_filters_and_prunes_columns():
+    agent = DataAnalysisAgent()
+    agent.execute("load", source=make_frame().to_dict("list"), name="df")
+
+    agent.execute("filter", name="df", condition="value > 0", lazy=True)
+    agent.execute("filter", name="df_plan", condition="count < 25")
+    agent.execute("select", name="df_plan", columns=["zone", "count"])
+    agent.execute("sort", name="df_plan", by="count", ascending=False)
+    assert agent.list_dataframes() == ["df"]
+
+    stages = agent.execute("explain", name="df_plan")["result"]["stages"]
+    assert len(stages) == 1
+    assert stages[0]["predicate"] == "(value > 0) and (count < 25)"
+
+    result = agent.execute("collect", name="df_plan", store_as="top")["result"]
+    frame = make_frame()
+    expected = frame.query("value > 0 and count < 25").sort_values("count", ascending=False)
+    assert result["rows"] == len(expected)
+    assert list(agent.get_dataframe("top").columns) == ["zone", "count"]
+    assert agent.get_dataframe("top")["count"].tolist() == expected["count"].tolist()
+
+
+def test_lazy_plan_aggregate():
+    agent = DataAnalysisAgent()
+    agent.execute("load", source=make_frame().to_dict("list"), name="df")
+    agent.execute("filter", name="df", condition="value > 0", lazy=True, plan_name="p")
+    agent.execute("aggregate", name="p", group_by="zone", agg_func={"count": "sum"})
+    result = agent.execute("collect", name="p")["result"]
+
+    frame = make_frame()
+    expected = frame[frame["value"] > 0].groupby("zone").agg({"count": "sum"})
+    assert result["aggregated_data"] == expected.to_dict()
+
+
+def test_statistics_are_memoized_per_version():
+    agent = DataAnalysisAgent()
+    agent.execute("load", source=make_frame().to_dict("list"), name="df")
+    version = agent.versions["df"]
+
+    first = agent.execute("statistics", name="df")["result"]
+    second = agent.execute("statistics", name="df")["result"]
+    assert second == first
+    assert agent.result_cache.stats()["hits"] == 1
+
+    # Results are copies, so a caller mutating one cannot corrupt the cache
+    second["statistics"]["count"]["mean"] = -1
+    assert agent.execute("statistics", name="df")["result"] == first
+
+    agent.get_dataframe("df")["count"] += 1
+    assert agent.mark_modified("df") > version
+    third = agent.execute("statistics", name="df")["result"]
+    assert third is not first
+    assert third["statistics"]["count"]["mean"] == pytest.approx(first["statistics"]["count"]["mean"] + 1)
+
+
+def test_filter_cache_invalidated_on_reload():
+    agent = DataAnalysisAgent(cache_entries=2)
+    agent.execute("load", source=make_frame().to_dict("list"), name="df")
+    agent.execute("filter", name="df", condition="count > 10")
+    filtered = agent.get_dataframe("df_filtered")
+    agent.execute("filter", name="df", condition="count > 10")
+    assert agent.get_dataframe("df_filtered") is filtered
+    # The stored frame is not the cached result, so editing it leaves the cache intact
+    filtered["count"] = -1
+    agent.mark_modified("df_filtered")
+    agent.execute("filter", name="df", condition="count > 10")
+    assert (agent.get_dataframe("df_filtered")["count"] > 10).all()
+
+    agent.execute("load", source=make_frame(10).to_dict("list"), name="df")
+    result = agent.execute("filter", name="df", condition="count > 10")["result"]
+    assert result["original_rows"] == 10
+    assert len(agent.result_cache) <= 2
+
+
+def test_result_cache_budget_counts_string_data():
+    from src.agents.data_analysis_agent import _estimate_size
+    frame = pd.DataFrame({"text": pd.Series([f"{i:0200d}" for i in range(1000)], dtype=object), "n": 1})
+    assert _estimate_size(frame) > 200 * 1000
+
+    agent = DataAnalysisAgent(cache_bytes=100 * 1000)
+    agent.execute("load", source=frame, name="df")
+    agent.execute("aggregate", name="df", group_by="text", agg_func="sum")
+    assert len(agent.result_cache) == 0  # larger than the whole budget once strings are counted
+
+
+def test_filter_cache_holds_row_positions_not_frames():
+    agent = DataAnalysisAgent()
+    agent.execute("load", source=make_frame().to_dict("list"), name="df")
+
+    agent.execute("filter", name="df")
+    assert len(agent.result_cache) == 0  # a no-op filter is not cached
+    assert agent.get_dataframe("df_filtered") is agent.get_dataframe("df")
+
+    first = agent.execute("filter", name="df", condition="count > 10")["result"]
+    (positions,) = agent.result_cache._entries.values()
+    assert isinstance(positions, np.ndarray) and positions.dtype.kind == "i"
+    assert agent.execute("filter", name="df", condition="count > 10")["result"] == first
+    assert first["filtered_rows"] == len(positions) == (make_frame()["count"] > 10).sum()
+
+
+@pytest.mark.parametrize("agg_func", ["sum", ["mean", "var", "count", "min", "max"]])
+def test_parallel_aggregate_matches_pandas(agg_func):
+    agent = DataAnalysisAgent(aggregate_workers=2)
+    frame = make_frame(5000)
+    frame["region"] = np.where(frame["value"] > 0, "north", "south")
+    frame.loc[::50, "zone"] = None
+    agent.execute("load", source=frame.to_dict("list"), name="df")
+    try:
+        result = agent.execute(
+            "aggregate", name="df", group_by=["zone", "region"], agg_func=agg_func, parallel=True, workers=3
+        )
+    finally:
+        agent.shutdown()
+
+    got = pd.DataFrame(result["result"]["aggregated_data"])
+    expected = frame.groupby(["zone", "region"]).agg(agg_func)
+    assert list(got.index) == list(expected.index)
+    assert np.allclose(got.to_numpy(dtype=float), expected.to_numpy(dtype=float))
+
+
+def test_parallel_aggregate_keeps_large_integer_sums_exact():
+    from concurrent.futures import ProcessPoolExecutor
+    from src.agents.aggregation import parallel_aggregate
+    frame = pd.DataFrame({"key": ["a", "b"] * 500, "big": np.arange(1000, dtype=np.int64) + 2 ** 53})
+    with ProcessPoolExecutor(max_workers=2) as pool:
+        got = parallel_aggregate(frame, "key", ["sum", "min", "max"], pool, partitions=4)
+
+    expected = frame.groupby("key").agg(["sum", "min", "max"])
+    assert got[("big", "sum")].dtype == np.int64
+    assert got[("big", "sum")].tolist() == expected[("big", "sum")].tolist()
+    assert got[("big", "max")].tolist() == expected[("big", "max")].tolist()
+
+
+def test_registry_spills_least_recently_used(tmp_path):
+    frame_bytes = int(make_frame().memory_usage(index=True, deep=True).sum())
+    agent = DataAnalysisAgent(memory_budget=int(frame_bytes * 2.5), spill_dir=str(tmp_path))
+    agent.execute("load", source=make_frame().to_dict("list"), name="a")
+    agent.pin_dataframe("a")
+    for name in ["b", "c", "d"]:
+        agent.execute("load", source=make_frame().to_dict("list"), name=name)
+
+    states = {entry["name"]: entry["state"] for entry in agent.list_dataframes(detailed=True)}
+    assert states == {"a": "resident", "b": "spilled", "c": "spilled", "d": "resident"}
+    assert agent.dataframes.resident_bytes <= agent.dataframes.memory_budget
+
+    # Transparent reload, spilling the next least recently used frame
+    stats = agent.execute("statistics", name="b")["result"]
+    assert stats["shape"] == (1000, 3)
+    states = {entry["name"]: entry["state"] for entry in agent.list_dataframes(detailed=True)}
+    assert states == {"a": "resident", "b": "resident", "c": "spilled", "d": "spilled"}
+    pd.testing.assert_frame_equal(agent.get_dataframe("c"), make_frame())
+
+
+def test_spill_rewrites_edited_frames_and_drops_cached_frames(tmp_path):
+    agent = DataAnalysisAgent(memory_budget=1, spill_dir=str(tmp_path))
+    agent.execute("load", source=make_frame().to_dict("list"), name="a")
+    agent.execute("load", source=make_frame().to_dict("list"), name="b")
+    assert not agent.dataframes.is_resident("a")
+
+    # An in-place edit after a reload survives the next spill without mark_dirty
+    agent.get_dataframe("a")["count"] = 7
+    agent.get_dataframe("b")
+    assert not agent.dataframes.is_resident("a")
+    assert (agent.get_dataframe("a")["count"] == 7).all()
+
+    # Cached frame results of a dataset go when it is spilled
+    frame_bytes = int(make_frame().memory_usage(index=True, deep=True).sum())
+    agent = DataAnalysisAgent(memory_budget=int(frame_bytes * 2.5), spill_dir=str(tmp_path))
+    agent.execute("load", source=make_frame().to_dict("list"), name="b")
+    agent.execute("aggregate", name="b", group_by="zone", agg_func="sum")
+    assert any(key[1] == "b" for key in agent.result_cache._entries)
+    for name in ["c", "d"]:
+        agent.execute("load", source=make_frame().to_dict("list"), name=name)
+    assert not agent.dataframes.is_resident("b")
+    assert not any(key[1] == "b" for key in agent.result_cache._entries)
+
+
+def test_large_aggregate_returns_paginated_handle():
+    agent = DataAnalysisAgent(max_inline_rows=10)
+    frame = make_frame()
+    agent.execute("load", source=frame.to_dict("list"), name="df")
+    agg_func = {"value": ["mean", "max"]}
+    result = agent.execute("aggregate", name="df", group_by="count", agg_func=agg_func)["result"]
+
+    expected = frame.groupby("count").agg(agg_func)
+    assert "aggregated_data" not in result
+    assert result["rows"] == len(expected)
+    assert result["columns"] == ["count", "value_mean", "value_max"]
+    assert result["page"]["data"]["count"][:3] == expected.index[:3].tolist()
+
+    page = agent.execute("fetch", handle=result["result_handle"], offset=40, limit=20)["result"]
+    assert page["rows"] == 10
+    assert page["next_offset"] is None
+    assert page["data"]["value_max"] == pytest.approx(expected[("value", "max")].iloc[40:].tolist())
+
+
+def test_result_handle_arrow_stream():
+    pa = pytest.importorskip("pyarrow")
+    agent = DataAnalysisAgent()
+    agent.execute("load", source=make_frame().to_dict("list"), name="df")
+    result = agent.execute("aggregate", name="df", group_by="zone", agg_func="sum", as_handle=True)["result"]
+    handle = agent.get_result(result["result_handle"])
+
+    table = pa.ipc.open_stream(b"".join(handle.iter_arrow(chunk_rows=2))).read_all()
+    assert table.column_names == ["zone", "value", "count"]
+    assert table.num_rows == 3
+    assert sum(len(line.splitlines()) for line in handle.iter_json(chunk_rows=2)) == 2
+
+
+@pytest.mark.parametrize("condition", [
+    "zone == 'b'",
+    "count >= 10 and count < 20",
+    "5 < count <= 30 and zone in ['a', 'c'] and value > 0",
+    "(zone == 'a') & (value < 0.5)",
+])
+def test_indexed_filter_matches_query(condition):
+    agent = DataAnalysisAgent()
+    frame = make_frame()
+    agent.execute("load", source=frame.to_dict("list"), name="df")
+    built = agent.execute("build index", name="df", columns=["zone", "count"])["result"]
+    assert set(built["indexes"]) == {"zone", "count"}
+
+    result = agent.execute("filter using index on zone", name="df", condition=condition)["result"]
+    assert result["indexes_used"]
+    pd.testing.assert_frame_equal(agent.get_dataframe("df_filtered"), frame.query(condition))
+
+
+def test_indexes_dropped_on_mutation():
+    agent = DataAnalysisAgent()
+    agent.execute("load", source=make_frame().to_dict("list"), name="df")
+    agent.execute("index", name="df", columns="count", kind="hash")
+    agent.get_dataframe("df")["count"] = 0
+    agent.mark_modified("df")
+
+    result = agent.execute("filter", name="df", condition="count == 0")["result"]
+    assert "indexes_used" not in result
+    assert result["filtered_rows"] == 1000
+
+
+def test_approximate_statistics_within_bounds():
+    agent = DataAnalysisAgent()
+    frame = make_frame(20000)
+    agent.execute("load", source=frame.to_dict("list"), name="df")
+    result = agent.execute("approximate statistics", name="df", quantiles=[0.1, 0.5, 0.9], chunksize=3000)
+    assert result["status"] == "success"
+    columns = result["result"]["columns"]
+
+    exact = frame["value"].quantile([0.1, 0.5, 0.9]).to_numpy()
+    approx = [columns["value"]["quantiles"][q] for q in ("0.1", "0.5", "0.9")]
+    assert np.allclose(approx, exact, atol=0.02)
+    assert abs(columns["count"]["approx_distinct"] - frame["count"].nunique()) <= 2
+    top = columns["zone"]["top_k"][0]
+    counts = frame["zone"].value_counts()
+    assert top["value"] == counts.index[0]
+    assert counts.iloc[0] <= top["count"] <= counts.iloc[0] + result["result"]["error_bounds"]["frequency_overestimate"]
+
+
+def test_append_merges_sketches_incrementally():
+    agent = DataAnalysisAgent()
+    frame = make_frame(2000)
+    agent.execute("load", source=frame.iloc[:1000].to_dict("list"), name="df")
+    agent.execute("approx stats", name="df")
+
+    appended = agent.execute("append", name="df", data=frame.iloc[1000:].to_dict("list"))["result"]
+    assert appended["sketch_updated"] is True
+    assert appended["shape"] == (2000, 3)
+
+    incremental = agent.execute("approx stats", name="df")["result"]
+    agent.sketches.clear()
+    rebuilt = agent.execute("approx stats", name="df")["result"]
+    assert incremental["rows"] == rebuilt["rows"] == 2000
+    assert incremental["columns"]["count"]["approx_distinct"] == rebuilt["columns"]["count"]["approx_distinct"]
+    assert incremental["columns"]["zone"]["top_k"] == rebuilt["columns"]["zone"]["top_k"]
+
+
+def test_sql_joins_groups_and_windows_across_datasets():
+    agent = DataAnalysisAgent()
+    frame = make_frame()
+    zones = pd.DataFrame({"zone": ["a", "b", "c", "d"], "label": ["north", "south", "east", "west"]})
+    agent.execute("load", source=frame.to_dict("list"), name="df")
+    agent.execute("load", source=zones.to_dict("list"), name="zones")
+
+    result = agent.execute(
+        "sql",
+        query="""
+            SELECT label, SUM(value) AS total,
+                   RANK() OVER (ORDER BY SUM(value) DESC) AS rank
+            FROM df JOIN zones USING (zone)
+            WHERE count > 10
+            GROUP BY label ORDER BY label
+        """,
+    )
+    assert result["status"] == "success"
+    assert result["result"]["tables"] == ["df", "zones"]
+
+    expected = frame[frame["count"] > 10].merge(zones, on="zone").groupby("label")["value"].sum()
+    data = result["result"]["data"]
+    totals = {data["label"][i]: data["total"][i] for i in data["label"]}
+    assert totals == pytest.approx(expected.to_dict())
+    assert sorted(data["rank"].values()) == list(range(1, len(expected) + 1))
+
+
+def test_sql_task_matches_exact_names(tmp_path):
+    csv_path = tmp_path / "mysql_dump.csv"
+    make_frame().to_csv(csv_path, index=False)
+    agent = DataAnalysisAgent()
+
+    assert agent.execute("Load mysql_dump.csv", source=str(csv_path), name="df")["status"] == "success"
+    result = agent.execute("SQL query", query="SELECT COUNT(*) AS n FROM df")
+    assert result["result"]["data"]["n"][0] == len(make_frame())
+
+
+def test_sql_scans_spilled_and_streamed_datasets(tmp_path, csv_path):
+    frame = make_frame()
+    agent = DataAnalysisAgent(memory_budget=1, spill_dir=str(tmp_path))
+    agent.execute("load", source=frame.to_dict("list"), name="df")
+    agent.execute("load", source=frame.to_dict("list"), name="other")
+    agent.execute("load", source=csv_path, name="stream", stream=True, chunksize=100)
+    assert not agent.dataframes.is_resident("df")
+
+    result = agent.execute(
+        "sql",
+        query="SELECT COUNT(*) AS n FROM df JOIN stream USING (zone, count, value) WHERE df.value > 0.5",
+    )
+    assert result["result"]["data"]["n"][0] == int((frame["value"] > 0.5).sum())
+    assert not agent.dataframes.is_resident("df")
+
+
+def test_sql_rejects_writes():
+    agent = DataAnalysisAgent()
+    agent.execute("load", source=make_frame().to_dict("list"), name="df")
+    result = agent.execute("sql", query="DROP TABLE df")
+    assert result["status"] == "failed"
+
+
+def test_stream_sql_yields_record_batches():
+    import pyarrow as pa
+    agent = DataAnalysisAgent()
+    frame = make_frame(5000)
+    agent.execute("load", source=frame.to_dict("list"), name="df")
+
+    batches = list(agent.stream_sql("SELECT zone, value FROM df WHERE count > 10", batch_rows=1024))
+    assert len(batches) > 1 and all(batch.num_rows <= 1024 for batch in batches)
+    assert sum(batch.num_rows for batch in batches) == int((frame["count"] > 10).sum())
+
+    with pytest.raises(ValueError):
+        agent.stream_sql("DROP TABLE df")
+
+    from fastapi.testclient import TestClient
+    from src.api import app, orchestrator
+    orchestrator.register_agent(agent, "sql_stream_test")
+    try:
+        response = TestClient(app).post("/agents/sql_stream_test/sql", json={"query": "SELECT * FROM df"})
+        assert response.status_code == 200
+        assert pa.ipc.open_stream(response.content).read_all().num_rows == 5000
+        rejected = TestClient(app).post("/agents/sql_stream_test/sql", json={"query": "DROP TABLE df"})
+        assert rejected.status_code == 400
+    finally:
+        orchestrator.unregister_agent("sql_stream_test")
+
+
+def make_series(rows=2000, start="2024-01-01"):
+    rng = np.random.default_rng(1)
+    index = pd.date_range(start, periods=rows, freq="37s", name="timestamp")
+    return pd.DataFrame(
+        {
+            "host": rng.choice(["web", "db"], rows),
+            "latency": rng.gamma(2.0, 10.0, rows),
+            "errors": rng.integers(0, 3, rows),
+        },
+        index=index,
+    )
+
+
+@pytest.mark.parametrize("task,kwargs,expected", [
+    ("resample", {"rule": "5min", "agg_func": {"latency": ["mean", "max"], "errors": "sum"}},
+     lambda df: df.resample("5min").agg({"latency": ["mean", "max"], "errors": "sum"})),
+    ("rolling window", {"window": "10min", "agg_func": ["mean", "std"]},
+     lambda df: df[["latency", "errors"]].rolling("10min").agg(["mean", "std"])),
+    ("rolling window", {"window": 25, "agg_func": "sum", "columns": ["latency"]},
+     lambda df: df[["latency"]].rolling(25).sum()),
+    ("expanding", {"agg_func": ["mean", "var", "max", "count"]},
+     lambda df: df[["latency", "errors"]].expanding().agg(["mean", "var", "max", "count"])),
+    ("time bucket groupby", {"rule": "1h", "group_by": "host", "agg_func": {"latency": "median"}},
+     lambda df: df.groupby([pd.Grouper(freq="1h"), "host"], observed=True).agg({"latency": "median"})),
+])
+def test_time_series_incremental_matches_full(task, kwargs, expected):
+    agent = DataAnalysisAgent()
+    series = make_series()
+    agent.execute("load", source=series.iloc[:1500], name="ts")
+    first = agent.execute(task, name="ts", as_handle=True, **kwargs)["result"]
+    assert first["mode"] == "full"
+
+    appended = series.iloc[1500:].reset_index()
+    agent.execute("append", name="ts", data=appended.to_dict("list"))
+    second = agent.execute(task, name="ts", as_handle=True, **kwargs)["result"]
+    assert second["mode"] == "incremental"
+    assert agent.execute(task, name="ts", as_handle=True, **kwargs)["result"]["mode"] == "cached"
+
+    got = agent.get_result(second["result_handle"]).frame
+    want = agent._create_handle(expected(series)).frame
+    pd.testing.assert_frame_equal(got, want, check_freq=False, check_dtype=False)
+
+
+def test_time_series_update_indexes_only_appended_rows():
+    agent = DataAnalysisAgent()
+    series = make_series().reset_index()
+    agent.execute("load", source=series.iloc[:1500], name="ts")
+    kwargs = {"window": 25, "agg_func": "sum", "columns": ["latency"], "time_column": "timestamp"}
+    agent.execute("rolling window", name="ts", **kwargs)
+
+    (view,) = agent.time_series_views._entries.values()
+    assert len(view.tail) == 24  # only the rows the next window reaches back into are kept
+
+    agent.execute("append", name="ts", data=series.iloc[1500:].to_dict("list"))
+    result = agent.execute("rolling window", name="ts", as_handle=True, **kwargs)["result"]
+    assert result["mode"] == "incremental"
+    assert view.rows == 2000 and len(view.tail) == 24
+
+    expected = series.set_index("timestamp")[["latency"]].rolling(25).sum()
+    got = agent.get_result(result["result_handle"]).frame
+    pd.testing.assert_frame_equal(got, agent._create_handle(expected).frame, check_freq=False)
+
+
+def test_time_series_tasks_match_exact_names(tmp_path):
+    from src.agents.data_analysis_agent import LINEAGE_LIMIT
+    path = tmp_path / "rolling_sales.csv"
+    make_frame(10).to_csv(path, index=False)
+    agent = DataAnalysisAgent()
+    loaded = agent.execute("load rolling_sales.csv", source=str(path), name="sales")
+    assert loaded["result"]["shape"] == (10, 3)
+
+    agent.execute("load", source=make_series(10), name="ts")
+    for i in range(LINEAGE_LIMIT + 10):
+        row = {"timestamp": [pd.Timestamp("2025-01-01") + pd.Timedelta(minutes=i)],
+               "host": ["web"], "latency": [1.0], "errors": [0]}
+        agent.execute("append", name="ts", data=row)
+    assert len(agent.append_lineage["ts"]) == LINEAGE_LIMIT
+
+
+def test_asof_join_with_time_column():
+    agent = DataAnalysisAgent()
+    events = make_series(300).reset_index()
+    quotes = make_series(100, start="2023-12-31 23:59:00")[["host", "latency"]].reset_index()
+    agent.execute("load", source=events, name="events")
+    agent.execute("load", source=quotes, name="quotes")
+
+    result = agent.execute(
+        "as-of join", name="events", right="quotes", time_column="timestamp",
+        right_time_column="timestamp", by="host", tolerance="5min",
+    )
+    assert result["status"] == "success"
+    got = pd.DataFrame(result["result"]["data"])
+    expected = pd.merge_asof(
+        events, quotes, on="timestamp", by="host", tolerance=pd.Timedelta("5min"), suffixes=("", "_right")
+    ).set_index("timestamp")
+    np.testing.assert_allclose(got["latency_right"].to_numpy(dtype=float), expected["latency_right"].to_numpy(dtype=float))
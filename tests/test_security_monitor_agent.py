@@ -1,9 +1,11 @@
 import pytest
 import sys
 import os
+import time
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from src.agents.security_monitor_agent import SecurityMonitorAgent
+from src.agents.alert_dedup import AlertDeduplicator, TimingWheel
 
 def test_agent_initialization():
     agent = SecurityMonitorAgent()
@@ -153,3 +155,155 @@ def test_multiple_zones_monitoring():
         assert result["status"] == "success"
     
     assert len(agent.monitoring_zones) == 3
+
+def test_batch_detections_match_single_analysis():
+    detections = [
+        {"zone": "entrance", "threat_type": "intrusion", "confidence": 0.9},
+        {"zone": "entrance", "threat_type": "suspicious_activity", "confidence": 0.95},
+        {"zone": "kitchen", "threat_type": "fire", "confidence": 0.85},
+        {"zone": "kitchen", "threat_type": "fire", "confidence": 0.75},
+        {"zone": "lobby", "threat_type": "unknown_object", "confidence": 0.99},
+    ]
+    single = SecurityMonitorAgent()
+    batch = SecurityMonitorAgent()
+    for agent in (single, batch):
+        agent.execute("Start monitoring", zone="entrance", camera_id="cam_01")
+        agent.add_monitoring_zone("kitchen", "cam_02")
+    for detection in detections:
+        single.execute("Analyze threat", **detection)
+
+    result = batch.execute("Ingest", detections=detections)
+    assert result["status"] == "success"
+    assert result["processed"] == 5
+    assert result["detected"] == 5
+    assert [a["threat_type"] for a in result["alerts"]] == ["intrusion", "fire"]
+    assert [c["service_type"] for c in result["emergency_calls"]] == ["fire"]
+    assert len(batch.alert_history) == len(single.alert_history) == 2
+    assert batch.monitoring_zones["entrance"]["threats_detected"] == 2
+    assert batch.monitoring_zones["entrance"]["last_threat"] == "suspicious_activity"
+    assert batch.monitoring_zones["kitchen"]["threats_detected"] == 2
+
+def test_batch_detections_accept_columns_and_timestamps():
+    agent = SecurityMonitorAgent()
+    result = agent.ingest_detections({
+        "zone": ["gate", "gate", "yard"],
+        "threat_type": ["weapon_detected", "intrusion", "fall_detection"],
+        "confidence": [0.99, 0.5, 0.81],
+        "timestamp": [0, 0, "2024-01-01T12:00:00"],
+    })
+    assert result["detected"] == 2
+    assert [a["zone"] for a in result["alerts"]] == ["gate", "yard"]
+    assert result["alerts"][1]["timestamp"] == "2024-01-01T12:00:00"
+    assert result["alerts"][0]["notification_channels"][0]["sent_at"] == result["alerts"][0]["timestamp"]
+
+    empty = agent.ingest_detections([])
+    assert empty["processed"] == 0
+
+    mismatched = agent.execute("Ingest", detections={"zone": ["a"], "confidence": [0.9, 0.8]})
+    assert mismatched["status"] == "failed"
+
+def test_batch_detections_accept_datetime_columns_and_reject_bad_rows():
+    import pandas as pd
+    agent = SecurityMonitorAgent()
+    agent.add_monitoring_zone("gate", "cam_01")
+    frame = pd.DataFrame({
+        "zone": ["gate", "gate"],
+        "threat_type": ["intrusion", "fire"],
+        "confidence": [0.9, 0.95],
+        "timestamp": pd.to_datetime(["2024-01-01 12:00:00", "2024-01-01 12:00:05"]),
+    })
+    result = agent.ingest_detections(frame)
+    assert result["status"] == "success"
+    assert [a["timestamp"] for a in result["alerts"]] == ["2024-01-01T12:00:00", "2024-01-01T12:00:05"]
+
+    # A bad row fails the whole batch before any stats or alerts change
+    alerts = len(agent.alert_history)
+    bad = agent.execute("Ingest", detections={
+        "zone": ["gate", "gate"],
+        "threat_type": ["intrusion", "fire"],
+        "confidence": [0.9, 0.95],
+        "timestamp": [1700000000, 10 ** 20],
+    })
+    assert bad["status"] == "failed"
+    assert "detection 1" in bad["error"]
+    assert len(agent.alert_history) == alerts
+    assert agent.monitoring_zones["gate"]["threats_detected"] == 2
+
+def test_repeated_detections_are_deduplicated():
+    agent = SecurityMonitorAgent(debounce=10, cooldown=60)
+    # A person in front of the camera for 30 seconds, 10 detections per second
+    for i in range(300):
+        agent.execute("Analyze threat", threat_type="violence", confidence=0.9, zone="gate", timestamp=1000 + i / 10)
+    assert len(agent.alert_history) == 1
+    status = agent.execute("status")
+    assert status["deduplication"]["suppressed"] == 299
+    assert status["deduplication"]["active_incidents"] == 1
+
+    # Other zones and threat types are separate incidents
+    result = agent.execute("Analyze threat", threat_type="violence", confidence=0.9, zone="yard", timestamp=1030)
+    assert result["analysis"]["alert_sent"] == True
+    assert "emergency_called" in result["analysis"]
+
+def test_escalation_repeat_and_expiry():
+    agent = SecurityMonitorAgent(debounce=10, cooldown=60, escalation_step=0.05)
+    first = agent.execute("Analyze threat", threat_type="fire", confidence=0.82, zone="kitchen", timestamp=0)
+    assert first["analysis"]["emergency_called"] == True
+    quiet = agent.execute("Analyze threat", threat_type="fire", confidence=0.84, zone="kitchen", timestamp=5)
+    assert quiet["analysis"]["alert_suppressed"] == True
+    escalated = agent.execute("Analyze threat", threat_type="fire", confidence=0.95, zone="kitchen", timestamp=8)
+    assert escalated["analysis"]["alert_sent"] == True
+    # Emergency services are called once per incident
+    assert escalated["analysis"]["emergency_called"] == False
+    assert agent.alert_history[-1]["reason"] == "escalated"
+    assert agent.alert_history[-1]["suppressed_since_last"] == 1
+
+    # Still firing after the cool-down: a reminder on the same incident
+    for t in range(10, 75, 5):
+        agent.execute("Analyze threat", threat_type="fire", confidence=0.9, zone="kitchen", timestamp=t)
+    assert agent.alert_history[-1]["reason"] == "repeated"
+    assert agent.alert_history[-1]["incident_id"] == first["analysis"]["incident_id"]
+
+    # After a quiet period the next detection opens a new incident
+    later = agent.execute("Analyze threat", threat_type="fire", confidence=0.9, zone="kitchen", timestamp=500)
+    assert later["analysis"]["incident_id"] != first["analysis"]["incident_id"]
+    assert later["analysis"]["emergency_called"] == True
+
+def test_batch_ingestion_deduplicates_and_dedup_can_be_disabled():
+    detections = {
+        "zone": ["gate"] * 50,
+        "threat_type": ["intrusion"] * 50,
+        "confidence": [0.9] * 50,
+        "timestamp": [100 + i * 0.2 for i in range(50)],
+    }
+    result = SecurityMonitorAgent().ingest_detections(detections)
+    assert result["actionable"] == 50
+    assert len(result["alerts"]) == 1
+
+    undeduplicated = SecurityMonitorAgent(dedup=False).ingest_detections(detections)
+    assert len(undeduplicated["alerts"]) == 50
+
+def test_future_dated_detection_does_not_freeze_dedup_clock():
+    dedup = AlertDeduplicator(debounce=30, cooldown=300)
+    t = 10000.0
+    # Camera clock an hour ahead of the receiver
+    assert dedup.observe("kitchen", "fire", 0.9, t + 3600, received=t)["reason"] == "new"
+    assert dedup.observe("kitchen", "fire", 0.9, t, received=t)["reason"] == "suppressed"
+    assert dedup.observe("kitchen", "fire", 0.9, t + 400, received=t + 400)["notify"] == True
+    assert dedup.observe("kitchen", "fire", 0.9, t + 1200, received=t + 1200)["notify"] == True
+
+    agent = SecurityMonitorAgent()
+    agent.execute("Analyze threat", threat_type="fire", confidence=0.9, zone="hall", timestamp=time.time() + 3600)
+    assert agent.deduplicator.incidents[("hall", "fire")]["opened_at"] <= time.time()
+
+def test_timing_wheel_expires_keys():
+    wheel = TimingWheel(resolution=1.0, slots=8)
+    wheel.advance(0)
+    wheel.schedule("a", 3)
+    wheel.schedule("b", 20)
+    wheel.schedule("a", 5)
+    assert wheel.advance(4) == []
+    assert wheel.advance(5.5) == ["a"]
+    # Deadlines beyond one turn of the wheel and large time jumps
+    assert wheel.advance(19) == []
+    assert wheel.advance(1000) == ["b"]
+    assert len(wheel) == 0
@@ -0,0 +1,115 @@
+import pytest
+import sys
+import os
+import threading
+import time
+
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.agents.web_scraping_agent import WebScrapingAgent, parse_html
+
+
+PAGE = (
+    b"<html><head><title>Test Page</title></head><body>"
+    b"<a href='/one'>One</a><a href='/two'>Two</a><img src='logo.png'>"
+    b"</body></html>"
+)
+
+
+def test_parse_html():
+    data = parse_html(PAGE)
+    assert data["title"] == "Test Page"
+    assert data["links"] == ["/one", "/two"]
+    assert data["images"] == ["logo.png"]
+
+
+def test_scrape_concurrent_preserves_order():
+    agent = WebScrapingAgent(parse_workers=2)
+    pages = {
+        "http://a": PAGE,
+        "http://b": PAGE.replace(b"Test Page", b"Second"),
+    }
+
+    def fake_fetch(url, **kwargs):
+        if url not in pages:
+            raise ValueError(f"404 for {url}")
+        return pages[url]
+
+    agent._fetch = fake_fetch
+    try:
+        results = agent.scrape_concurrent(["http://a", "http://missing", "http://b"])
+    finally:
+        agent.shutdown()
+
+    assert [r["status"] for r in results] == ["success", "failed", "success"]
+    assert results[0]["result"]["title"] == "Test Page"
+    assert results[2]["result"]["title"] == "Second"
+    assert len(agent.get_scraped_data()) == 2
+
+
+def test_scrape_concurrent_without_shared_memory():
+    agent = WebScrapingAgent(parse_workers=1)
+    agent._fetch = lambda url, **kwargs: PAGE
+    try:
+        results = agent.scrape_concurrent(["http://a"], use_shared_memory=False)
+    finally:
+        agent.shutdown()
+
+    assert results[0]["result"]["title"] == "Test Page"
+
+
+def test_scrape_concurrent_parses_pages_as_they_arrive():
+    agent = WebScrapingAgent(parse_workers=1)
+    submitted = []
+    submit_parse = agent._submit_parse
+
+    def fake_fetch(url, **kwargs):
+        if url == "http://slow":
+            time.sleep(0.3)
+        return PAGE
+
+    def record_submit(pool, content, use_shared_memory):
+        submitted.append(time.perf_counter())
+        return submit_parse(pool, content, use_shared_memory)
+
+    agent._fetch = fake_fetch
+    agent._submit_parse = record_submit
+    try:
+        started = time.perf_counter()
+        results = agent.scrape_concurrent(["http://slow", "http://a", "http://b"])
+    finally:
+        agent.shutdown()
+
+    assert [r["url"] for r in results] == ["http://slow", "http://a", "http://b"]
+    assert all(r["status"] == "success" for r in results)
+    # The fast pages were handed to the parser before the slow download finished
+    assert sum(t - started < 0.2 for t in submitted) == 2
+
+
+def test_each_thread_gets_its_own_session():
+    agent = WebScrapingAgent()
+    sessions = []
+    thread = threading.Thread(target=lambda: sessions.append(agent._get_session()))
+    thread.start()
+    thread.join()
+    assert agent._get_session() is agent.session
+    assert sessions[0] is not agent.session
+
+
+def test_scrape_concurrent_returns_plain_values_for_large_pages():
+    rows = b"".join(b"<p>Paragraph %d with <a href='/p%d'>a link</a></p>" % (i, i) for i in range(1500))
+    page = b"<html><head><title>Big Page</title></head><body>" + rows + b"</body></html>"
+    assert len(page) > 60_000
+
+    agent = WebScrapingAgent(parse_workers=1)
+    agent._fetch = lambda url, **kwargs: page
+    try:
+        results = agent.scrape_concurrent(["http://big"])
+    finally:
+        agent.shutdown()
+
+    assert results[0]["status"] == "success"
+    result = results[0]["result"]
+    assert result["title"] == "Big Page"
+    assert type(result["title"]) is str
+    assert all(type(link) is str for link in result["links"])